@@ -0,0 +1,610 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+
+import dotenv
+from scraper.aggregators import ProfileAggregators
+from scraper.columnar_store import ColumnarStore
+from scraper.data_processor import DataProcessor
+from scraper.get_methods.get_ages_friends import ages_info
+from scraper.get_methods.get_cities_friends import cities_info
+from scraper.get_methods.get_genders_friends import geenders_info
+from scraper.persistence import PersistenceQueue, read_json
+from scraper.sampling import ProfileSampler
+from scraper.take_profile_info import AsyncVkProfile, unavailable_reason
+from scraper.wall_crawler import JsonArrayWriter, WallCrawler, WallState
+
+
+class Checkpoint:
+    """
+    Класс для хранения прогресса пакетного сбора данных между запусками.
+
+    Attributes
+    ----------
+    file_path : str
+        Путь к файлу контрольной точки.
+    done : set of int
+        Идентификаторы пользователей, данные которых уже сохранены.
+    failed : dict
+        Имена или идентификаторы пользователей, которые не удалось обработать, и причина ошибки.
+
+    Methods
+    -------
+    load()
+        Загружает контрольную точку из файла, если он существует.
+    save()
+        Атомарно сохраняет контрольную точку в файл.
+    mark_done(user_id)
+        Отмечает пользователя как обработанного и сохраняет контрольную точку.
+    mark_failed(name, reason)
+        Отмечает пользователя как необработанного и сохраняет контрольную точку.
+    """
+
+    def __init__(self, file_path):
+        """
+        Инициализирует контрольную точку и загружает сохраненный прогресс.
+
+        Parameters
+        ----------
+        file_path : str
+            Путь к файлу контрольной точки.
+        """
+        self.file_path = file_path
+        self.done = set()
+        self.failed = {}
+        self.load()
+
+    def load(self):
+        """
+        Загружает контрольную точку из файла, если он существует.
+        """
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path) as f:
+                state = json.load(f)
+            self.done = set(state.get("done", []))
+            self.failed = state.get("failed", {})
+        except Exception as e:
+            print(f"Ошибка при загрузке контрольной точки {self.file_path}: {e}")
+
+    def save(self):
+        """
+        Атомарно сохраняет контрольную точку в файл.
+
+        Данные записываются во временный файл, который затем заменяет основной, поэтому
+        прерванный запуск не оставляет поврежденную контрольную точку.
+        """
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"done": sorted(self.done), "failed": self.failed}, f)
+        os.replace(tmp_path, self.file_path)
+
+    def mark_done(self, user_id):
+        """
+        Отмечает пользователя как обработанного и сохраняет контрольную точку.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        """
+        self.done.add(user_id)
+        self.failed.pop(str(user_id), None)
+        self.save()
+
+    def mark_failed(self, name, reason):
+        """
+        Отмечает пользователя как необработанного и сохраняет контрольную точку.
+
+        Parameters
+        ----------
+        name : int or str
+            Имя или идентификатор пользователя.
+        reason : str
+            Причина ошибки.
+        """
+        self.failed[str(name)] = reason
+        self.save()
+
+
+class VkBatchApp:
+    """
+    Класс для пакетного сбора данных многих профилей ВКонтакте.
+
+    Профили читаются из файла (по одной ссылке, короткому имени или идентификатору в строке),
+    короткие имена разрешаются пакетами по 1000, после чего профили обрабатываются заданным
+    количеством параллельных обработчиков. После каждого профиля сохраняется контрольная точка,
+    поэтому прерванный запуск продолжается с того места, где остановился.
+
+    Attributes
+    ----------
+    input_path : str
+        Путь к файлу со списком профилей.
+    output_dir : str
+        Директория, в которой для каждого пользователя создается поддиректория с файлами JSON.
+    workers : int
+        Количество параллельных обработчиков.
+    wall_limit : int or None
+        Максимальное количество постов со стены каждого пользователя.
+    incremental : bool
+        Если True, со стены запрашиваются только посты новее сохраненных.
+    refresh_days : int
+        Количество дней, за которые у сохраненных постов обновляются счетчики.
+    checkpoint : Checkpoint
+        Контрольная точка пакетного запуска.
+    wall_state : WallState
+        Наибольший id и дата сохраненного поста каждого пользователя.
+    columnar : ColumnarStore or None
+        Колоночное хранилище снимков; None — снимки в формате Parquet не сохраняются.
+    persistence : PersistenceQueue
+        Очередь фоновой записи файлов, чтобы обработчики не ждали диск.
+    totals : ProfileAggregators
+        Агрегаторы аналитик по всем профилям, собранным в этом запуске; результаты
+        сохраняются в summary.json в output_dir. В приближенном режиме города, тематики
+        групп и количество различных друзей считаются скетчами в фиксированной памяти.
+    sample_error : float or None
+        Допустимая ошибка долей для выборки подписчиков; None — подписчики не собираются.
+    profile : AsyncVkProfile
+        Асинхронный клиент VK API.
+
+    Methods
+    -------
+    read_input()
+        Читает список профилей из файла.
+    run()
+        Запускает пакетный сбор данных.
+    scrape(user)
+        Получает и сохраняет данные одного профиля.
+    scrape_wall(user_id, wall_data, wall_path, aggregators, wall_seen, scraped_at=None)
+        Получает посты со стены и сохраняет их в файл.
+    sample_followers(user_id, user_dir)
+        Получает выборку подписчиков и сохраняет распределения с доверительными
+        интервалами.
+    save_summary()
+        Сохраняет сводные результаты аналитик по всем собранным профилям.
+    """
+
+    def __init__(
+        self,
+        input_path,
+        output_dir,
+        workers=4,
+        wall_limit=None,
+        checkpoint_path=None,
+        rate=3,
+        incremental=False,
+        refresh_days=7,
+        columnar_dir=None,
+        approximate=False,
+        top_k=20,
+        epsilon=0.001,
+        sample_error=None,
+    ):
+        """
+        Инициализирует пакетный сбор данных.
+
+        Parameters
+        ----------
+        input_path : str
+            Путь к файлу со списком профилей.
+        output_dir : str
+            Директория для сохранения данных.
+        workers : int, optional
+            Количество параллельных обработчиков, по умолчанию 4.
+        wall_limit : int, optional
+            Максимальное количество постов со стены, по умолчанию вся история.
+        checkpoint_path : str, optional
+            Путь к файлу контрольной точки, по умолчанию checkpoint.json в output_dir.
+        rate : float, optional
+            Количество запросов к API в секунду, по умолчанию 3.
+        incremental : bool, optional
+            Если True, со стены запрашиваются только посты новее сохраненных, по умолчанию False.
+        refresh_days : int, optional
+            Количество дней, за которые у сохраненных постов обновляются счетчики, по умолчанию 7.
+        columnar_dir : str, optional
+            Директория колоночного хранилища, по умолчанию снимки не сохраняются.
+        approximate : bool, optional
+            Если True, сводные аналитики считаются скетчами в фиксированной памяти,
+            по умолчанию False.
+        top_k : int, optional
+            Количество самых частых городов и тематик в приближенном режиме, по умолчанию 20.
+        epsilon : float, optional
+            Относительная ошибка частот в приближенном режиме, по умолчанию 0.001.
+        sample_error : float, optional
+            Допустимая абсолютная ошибка долей выборки подписчиков (например, 0.03),
+            по умолчанию подписчики не собираются.
+        """
+        dotenv.load_dotenv()
+        self.input_path = input_path
+        self.output_dir = output_dir
+        self.workers = workers
+        self.wall_limit = wall_limit
+        self.incremental = incremental
+        self.refresh_days = refresh_days
+        self.sample_error = sample_error
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.checkpoint = Checkpoint(
+            checkpoint_path or os.path.join(output_dir, "checkpoint.json")
+        )
+        self.wall_state = WallState(os.path.join(output_dir, "wall_state.json"))
+        self.persistence = PersistenceQueue()
+        self.totals = ProfileAggregators(approximate, top_k=top_k, epsilon=epsilon)
+        self.columnar = (
+            ColumnarStore(columnar_dir, self.persistence) if columnar_dir else None
+        )
+        self.profile = AsyncVkProfile(
+            os.getenv("API_KEY_VK"), rate=rate, connections=workers
+        )
+
+    def read_input(self):
+        """
+        Читает список профилей из файла.
+
+        Returns
+        -------
+        list of str
+            Короткие имена или идентификаторы пользователей без повторов.
+        """
+        names = []
+        with open(self.input_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if "vk.com/" in line:
+                    line = DataProcessor.get_user_id(line)
+                if line:
+                    names.append(line)
+        return list(dict.fromkeys(names))
+
+    async def run(self):
+        """
+        Запускает пакетный сбор данных.
+
+        Returns
+        -------
+        None
+        """
+        names = self.read_input()
+
+        async with self.profile:
+            resolved = await self.profile.resolve_users(names)
+            for name in names:
+                if name not in resolved:
+                    self.checkpoint.mark_failed(name, "not resolved")
+
+            queue = asyncio.Queue()
+            for user in {user["id"]: user for user in resolved.values()}.values():
+                if user["id"] not in self.checkpoint.done:
+                    queue.put_nowait(user)
+
+            print(
+                f"Профилей: {len(names)}, уже обработано: {len(self.checkpoint.done)}, "
+                f"в очереди: {queue.qsize()}"
+            )
+
+            async def worker():
+                while not queue.empty():
+                    user = queue.get_nowait()
+                    try:
+                        await self.scrape(user)
+                        self.checkpoint.mark_done(user["id"])
+                    except Exception as e:
+                        print(f"Ошибка при обработке пользователя {user['id']}: {e}")
+                        self.checkpoint.mark_failed(user["id"], str(e))
+
+            await asyncio.gather(*(worker() for _ in range(self.workers)))
+
+        self.save_summary()
+        self.persistence.close()
+
+        for stats in self.profile.usage():
+            print(
+                f"Токен {stats['token']}: запросов {stats['calls']}, "
+                f"ошибок {stats['errors']}, в ротации: {stats['active']}"
+            )
+
+    def save_summary(self):
+        """
+        Сохраняет сводные результаты аналитик по всем собранным профилям.
+
+        Агрегаторы каждого профиля объединяются в totals по мере завершения обработчиков,
+        поэтому сводка не требует повторного чтения сохраненных файлов. Границы ошибки
+        приближенных аналитик сохраняются в разделе 'bounds'.
+        """
+        results = self.totals.results()
+        summary = {
+            "profiles": self.totals.seen,
+            **{
+                name: frame.to_dict(orient="records") for name, frame in results.items()
+            },
+            "bounds": {
+                name: frame.attrs for name, frame in results.items() if frame.attrs
+            },
+        }
+        self.persistence.submit(os.path.join(self.output_dir, "summary.json"), summary)
+
+    async def scrape(self, user):
+        """
+        Получает и сохраняет данные одного профиля.
+
+        Файлы записываются в фоновом потоке; метод завершается, когда все они записаны,
+        поэтому контрольная точка отмечает только сохраненные профили. Наибольший id
+        полученных постов сохраняется в состояние стены тоже только после записи, иначе
+        следующий инкрементальный запуск пропустил бы посты, не попавшие на диск.
+
+        Parameters
+        ----------
+        user : dict
+            Информация о пользователе с ключами 'id' и 'domain'.
+
+        Raises
+        ------
+        ValueError
+            Возникает, если не удалось получить информацию о пользователе или профиль закрыт,
+            удален или заблокирован.
+        """
+        data = await self.profile.get_profile_data(user["id"])
+        if not data["user"]:
+            raise ValueError("user data is not available")
+        reason = unavailable_reason(data["user"][0])
+        if reason:
+            raise ValueError(f"profile is {reason}")
+
+        user_dir = os.path.join(self.output_dir, str(user["id"]))
+        os.makedirs(user_dir, exist_ok=True)
+
+        aggregators = self.totals.empty()
+        scraped_at = time.time()
+        DataProcessor.convert_user_data(data["user"][0])
+        writes = [
+            self.persistence.submit(
+                os.path.join(user_dir, "user_data.json"), data["user"][0]
+            )
+        ]
+
+        if data["friends"]:
+            DataProcessor.convert_friends_data(data["friends"])
+            aggregators.update_friends(data["friends"])
+            writes.append(
+                self.persistence.submit(
+                    os.path.join(user_dir, "friends_data.json"),
+                    data["friends"]["items"],
+                )
+            )
+        if data["groups"]:
+            aggregators.update_groups(data["groups"])
+            writes.append(
+                self.persistence.submit(
+                    os.path.join(user_dir, "groups_data.json"), data["groups"]["items"]
+                )
+            )
+
+        wall_path = os.path.join(user_dir, "wall_data.json")
+        wall_seen = WallState.summarize([])
+        wall_write = await self.scrape_wall(
+            user["id"], data["wall"], wall_path, aggregators, wall_seen, scraped_at
+        )
+        if wall_write:
+            writes.append(wall_write)
+        if self.sample_error:
+            sample_write = await self.sample_followers(user["id"], user_dir)
+            if sample_write:
+                writes.append(sample_write)
+
+        await asyncio.gather(*(asyncio.wrap_future(write) for write in writes))
+        self.wall_state.update(user["id"], wall_seen)
+        self.wall_state.save()
+        self.totals.merge(aggregators)
+
+        if self.columnar:
+            for name in ("friends", "groups"):
+                await asyncio.to_thread(
+                    self.columnar.write_table,
+                    name,
+                    user["id"],
+                    (data[name] or {}).get("items"),
+                    scraped_at,
+                )
+
+    async def sample_followers(self, user_id, user_dir):
+        """
+        Получает выборку подписчиков и сохраняет распределения с доверительными интервалами.
+
+        У больших публичных страниц подписчиков слишком много, чтобы получить их целиком,
+        поэтому размер выборки выбирается по sample_error, а распределения возрастов, полов
+        и городов сохраняются в followers_sample.json с долями и интервалами Уилсона.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        user_dir : str
+            Директория файлов пользователя.
+
+        Returns
+        -------
+        concurrent.futures.Future or None
+            Запись файла или None, если выборку получить не удалось.
+        """
+        sampler = ProfileSampler(self.profile, target_error=self.sample_error)
+        sample = await sampler.sample_async(user_id, "followers")
+        if sample is None:
+            return None
+
+        DataProcessor.convert_friends_data(sample)
+        results = {
+            name: info(sample["items"], population=sample["count"])
+            for name, info in (
+                ("ages", ages_info),
+                ("genders", geenders_info),
+                ("cities", cities_info),
+            )
+        }
+        return self.persistence.submit(
+            os.path.join(user_dir, "followers_sample.json"),
+            {
+                "count": sample["count"],
+                "sample": len(sample["items"]),
+                "sampled": sample["sampled"],
+                **{
+                    name: frame.to_dict(orient="records")
+                    for name, frame in results.items()
+                },
+                "bounds": {name: frame.attrs for name, frame in results.items()},
+            },
+        )
+
+    async def scrape_wall(
+        self, user_id, wall_data, wall_path, aggregators, wall_seen, scraped_at=None
+    ):
+        """
+        Получает посты со стены и сохраняет их в файл.
+
+        В инкрементальном режиме, если стена пользователя уже сохранялась, запрашиваются только
+        новые посты и посты из окна обновления счетчиков, которые объединяются с сохраненными.
+        Если задано колоночное хранилище, страницы стены одновременно записываются в снимок
+        Parquet, поэтому стена не перечитывается с диска.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        wall_data : dict or None
+            Первая страница ответа wall.get.
+        wall_path : str
+            Путь к файлу стены.
+        aggregators : ProfileAggregators
+            Агрегаторы профиля, в которых учитываются посты.
+        wall_seen : dict
+            Наибольший id и дата полученных постов; в состояние стены они переносятся
+            только после записи файлов. Если обход прервался, словарь не меняется, и
+            следующий инкрементальный сбор снова запрашивает посты после прежнего
+            наибольшего id.
+        scraped_at : float, optional
+            Время сбора для снимка Parquet, по умолчанию текущее время.
+
+        Returns
+        -------
+        concurrent.futures.Future or None
+            Запись объединенной стены в инкрементальном режиме или None, если стена уже
+            записана потоково.
+        """
+        crawler = WallCrawler(self.profile, max_posts=self.wall_limit)
+        scraped_at = scraped_at or time.time()
+        seen = WallState.summarize([])
+
+        def prepare_wall_page(items):
+            WallState.summarize(items, seen)
+            DataProcessor.convert_wall_data({"items": items})
+            return items
+
+        def advance_wall_state():
+            if crawler.complete:
+                wall_seen.update(seen)
+            else:
+                print(
+                    f"Стена пользователя {user_id} получена не полностью, "
+                    "состояние стены не обновлено"
+                )
+
+        known = self.wall_state.get(user_id)
+        if self.incremental and known and os.path.exists(wall_path):
+            stored = await asyncio.to_thread(read_json, wall_path)
+            fetched = []
+            await crawler.crawl_async(
+                user_id,
+                lambda items: fetched.extend(prepare_wall_page(items)),
+                first_page=wall_data,
+                known_max_id=known["max_id"],
+                refresh_since=int(time.time()) - self.refresh_days * 86400,
+            )
+            advance_wall_state()
+            wall = DataProcessor.merge_wall_data(stored, fetched)
+            aggregators.update_wall(wall)
+            if self.columnar:
+                await asyncio.to_thread(
+                    self.columnar.write_table, "wall", user_id, wall, scraped_at
+                )
+            return self.persistence.submit(wall_path, wall)
+
+        def write_wall_page(items):
+            items = prepare_wall_page(items)
+            writer.write(items)
+            if snapshot is not None:
+                snapshot.write(items)
+            aggregators.update_wall(items)
+
+        with contextlib.ExitStack() as stack:
+            writer = stack.enter_context(JsonArrayWriter(wall_path))
+            snapshot = (
+                stack.enter_context(self.columnar.wall_writer(user_id, scraped_at))
+                if self.columnar
+                else None
+            )
+            await crawler.crawl_async(user_id, write_wall_page, first_page=wall_data)
+        advance_wall_state()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Пакетный сбор данных профилей ВКонтакте"
+    )
+    parser.add_argument(
+        "input", help="файл со ссылками, короткими именами или id (по одному в строке)"
+    )
+    parser.add_argument("-o", "--output", default="data_base/batch")
+    parser.add_argument("-w", "--workers", type=int, default=4)
+    parser.add_argument("--wall-limit", type=int, default=None)
+    parser.add_argument("--checkpoint", default=None)
+    parser.add_argument("--rate", type=float, default=3)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="запрашивать только посты новее сохраненных (для повторных запусков "
+        "используйте новый файл --checkpoint)",
+    )
+    parser.add_argument("--refresh-days", type=int, default=7)
+    parser.add_argument(
+        "--parquet",
+        default=None,
+        help="директория для снимков в формате Parquet (для запросов через DuckDB)",
+    )
+    parser.add_argument(
+        "--approximate",
+        action="store_true",
+        help="считать сводные города, тематики групп и количество различных друзей "
+        "скетчами в фиксированной памяти",
+    )
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--epsilon", type=float, default=0.001)
+    parser.add_argument(
+        "--sample-error",
+        type=float,
+        default=None,
+        help="собирать случайную выборку подписчиков с заданной ошибкой долей "
+        "(например, 0.03) и сохранять распределения с доверительными интервалами",
+    )
+    args = parser.parse_args()
+
+    app = VkBatchApp(
+        args.input,
+        args.output,
+        workers=args.workers,
+        wall_limit=args.wall_limit,
+        checkpoint_path=args.checkpoint,
+        rate=args.rate,
+        incremental=args.incremental,
+        refresh_days=args.refresh_days,
+        columnar_dir=args.parquet,
+        approximate=args.approximate,
+        top_k=args.top_k,
+        epsilon=args.epsilon,
+        sample_error=args.sample_error,
+    )
+    asyncio.run(app.run())
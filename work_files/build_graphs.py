@@ -216,9 +216,7 @@ class BuildGraphs:
                     clearable=False,
                 ),
                 html.Br(),
-                html.P(
-                    "Статистика активности пользователя по месяцам за последние 100 публикаций"
-                ),
+                html.P("Статистика активности пользователя по месяцам"),
                 dcc.Graph(id="graph"),
                 dcc.Store(id="stats_store", data=data_json),
                 html.Br(),
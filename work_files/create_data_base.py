@@ -1,9 +1,21 @@
 import os
 import sys
+import time
 
 import dotenv
+from scraper.aggregators import ProfileAggregators
+from scraper.columnar_store import ColumnarStore
 from scraper.data_processor import DataProcessor
-from scraper.take_profile_info import VkProfile
+from scraper.friends_graph import FriendsGraphCrawler
+from scraper.profile_store import ProfileStore
+from scraper.snapshot_store import SnapshotStore
+from scraper.take_profile_info import VkProfile, unavailable_reason
+from scraper.wall_crawler import WallCrawler
+
+DATA_BASE_PATH = os.getenv(
+    "DATA_BASE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_base"),
+)
 
 
 class VkApp:
@@ -13,7 +25,7 @@ class VkApp:
     Attributes
     ----------
     token : str
-        Токен доступа VK API.
+        Токен доступа VK API или несколько токенов через запятую.
     profile : VkProfile
         Экземпляр класса VkProfile для взаимодействия с VK API.
     user_name : str
@@ -22,14 +34,59 @@ class VkApp:
         Идентификатор пользователя.
     user_domain : str
         Доменное имя пользователя.
+    crawler : WallCrawler
+        Обходчик стены пользователя.
+    graph_depth : int or None
+        Глубина обхода графа друзей; None — граф не строится.
+    incremental : bool
+        Если True, со стены запрашиваются только посты новее сохраненных.
+    refresh_days : int
+        Количество дней, за которые у сохраненных постов обновляются счетчики.
+    store : ProfileStore
+        Хранилище собранных профилей.
+    snapshots : SnapshotStore
+        История сборов профиля в виде цепочки изменений.
+    columnar : ColumnarStore or None
+        Колоночное хранилище снимков для аналитики по многим профилям; None — снимки
+        не сохраняются.
+    data : dict or None
+        Обработанные данные профиля с ключами 'user', 'friends', 'groups' и 'wall'.
+    unavailable : str or None
+        Причина недоступности профиля ('closed', 'deleted' или 'banned'), если он недоступен.
+    aggregators : ProfileAggregators
+        Потоковые агрегаторы аналитик, которые обновляются по мере получения страниц.
+    on_progress : callable or None
+        Функция on_progress(aggregators), вызываемая после каждой учтенной страницы.
 
     Methods
     -------
     run()
         Получает и обрабатывает данные профиля пользователя.
+    update_wall(wall_data, known_max_id)
+        Запрашивает новые посты и обновляет счетчики сохраненных.
+    replace_wall(wall_data, known_max_id)
+        Обходит всю стену и заменяет ею сохраненную.
+    save_wall_page(items, aggregate=True, staged=False)
+        Конвертирует страницу постов и сохраняет ее в хранилище.
+    report_progress()
+        Передает промежуточные результаты в on_progress.
     """
 
-    def __init__(self, url):
+    def __init__(
+        self,
+        url,
+        batch=True,
+        wall_limit=None,
+        wall_since=None,
+        graph_depth=None,
+        incremental=False,
+        refresh_days=7,
+        store=None,
+        columnar=None,
+        persistence=None,
+        snapshots=None,
+        on_progress=None,
+    ):
         """
         Инициализирует VkApp с указанным URL профиля пользователя ВКонтакте.
 
@@ -37,14 +94,55 @@ class VkApp:
         ----------
         url : str
             URL профиля пользователя ВКонтакте.
+        batch : bool, optional
+            Если True, данные профиля запрашиваются одним вызовом execute, по умолчанию True.
+        wall_limit : int, optional
+            Максимальное количество постов со стены, по умолчанию вся история.
+        wall_since : datetime or int, optional
+            Дата, раньше которой посты не запрашиваются, по умолчанию не задана.
+        graph_depth : int, optional
+            Глубина обхода графа друзей (2 — друзья друзей), по умолчанию граф не строится.
+        incremental : bool, optional
+            Если True, со стены запрашиваются только посты новее сохраненных, по умолчанию False.
+        refresh_days : int, optional
+            Количество дней, за которые у сохраненных постов обновляются счетчики, по умолчанию 7.
+        store : ProfileStore, optional
+            Хранилище собранных профилей, по умолчанию открывается база data_base/profiles.db.
+        columnar : ColumnarStore or str, optional
+            Колоночное хранилище или путь к его директории, по умолчанию снимки в формате
+            Parquet не сохраняются.
+        persistence : PersistenceQueue, optional
+            Очередь фоновой записи снимков, если columnar передан путем, по умолчанию снимки
+            записываются сразу.
+        snapshots : SnapshotStore, optional
+            История сборов профиля, по умолчанию хранится в той же базе, что и store.
+        on_progress : callable, optional
+            Функция on_progress(aggregators), вызываемая после каждой страницы друзей, групп
+            и постов, например, чтобы показать промежуточные результаты, по умолчанию
+            не задана.
         """
         dotenv.load_dotenv()
         self.token = os.getenv("API_KEY_VK")
-        self.profile = VkProfile(self.token)
+        self.profile = VkProfile(self.token, batch=batch)
+        self.crawler = WallCrawler(self.profile, max_posts=wall_limit, since=wall_since)
+        self.graph_depth = graph_depth
+        self.incremental = incremental
+        self.refresh_days = refresh_days
+        self.store = store or ProfileStore()
+        self.snapshots = snapshots or SnapshotStore(self.store.path)
+        self.columnar = (
+            ColumnarStore(columnar, persistence)
+            if isinstance(columnar, str)
+            else columnar
+        )
 
         self.user_name = DataProcessor.get_user_id(url)
-        self.user_id = self.profile.get_user_info(self.user_name)[0]["id"]
-        self.user_domain = self.profile.get_user_info(self.user_name)[0]["domain"]
+        self.user_id = None
+        self.user_domain = None
+        self.data = None
+        self.unavailable = None
+        self.aggregators = ProfileAggregators()
+        self.on_progress = on_progress
 
         self.run()
 
@@ -53,34 +151,180 @@ class VkApp:
         Получает и обрабатывает данные профиля пользователя.
 
         Получает данные профиля, друзей, групп и стены пользователя. Затем обрабатывает эти данные
-        и сохраняет их в файлы JSON.
+        и сохраняет их в хранилище, а изменения относительно предыдущего сбора — в историю
+        профиля. Стена обходится постранично, каждая страница сохраняется в новую версию стены
+        сразу после получения, а прежние посты заменяются ею после успешного обхода. Каждая
+        страница друзей, групп и постов сразу учитывается в потоковых агрегаторах, поэтому
+        промежуточные результаты доступны до окончания сбора. Для закрытых, удаленных
+        и заблокированных профилей данные не сохраняются, а причина записывается в атрибут
+        unavailable.
         """
+        data = self.profile.get_profile_data(self.user_name)
+        if data["user"]:
+            self.unavailable = unavailable_reason(data["user"][0])
+            if self.unavailable:
+                self.user_id = data["user"][0]["id"]
+                print(f"Профиль {self.user_id} недоступен: {self.unavailable}")
+                return
+            self.user_id = data["user"][0]["id"]
+            self.user_domain = data["user"][0]["domain"]
+
         if self.user_id:
-            user_data = self.profile.get_user_info(self.user_id)
-            friends_data = self.profile.get_friends_info(self.user_id)
-            groups_data = self.profile.get_groups_info(self.user_id)
-            wall_data = self.profile.get_wall_info(self.user_id, self.user_domain)
+            user_data = data["user"]
+            friends_data = data["friends"]
+            groups_data = data["groups"]
+            wall_data = data["wall"]
 
             DataProcessor.convert_user_data(user_data[0])
             DataProcessor.convert_friends_data(friends_data)
-            DataProcessor.convert_wall_data(wall_data)
-
-            DataProcessor.save_data(
-                "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/user_data.json",
-                user_data[0],
-            )
-            DataProcessor.save_data(
-                "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/friends_data.json",
-                friends_data["items"],
-            )
-            DataProcessor.save_data(
-                "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/groups_data.json",
-                groups_data["items"],
+            self.store.save_profile(
+                user_data[0], friends_data["items"], groups_data["items"]
             )
-            DataProcessor.save_data(
-                "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/wall_data.json",
-                wall_data["items"],
+            self.aggregators.update_friends(friends_data["items"])
+            self.aggregators.update_groups(groups_data["items"])
+            self.report_progress()
+
+            known_max_id = self.store.max_post_id(self.user_id)
+            if self.incremental and known_max_id is not None:
+                self.update_wall(wall_data, known_max_id)
+                self.aggregators.update_wall(self.store.get_wall(self.user_id))
+                self.report_progress()
+            else:
+                self.replace_wall(wall_data, known_max_id)
+
+            self.data = self.store.load_profile(self.user_id)
+            self.snapshots.record(
+                self.user_id,
+                self.data["user"],
+                self.data["friends"],
+                self.data["groups"],
+                self.data["wall"],
+                scraped_at=self.data["scraped_at"],
             )
+            if self.columnar:
+                self.columnar.write_snapshot(
+                    self.user_id,
+                    self.data["friends"],
+                    self.data["groups"],
+                    self.data["wall"],
+                    scraped_at=self.data["scraped_at"],
+                )
+
+            if self.graph_depth:
+                graph = FriendsGraphCrawler(self.profile, depth=self.graph_depth).crawl(
+                    self.user_id
+                )
+                graph.save(
+                    os.path.join(DATA_BASE_PATH, f"friends_graph_{self.user_id}.npz")
+                )
+
+    def update_wall(self, wall_data, known_max_id):
+        """
+        Запрашивает новые посты и обновляет счетчики сохраненных.
+
+        Стена обходится только до первого известного поста, который старше окна обновления
+        счетчиков. Посты внутри окна перезаписываются в хранилище вместе с лайками,
+        просмотрами, комментариями и репостами. Страницы сохраняются в новую версию стены
+        и добавляются к сохраненным постам только если обход завершился без ошибок: иначе
+        наибольший id сохраненного поста сдвинулся бы за пропущенные посты, и следующий
+        обход их бы уже не запросил.
+
+        Parameters
+        ----------
+        wall_data : dict or None
+            Первая страница ответа wall.get.
+        known_max_id : int
+            Наибольший id сохраненного поста.
+        """
+        self.store.discard_staged(self.user_id)
+        self.crawler.crawl(
+            self.user_id,
+            lambda items: self.save_wall_page(items, aggregate=False, staged=True),
+            first_page=wall_data,
+            known_max_id=known_max_id,
+            refresh_since=int(time.time()) - self.refresh_days * 86400,
+        )
+        if self.crawler.complete:
+            self.store.merge_staged(self.user_id)
+            return
+
+        print(
+            f"Стена пользователя {self.user_id} получена не полностью, "
+            "новые посты будут запрошены при следующем сборе"
+        )
+        self.store.discard_staged(self.user_id)
+
+    def replace_wall(self, wall_data, known_max_id):
+        """
+        Обходит всю стену и заменяет ею сохраненную.
+
+        Страницы сохраняются в новую версию стены, а сохраненные посты заменяются ею одной
+        транзакцией только если обход завершился без ошибок, поэтому читатели не видят
+        пустую или неполную стену, а история профиля не принимает пропущенные посты
+        за удаленные. Если обход прервался, остаются прежние посты, а агрегаторы постов
+        пересчитываются по ним; неполная стена сохраняется только для профиля, стена
+        которого раньше не сохранялась.
+
+        Parameters
+        ----------
+        wall_data : dict or None
+            Первая страница ответа wall.get.
+        known_max_id : int or None
+            Наибольший id сохраненного поста или None, если стена не сохранялась.
+        """
+        self.store.discard_staged(self.user_id)
+        self.crawler.crawl(
+            self.user_id,
+            lambda items: self.save_wall_page(items, staged=True),
+            first_page=wall_data,
+        )
+        if self.crawler.complete or known_max_id is None:
+            self.store.replace_wall(self.user_id)
+            return
+
+        print(
+            f"Стена пользователя {self.user_id} получена не полностью, "
+            "сохраненные посты оставлены без изменений"
+        )
+        self.store.discard_staged(self.user_id)
+        self.aggregators.reset_wall()
+        self.aggregators.update_wall(self.store.get_wall(self.user_id))
+        self.report_progress()
+
+    def save_wall_page(self, items, aggregate=True, staged=False):
+        """
+        Конвертирует страницу постов и сохраняет ее в хранилище.
+
+        Parameters
+        ----------
+        items : list of dict
+            Посты очередной страницы.
+        aggregate : bool, optional
+            Если True, страница учитывается в агрегаторах, по умолчанию True. При
+            инкрементальном обходе страницы содержат уже учтенные посты, поэтому агрегаторы
+            обновляются по всей стене после обхода.
+        staged : bool, optional
+            Если True, страница сохраняется в новую версию стены, по умолчанию False.
+        """
+        DataProcessor.convert_wall_data({"items": items})
+        if staged:
+            self.store.stage_posts(self.user_id, items)
+        else:
+            self.store.add_posts(self.user_id, items)
+        if aggregate:
+            self.aggregators.update_wall(items)
+            self.report_progress()
+
+    def report_progress(self):
+        """
+        Передает промежуточные результаты в on_progress.
+        """
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(self.aggregators)
+        except Exception as e:
+            print(f"Ошибка при передаче промежуточных результатов: {e}")
 
 
 if __name__ == "__main__":
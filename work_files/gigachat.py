@@ -1,9 +1,10 @@
 import json
-import os
 
 import requests
 import urllib3
 from get_sber_token import GigaChatToken
+from scraper.profile_store import ProfileStore
+from scraper.report_builder import ReportBuilder
 from scraper.scraper_json import UserProfileParser
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -21,15 +22,31 @@ class GigaChat:
         Токен аутентификации для доступа к GigaChat API.
     parser : UserProfileParser
         Объект для парсинга данных пользователя.
+    reports : ReportBuilder
+        Построитель отчетов, вычисляющий все аналитики профиля параллельно.
+    store : ProfileStore
+        Хранилище собранных профилей.
     """
 
-    def __init__(self):
+    def __init__(self, store=None, parser=None, reports=None):
         """
         Инициализация класса GigaChat.
+
+        Parameters
+        ----------
+        store : ProfileStore, optional
+            Хранилище собранных профилей, по умолчанию открывается база data_base/profiles.db.
+        parser : UserProfileParser, optional
+            Парсер профилей, кэш результатов которого используется повторно, по умолчанию
+            создается новый.
+        reports : ReportBuilder, optional
+            Построитель отчетов, по умолчанию создается новый для parser.
         """
         self.api_url = "https://gigachat.devices.sberbank.ru/api/v1/chat/completions"
         self.token = GigaChatToken().return_token()
-        self.parser = UserProfileParser()
+        self.parser = parser or UserProfileParser()
+        self.reports = reports or ReportBuilder(self.parser)
+        self.store = store or ProfileStore()
 
     def load_data(self, filepath):
         """
@@ -52,52 +69,47 @@ class GigaChat:
             print(f"Ошибка при загрузке данных из файла {filepath}: {str(e)}")
             return None
 
-    def get_data(self):
+    def get_data(self, data=None, user_id=None, report=None):
         """
-        Загружает и обрабатывает данные пользователя из файлов.
+        Загружает и обрабатывает данные пользователя из хранилища.
+
+        Parameters
+        ----------
+        data : dict, optional
+            Уже собранные данные профиля с ключами 'user', 'friends', 'groups' и 'wall'.
+            Если не переданы, данные загружаются из хранилища.
+        user_id : int, optional
+            Идентификатор пользователя, данные которого загружаются из хранилища, по умолчанию
+            последний собранный пользователь.
+        report : ProfileReport, optional
+            Уже построенный отчет по профилю; если передан, аналитики не вычисляются заново.
 
         Returns
         -------
         tuple of DataFrame or None
             Кортеж, содержащий обработанные данные в виде DataFrame, или None, если произошла ошибка.
         """
-        base_path = "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base"
-        df_friends = self.load_data(os.path.join(base_path, "friends_data.json"))
-        df_user = self.load_data(os.path.join(base_path, "user_data.json"))
-        df_groups = self.load_data(os.path.join(base_path, "groups_data.json"))
-        df_wall = self.load_data(os.path.join(base_path, "wall_data.json"))
-
-        if (
-            df_friends is None
-            or df_user is None
-            or df_groups is None
-            or df_wall is None
-        ):
-            print("Ошибка при загрузке данных.")
-            return None, None, None, None, None, None, None, None
+        if report is None:
+            if data is None:
+                data = self.store.load_profile(user_id or self.store.latest_user_id())
+            if data is None:
+                print("Ошибка при загрузке данных.")
+                return None, None, None, None, None, None, None, None
+            report = self.reports.build(data)
 
-        try:
-            age_friends = self.parser.get_ages_friends(df_friends)
-            general_user_info = self.parser.get_user_info(df_user)
-            genders_friends = self.parser.get_genders_friends(df_friends)
-            cities_friends = self.parser.get_cities_friends(df_friends)
-            stats = self.parser.get_stat(df_wall)
-            marks = self.parser.get_marks(df_wall)
-            interests = self.parser.get_interests(df_groups)
-            toxicity = self.parser.get_toxic(df_wall)
-        except AttributeError as e:
-            print(f"Ошибка в обработке данных: {str(e)}")
+        if report.errors:
+            print(f"Ошибка в обработке данных: {', '.join(report.errors)}")
             return None, None, None, None, None, None, None, None
 
         return (
-            age_friends,
-            general_user_info,
-            genders_friends,
-            cities_friends,
-            stats,
-            marks,
-            interests,
-            toxicity,
+            report["ages"],
+            report["user_info"],
+            report["genders"],
+            report["cities"],
+            report["stat"],
+            report["marks"],
+            report["interests"],
+            report["toxic"],
         )
 
     def prepare_payload(self, user_message):
@@ -159,14 +171,37 @@ class GigaChat:
             print(f"Ошибка при выполнении запроса: {str(e)}")
             return None
 
-    def create_request(self):
+    def create_request(self, data=None, user_id=None, report=None):
         """
-        Загружает данные, отправляет их к GigaChat API частями и сохраняет ответы в файл.
+        Загружает данные, отправляет их к GigaChat API частями и сохраняет ответы в хранилище.
+
+        Parameters
+        ----------
+        data : dict, optional
+            Уже собранные данные профиля. Если не переданы, данные загружаются из хранилища.
+        user_id : int, optional
+            Идентификатор пользователя, данные которого загружаются из хранилища, по умолчанию
+            последний собранный пользователь.
+        report : ProfileReport, optional
+            Уже построенный отчет по профилю; если передан, данные не загружаются.
+
+        Returns
+        -------
+        dict or None
+            Ответы GigaChat API или None, если произошла ошибка.
         """
         if not self.token:
             print("Не удалось получить токен.")
             return
 
+        if report is None:
+            if data is None:
+                data = self.store.load_profile(user_id or self.store.latest_user_id())
+            if data is None:
+                print("Ошибка при загрузке данных.")
+                return
+            report = self.reports.build(data)
+
         (
             age_friends,
             general_user_info,
@@ -176,7 +211,7 @@ class GigaChat:
             marks,
             interests,
             toxicity,
-        ) = self.get_data()
+        ) = self.get_data(report=report)
 
         if age_friends is None:
             print("Ошибка при обработке данных.")
@@ -228,9 +263,6 @@ class GigaChat:
             f"Оценка токсичности пользователя по переданным данным, которые содержат вероятности нетоксичности, грубость, непристойности, агрессивности, опасности пользователя. Если нет значений, то написать, что нет сведений о токсичности:\n{toxicity_json}"
         )
 
-        with open(
-            "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/gigachat_response.json",
-            "w",
-            encoding="utf-8",
-        ) as f:
-            json.dump(responses, f, ensure_ascii=False, indent=2)
+        self.store.save_gigachat_response(report.user_id, responses)
+
+        return responses
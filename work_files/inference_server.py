@@ -0,0 +1,45 @@
+import argparse
+import os
+
+import dotenv
+from scraper.inference_service import DEFAULT_SOCKET_PATH, InferenceServer
+from scraper.model_registry import TOXIC_MODEL
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(
+        description="Сервис инференса модели токсичности для всех процессов дэшборда"
+    )
+    parser.add_argument(
+        "socket",
+        nargs="?",
+        default=os.getenv("TOXIC_SERVICE", DEFAULT_SOCKET_PATH),
+        help="путь к Unix-сокету (его же нужно указать в TOXIC_SERVICE у клиентов)",
+    )
+    parser.add_argument("--model", default=TOXIC_MODEL)
+    parser.add_argument("--backend", choices=["torch", "onnx"], default=None)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument(
+        "--max-wait",
+        type=float,
+        default=10,
+        help="сколько миллисекунд ждать запросы других сессий перед запуском пакета",
+    )
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=1024,
+        help="сколько текстов может ждать в очереди, прежде чем запросы отклоняются",
+    )
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    InferenceServer(
+        args.socket,
+        model=args.model,
+        backend=args.backend,
+        max_batch=args.max_batch,
+        max_wait=args.max_wait / 1000,
+        max_pending=args.max_pending,
+        threads=args.threads,
+    ).serve_forever()
@@ -1,20 +1,58 @@
 import json
+import os
 
 import dash_bootstrap_components as dbc
+import dotenv
+import plotly.express as px
 from build_graphs import BuildGraphs
 from create_data_base import VkApp
-from dash import Input, Output, State, dcc, html
+from dash import Input, Output, State, ctx, dcc, html
 from gigachat import GigaChat
+from scraper.data_processor import DataProcessor
+from scraper.model_registry import registry
+from scraper.persistence import PersistenceQueue
+from scraper.profile_store import ProfileStore
+from scraper.report_builder import ReportBuilder
+from scraper.scrape_cache import ProfileUnavailable, ScrapeCache
+from scraper.snapshot_store import SnapshotStore
+from scraper.take_profile_info import VkProfile
 
 
 class DashboardBuilder(BuildGraphs):
     """
     Класс для создания и запуска веб-дэшборда с использованием Dash и Plotly.
 
+    Attributes
+    ----------
+    cache : ScrapeCache
+        Кэш собранных данных профилей; время жизни задается переменной окружения
+        SCRAPE_CACHE_TTL (в секундах, по умолчанию 3600), а для недоступных профилей —
+        SCRAPE_NEGATIVE_TTL (в секундах, по умолчанию 300), а размер — SCRAPE_CACHE_SIZE
+        (по умолчанию 256 профилей).
+    profile : VkProfile or None
+        Клиент VK API для разрешения коротких имен, создается при первом запросе.
+    store : ProfileStore
+        Хранилище собранных профилей, общее для всех сессий дэшборда.
+    snapshots : SnapshotStore
+        История сборов профилей в той же базе, что и store.
+    progress : dict
+        Промежуточные результаты сборов, которые еще не завершились, по короткому имени или
+        id пользователя: количество учтенных друзей, групп и постов и результаты аналитик.
+    reports : ReportBuilder
+        Построитель отчетов, который сразу после сбора вычисляет все аналитики профиля
+        параллельно; отчет хранится в cache вместо данных профиля.
+    persistence : PersistenceQueue
+        Очередь фоновой записи снимков Parquet, которые сохраняются, если задана переменная
+        окружения COLUMNAR_STORE_PATH.
+
     Methods
     -------
     load_data(filepath)
         Загружает данные из указанного файла.
+    resolve_user(user_name)
+        Возвращает идентификатор пользователя по короткому имени.
+    scrape(url)
+        Собирает данные профиля пользователя.
     build_layout()
         Создает макет веб-дэшборда.
     build_callbacks()
@@ -26,8 +64,26 @@ class DashboardBuilder(BuildGraphs):
     def __init__(self):
         """
         Инициализирует экземпляр DashboardBuilder.
+
+        Модель токсичности загружается в фоновом потоке, пока дэшборд запускается; это можно
+        отключить переменной окружения TOXIC_WARM_UP=0. Если задан сервис инференса
+        (переменная окружения TOXIC_SERVICE), модель загружает он, а не дэшборд.
         """
         super().__init__()
+        self.cache = ScrapeCache(
+            ttl=float(os.getenv("SCRAPE_CACHE_TTL", "3600")),
+            negative_ttl=float(os.getenv("SCRAPE_NEGATIVE_TTL", "300")),
+            max_entries=int(os.getenv("SCRAPE_CACHE_SIZE", "256")),
+            resolver=self.resolve_user,
+        )
+        self.profile = None
+        self.store = ProfileStore()
+        self.snapshots = SnapshotStore(self.store.path)
+        self.progress = {}
+        self.reports = ReportBuilder(self.parser)
+        self.persistence = PersistenceQueue()
+        if os.getenv("TOXIC_WARM_UP", "1") != "0" and not os.getenv("TOXIC_SERVICE"):
+            registry.warm_up()
 
     def load_data(self, filepath):
         """
@@ -46,6 +102,81 @@ class DashboardBuilder(BuildGraphs):
         with open(filepath) as f:
             return json.load(f)
 
+    def resolve_user(self, user_name):
+        """
+        Возвращает идентификатор пользователя по короткому имени.
+
+        Parameters
+        ----------
+        user_name : str
+            Короткое имя пользователя.
+
+        Returns
+        -------
+        int or None
+            Идентификатор пользователя или None, если имя принадлежит не пользователю.
+        """
+        if self.profile is None:
+            dotenv.load_dotenv()
+            self.profile = VkProfile(os.getenv("API_KEY_VK"))
+        response = self.profile.method("utils.resolveScreenName", screen_name=user_name)
+        if response and response.get("type") == "user":
+            return response["object_id"]
+        return None
+
+    def scrape(self, url):
+        """
+        Собирает данные профиля пользователя.
+
+        Пока профиль собирается, промежуточные результаты потоковых агрегаторов доступны
+        в атрибуте progress. Результаты аналитики, сохраненные для предыдущего сбора этого
+        профиля, удаляются из кэша.
+
+        Parameters
+        ----------
+        url : str
+            URL профиля пользователя ВКонтакте.
+
+        Returns
+        -------
+        tuple of (int, ProfileReport) or None
+            Идентификатор пользователя и отчет со всеми аналитиками профиля или None,
+            если произошла ошибка.
+
+        Raises
+        ------
+        ProfileUnavailable
+            Возникает, если профиль закрыт, удален или заблокирован.
+        """
+        user_name = DataProcessor.get_user_id(url)
+
+        def report_progress(aggregators):
+            self.progress[user_name] = {
+                "seen": dict(aggregators.seen),
+                "results": aggregators.results(),
+            }
+
+        try:
+            app = VkApp(
+                url,
+                store=self.store,
+                snapshots=self.snapshots,
+                columnar=os.getenv("COLUMNAR_STORE_PATH"),
+                persistence=self.persistence,
+                on_progress=report_progress,
+            )
+        except Exception as e:
+            print(f"Ошибка при получении данных: {e}")
+            return None
+        finally:
+            self.progress.pop(user_name, None)
+        if app.unavailable:
+            raise ProfileUnavailable(app.user_id, app.unavailable)
+        if app.data is None:
+            return None
+        self.parser.results.invalidate(app.user_id)
+        return app.user_id, self.reports.build(app.data, app.user_id)
+
     def build_layout(self):
         """
         Создает макет веб-дэшборда.
@@ -71,6 +202,11 @@ class DashboardBuilder(BuildGraphs):
                             id="button",
                             n_clicks=0,
                         ),
+                        html.Button(
+                            "Refresh",
+                            id="refresh_button",
+                            n_clicks=0,
+                        ),
                     ]
                 ),
                 dcc.Dropdown(
@@ -89,6 +225,8 @@ class DashboardBuilder(BuildGraphs):
                         ]
                     ],
                 ),
+                html.Div(id="progress_output"),
+                dcc.Interval(id="progress_interval", interval=1000),
                 dcc.Loading(
                     id="loading-info-output",
                     children=[html.Div(id="info_output")],
@@ -111,77 +249,89 @@ class DashboardBuilder(BuildGraphs):
 
         @self.app.callback(
             Output("info_output", "children"),
-            [Input("button", "n_clicks"), Input("info_dropdown", "value")],
+            [
+                Input("button", "n_clicks"),
+                Input("info_dropdown", "value"),
+                Input("refresh_button", "n_clicks"),
+            ],
             [State("input_link", "value")],
         )
-        def process_url(n_clicks, selected_info, url):
+        def process_url(n_clicks, selected_info, refresh_clicks, url):
             if n_clicks > 0 and url:
                 try:
-                    VkApp(url)
-                except Exception as e:
-                    print(f"Ошибка при получении данных: {e}")
+                    report = self.cache.get_or_scrape(
+                        DataProcessor.get_user_id(url),
+                        lambda: self.scrape(url),
+                        force=ctx.triggered_id == "refresh_button",
+                    )
+                except ProfileUnavailable as e:
+                    return html.Div(html.P(f"Профиль недоступен: {e.reason}"))
+                if report is None:
+                    return html.Div()
 
                 if selected_info == "Data user":
-                    json = self.load_data(
-                        "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/user_data.json"
-                    )
-                    data = self.parser.get_user_info(json)
-                    return self.build_user_info(data)
+                    return self.build_user_info(report["user_info"])
 
                 elif selected_info == "Ages of friends":
-                    json = self.load_data(
-                        "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/friends_data.json"
-                    )
-                    data = self.parser.get_ages_friends(json)
-                    return self.build_ages_friends(data)
+                    return self.build_ages_friends(report["ages"])
 
                 elif selected_info == "Gender of friends":
-                    json = self.load_data(
-                        "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/friends_data.json"
-                    )
-                    data = self.parser.get_genders_friends(json)
-                    return self.build_genders_friends(data)
+                    return self.build_genders_friends(report["genders"])
 
                 elif selected_info == "Cites of friends":
-                    json = self.load_data(
-                        "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/friends_data.json"
-                    )
-                    data = self.parser.get_cities_friends(json)
-                    return self.build_map_friends(data)
+                    return self.build_map_friends(report["cities"])
 
                 elif selected_info == "Stats":
-                    json = self.load_data(
-                        "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/wall_data.json"
-                    )
-                    data = self.parser.get_stat(json)
-                    table = self.parser.get_marks(json)
-                    return self.build_stats(data, table)
+                    return self.build_stats(report["stat"], report["marks"])
 
                 elif selected_info == "Interests":
-                    json = self.load_data(
-                        "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/groups_data.json"
-                    )
-                    data = self.parser.get_interests(json)
-                    return self.build_interests(data)
+                    return self.build_interests(report["interests"])
 
                 elif selected_info == "Toxicity":
-                    json = self.load_data(
-                        "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/wall_data.json"
-                    )
-                    data = self.parser.get_toxic(json)
-                    return self.build_toxicity(data)
+                    return self.build_toxicity(report["toxic"])
 
                 elif selected_info == "GigaChat":
-                    chat = GigaChat()
-                    chat.create_request()
-                    json = self.load_data(
-                        "/home/xxxkoshaster/Documents/Zagadka/work_files/data_base/gigachat_response.json"
-                    )
-                    data = self.parser.get_gigachat_answer(json)
+                    chat = GigaChat(self.store, self.parser, self.reports)
+                    responses = chat.create_request(report=report)
+                    data = self.parser.get_gigachat_answer(responses or {})
                     return self.build_gigachat_response(data)
 
             return html.Div()
 
+        @self.app.callback(
+            Output("progress_output", "children"),
+            [Input("progress_interval", "n_intervals")],
+            [State("input_link", "value"), State("info_dropdown", "value")],
+        )
+        def show_progress(n_intervals, url, selected_info):
+            if not url:
+                return html.Div()
+            progress = self.progress.get(DataProcessor.get_user_id(url))
+            if progress is None:
+                return html.Div()
+
+            seen = progress["seen"]
+            results = progress["results"]
+            children = [
+                html.P(
+                    f"Идет сбор данных: друзей {seen['friends']}, групп {seen['groups']}, "
+                    f"постов {seen['wall']}"
+                )
+            ]
+            if selected_info == "Ages of friends":
+                figure = px.bar(results["ages"], x="Age", y="Count")
+            elif selected_info == "Gender of friends":
+                figure = px.pie(results["genders"], names="Sex", values="Count")
+            elif selected_info == "Stats":
+                figure = px.bar(results["stat"], x="Mounth", y="Count posts")
+            elif selected_info == "Interests":
+                figure = px.bar(results["interests"], x="Activities", y="States")
+            else:
+                figure = None
+            if figure is not None:
+                children.append(dcc.Graph(figure=figure))
+            return html.Div(children)
+
     def run(self):
         """
         Запускает веб-дэшборд.
@@ -197,6 +347,8 @@ class DashboardBuilder(BuildGraphs):
         self.build_interests_color_picker()
         self.build_toxicity_color_picker()
         self.app.run_server(debug=True)
+        self.reports.close()
+        self.persistence.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,844 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scraper.data_processor import COUNTER_KEYS
+from scraper.friends_frame import MAX_AGE, MIN_AGE, FriendsFrame
+from scraper.records import SEX_LABELS, decode_groups, decode_wall
+from scraper.sketches import HyperLogLog, TopKSketch, hash_values
+
+
+class CountAggregator:
+    """
+    Счетчик значений, сохраняющий порядок их первого появления.
+
+    Attributes
+    ----------
+    counts : dict
+        Количество появлений каждого значения.
+
+    Methods
+    -------
+    update(values)
+        Учитывает значения.
+    add(value, count)
+        Увеличивает счетчик значения.
+    merge(other)
+        Добавляет счетчики другого агрегатора.
+    to_frame(columns)
+        Возвращает счетчики в виде DataFrame.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def update(self, values):
+        """
+        Учитывает значения; значения None пропускаются.
+
+        Parameters
+        ----------
+        values : iterable
+            Значения.
+        """
+        for value in values:
+            if value is not None:
+                self.counts[value] = self.counts.get(value, 0) + 1
+
+    def add(self, value, count):
+        """
+        Увеличивает счетчик значения.
+
+        Parameters
+        ----------
+        value : object
+            Значение.
+        count : int
+            Количество появлений.
+        """
+        self.counts[value] = self.counts.get(value, 0) + count
+
+    def merge(self, other):
+        """
+        Добавляет счетчики другого агрегатора.
+
+        Parameters
+        ----------
+        other : CountAggregator
+            Агрегатор, например, с другой страницы или из другого потока.
+        """
+        for value, count in other.counts.items():
+            self.add(value, count)
+
+    def to_frame(self, columns):
+        """
+        Возвращает счетчики в виде DataFrame.
+
+        Parameters
+        ----------
+        columns : list of str
+            Названия столбцов значения и количества.
+
+        Returns
+        -------
+        pd.DataFrame
+            Значения в порядке первого появления и их количество.
+        """
+        return pd.DataFrame(list(self.counts.items()), columns=columns)
+
+
+class AgesAggregator:
+    """
+    Гистограмма годов рождения друзей.
+
+    Attributes
+    ----------
+    years : np.ndarray
+        Количество друзей по году рождения (индекс массива — год).
+
+    Methods
+    -------
+    update(friends)
+        Учитывает страницу друзей.
+    merge(other)
+        Добавляет гистограмму другого агрегатора.
+    result(year=None)
+        Возвращает распределение возрастов, как ages_info.
+    """
+
+    def __init__(self):
+        self.years = np.zeros(0, dtype=np.int64)
+
+    def add(self, counts):
+        """
+        Прибавляет гистограмму годов рождения.
+
+        Parameters
+        ----------
+        counts : np.ndarray
+            Количество друзей по году рождения.
+        """
+        if len(counts) > len(self.years):
+            self.years = np.pad(self.years, (0, len(counts) - len(self.years)))
+        self.years[: len(counts)] += counts
+
+    def update(self, friends):
+        """
+        Учитывает страницу друзей.
+
+        Parameters
+        ----------
+        friends : list of dict or list of Friend or FriendsFrame
+            Страница друзей.
+        """
+        frame = FriendsFrame.from_friends(friends)
+        self.add(np.bincount(frame.birth_year[frame.birth_year > 0]))
+
+    def merge(self, other):
+        """
+        Добавляет гистограмму другого агрегатора.
+
+        Parameters
+        ----------
+        other : AgesAggregator
+            Другой агрегатор.
+        """
+        self.add(other.years)
+
+    def result(self, year=None):
+        """
+        Возвращает распределение возрастов.
+
+        Parameters
+        ----------
+        year : int, optional
+            Год, на который считается возраст, по умолчанию текущий.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'Age' и 'Count', упорядоченные по возрасту.
+        """
+        year = year or datetime.now().year
+        born = np.flatnonzero(self.years)
+        ages = year - born
+        keep = (ages > MIN_AGE) & (ages < MAX_AGE)
+        order = np.argsort(ages[keep], kind="stable")
+        return pd.DataFrame(
+            {"Age": ages[keep][order], "Count": self.years[born[keep]][order]}
+        )
+
+
+class GendersAggregator:
+    """
+    Счетчик полов друзей.
+
+    Attributes
+    ----------
+    counts : CountAggregator
+        Количество друзей по коду пола в порядке первого появления.
+    sex_labels : bool
+        True, если пол во входных данных был конвертирован в 'Мужской'/'Женский'.
+
+    Methods
+    -------
+    update(friends)
+        Учитывает страницу друзей.
+    merge(other)
+        Добавляет счетчики другого агрегатора.
+    result()
+        Возвращает распределение полов, как geenders_info.
+    """
+
+    def __init__(self):
+        self.counts = CountAggregator()
+        self.sex_labels = False
+
+    def update(self, friends):
+        """
+        Учитывает страницу друзей.
+
+        Parameters
+        ----------
+        friends : list of dict or list of Friend or FriendsFrame
+            Страница друзей.
+        """
+        frame = FriendsFrame.from_friends(friends)
+        genders = frame.genders()
+        self.sex_labels = self.sex_labels or frame.sex_labels
+        codes = {label: code for code, label in SEX_LABELS.items()}
+        for sex, count in zip(genders["Sex"].tolist(), genders["Count"].tolist()):
+            self.counts.add(codes.get(sex, sex), count)
+
+    def merge(self, other):
+        """
+        Добавляет счетчики другого агрегатора.
+
+        Parameters
+        ----------
+        other : GendersAggregator
+            Другой агрегатор.
+        """
+        self.counts.merge(other.counts)
+        self.sex_labels = self.sex_labels or other.sex_labels
+
+    def result(self):
+        """
+        Возвращает распределение полов.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'Sex' и 'Count'.
+        """
+        frame = self.counts.to_frame(["Sex", "Count"])
+        if self.sex_labels:
+            frame["Sex"] = [SEX_LABELS.get(code, code) for code in frame["Sex"]]
+        return frame
+
+
+class CitiesAggregator:
+    """
+    Счетчик городов друзей.
+
+    Methods
+    -------
+    update(friends)
+        Учитывает страницу друзей.
+    merge(other)
+        Добавляет счетчики другого агрегатора.
+    result()
+        Возвращает распределение городов, как cities_info.
+    """
+
+    def __init__(self):
+        self.counts = CountAggregator()
+
+    def update(self, friends):
+        """
+        Учитывает страницу друзей.
+
+        Parameters
+        ----------
+        friends : list of dict or list of Friend or FriendsFrame
+            Страница друзей.
+        """
+        cities = FriendsFrame.from_friends(friends).cities()
+        for city, count in zip(cities["City"].tolist(), cities["Count"].tolist()):
+            if count:
+                self.counts.add(city, count)
+
+    def merge(self, other):
+        """
+        Добавляет счетчики другого агрегатора.
+
+        Parameters
+        ----------
+        other : CitiesAggregator
+            Другой агрегатор.
+        """
+        self.counts.merge(other.counts)
+
+    def result(self):
+        """
+        Возвращает распределение городов.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'City' и 'Count'.
+        """
+        return self.counts.to_frame(["City", "Count"])
+
+
+class ApproxCitiesAggregator:
+    """
+    Приближенный счетчик самых частых городов друзей в фиксированной памяти.
+
+    Attributes
+    ----------
+    sketch : TopKSketch
+        Скетч самых частых городов и количества различных городов.
+
+    Methods
+    -------
+    update(friends)
+        Учитывает страницу друзей.
+    merge(other)
+        Объединяет со скетчем другого агрегатора.
+    result()
+        Возвращает самые частые города с границами ошибки.
+    """
+
+    def __init__(self, **options):
+        """
+        Инициализирует пустой скетч.
+
+        Parameters
+        ----------
+        **options
+            Параметры TopKSketch: top_k, epsilon, delta и precision.
+        """
+        self.sketch = TopKSketch(**options)
+
+    def update(self, friends):
+        """
+        Учитывает страницу друзей.
+
+        Parameters
+        ----------
+        friends : list of dict or list of Friend or FriendsFrame
+            Страница друзей.
+        """
+        cities = FriendsFrame.from_friends(friends).cities()
+        cities = cities[cities["Count"] > 0]
+        self.sketch.add(cities["City"].tolist(), cities["Count"].to_numpy())
+
+    def merge(self, other):
+        """
+        Объединяет со скетчем другого агрегатора.
+
+        Parameters
+        ----------
+        other : ApproxCitiesAggregator
+            Другой агрегатор с теми же параметрами.
+        """
+        self.sketch.merge(other.sketch)
+
+    def result(self):
+        """
+        Возвращает самые частые города с границами ошибки.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'City', 'Count' и 'Error'; границы ошибки — в атрибуте attrs.
+        """
+        return self.sketch.to_frame(["City", "Count"])
+
+
+class StatAggregator:
+    """
+    Счетчик постов по месяцам.
+
+    Methods
+    -------
+    update(wall)
+        Учитывает страницу постов.
+    merge(other)
+        Добавляет счетчики другого агрегатора.
+    result()
+        Возвращает количество постов по месяцам, как stat_info.
+    """
+
+    def __init__(self):
+        self.counts = CountAggregator()
+
+    def update(self, wall):
+        """
+        Учитывает страницу постов.
+
+        Parameters
+        ----------
+        wall : list of dict or list of Post
+            Страница постов.
+        """
+        self.counts.update(
+            post.date[:7] for post in decode_wall(wall) if post.date is not None
+        )
+
+    def merge(self, other):
+        """
+        Добавляет счетчики другого агрегатора.
+
+        Parameters
+        ----------
+        other : StatAggregator
+            Другой агрегатор.
+        """
+        self.counts.merge(other.counts)
+
+    def result(self):
+        """
+        Возвращает количество постов по месяцам.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'Mounth' и 'Count posts'.
+        """
+        return self.counts.to_frame(["Mounth", "Count posts"])
+
+
+class MarksAggregator:
+    """
+    Суммы лайков, комментариев, просмотров и репостов.
+
+    Attributes
+    ----------
+    sums : dict
+        Сумма каждого счетчика из COUNTER_KEYS.
+
+    Methods
+    -------
+    update(wall)
+        Учитывает страницу постов.
+    merge(other)
+        Добавляет суммы другого агрегатора.
+    result()
+        Возвращает суммы счетчиков, как marks_info.
+    """
+
+    def __init__(self):
+        self.sums = dict.fromkeys(COUNTER_KEYS, 0)
+
+    def update(self, wall):
+        """
+        Учитывает страницу постов.
+
+        Parameters
+        ----------
+        wall : list of dict or list of Post
+            Страница постов.
+        """
+        for post in decode_wall(wall):
+            for key in COUNTER_KEYS:
+                self.sums[key] += getattr(post, key)
+
+    def merge(self, other):
+        """
+        Добавляет суммы другого агрегатора.
+
+        Parameters
+        ----------
+        other : MarksAggregator
+            Другой агрегатор.
+        """
+        for key in COUNTER_KEYS:
+            self.sums[key] += other.sums[key]
+
+    def result(self):
+        """
+        Возвращает суммы счетчиков.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'stats' и 'values'.
+        """
+        return pd.DataFrame(
+            {"stats": list(self.sums), "values": list(self.sums.values())}
+        )
+
+
+class InterestsAggregator:
+    """
+    Счетчик тематик групп.
+
+    Methods
+    -------
+    update(groups)
+        Учитывает страницу групп.
+    merge(other)
+        Добавляет счетчики другого агрегатора.
+    result()
+        Возвращает распределение интересов, как interests_info.
+    """
+
+    def __init__(self):
+        self.counts = CountAggregator()
+
+    def update(self, groups):
+        """
+        Учитывает страницу групп.
+
+        Parameters
+        ----------
+        groups : list of dict or list of Group
+            Страница групп.
+        """
+        self.counts.update(group.activity for group in decode_groups(groups))
+
+    def merge(self, other):
+        """
+        Добавляет счетчики другого агрегатора.
+
+        Parameters
+        ----------
+        other : InterestsAggregator
+            Другой агрегатор.
+        """
+        self.counts.merge(other.counts)
+
+    def result(self):
+        """
+        Возвращает распределение интересов.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'Activities' и 'States'.
+        """
+        return self.counts.to_frame(["Activities", "States"])
+
+
+class ApproxInterestsAggregator:
+    """
+    Приближенный счетчик самых частых тематик групп в фиксированной памяти.
+
+    Attributes
+    ----------
+    sketch : TopKSketch
+        Скетч самых частых тематик и количества различных тематик.
+
+    Methods
+    -------
+    update(groups)
+        Учитывает страницу групп.
+    merge(other)
+        Объединяет со скетчем другого агрегатора.
+    result()
+        Возвращает самые частые тематики с границами ошибки.
+    """
+
+    def __init__(self, **options):
+        """
+        Инициализирует пустой скетч.
+
+        Parameters
+        ----------
+        **options
+            Параметры TopKSketch: top_k, epsilon, delta и precision.
+        """
+        self.sketch = TopKSketch(**options)
+
+    def update(self, groups):
+        """
+        Учитывает страницу групп.
+
+        Parameters
+        ----------
+        groups : list of dict or list of Group
+            Страница групп.
+        """
+        self.sketch.add([group.activity for group in decode_groups(groups)])
+
+    def merge(self, other):
+        """
+        Объединяет со скетчем другого агрегатора.
+
+        Parameters
+        ----------
+        other : ApproxInterestsAggregator
+            Другой агрегатор с теми же параметрами.
+        """
+        self.sketch.merge(other.sketch)
+
+    def result(self):
+        """
+        Возвращает самые частые тематики с границами ошибки.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'Activities', 'States' и 'Error'; границы ошибки — в атрибуте attrs.
+        """
+        return self.sketch.to_frame(["Activities", "States"])
+
+
+class DistinctFriendsAggregator:
+    """
+    Оценка количества различных друзей в фиксированной памяти.
+
+    Друзья разных профилей пересекаются, поэтому сумма размеров списков завышает охват;
+    HyperLogLog оценивает количество различных идентификаторов без хранения их самих.
+
+    Attributes
+    ----------
+    sketch : HyperLogLog
+        Скетч идентификаторов друзей.
+
+    Methods
+    -------
+    update(friends)
+        Учитывает страницу друзей.
+    merge(other)
+        Объединяет со скетчем другого агрегатора.
+    result()
+        Возвращает оценку количества различных друзей и ее ошибку.
+    """
+
+    def __init__(self, precision=12):
+        self.sketch = HyperLogLog(precision=precision)
+
+    def update(self, friends):
+        """
+        Учитывает страницу друзей.
+
+        Parameters
+        ----------
+        friends : list of dict or list of Friend or FriendsFrame
+            Страница друзей.
+        """
+        ids = FriendsFrame.from_friends(friends).ids
+        self.sketch.add(hash_values(ids[ids > 0]))
+
+    def merge(self, other):
+        """
+        Объединяет со скетчем другого агрегатора.
+
+        Parameters
+        ----------
+        other : DistinctFriendsAggregator
+            Другой агрегатор с той же точностью.
+        """
+        self.sketch.merge(other.sketch)
+
+    def result(self):
+        """
+        Возвращает оценку количества различных друзей и ее ошибку.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'Distinct' и 'Error' (стандартная относительная ошибка).
+        """
+        return pd.DataFrame(
+            {
+                "Distinct": [self.sketch.estimate()],
+                "Error": [self.sketch.relative_error()],
+            }
+        )
+
+
+class ProfileAggregators:
+    """
+    Набор потоковых агрегаторов для всех аналитик профиля.
+
+    Агрегаторы обновляются страницами друзей, групп и постов по мере их получения, поэтому
+    промежуточные результаты доступны еще до окончания сбора. Агрегаторы разных страниц,
+    потоков или профилей объединяются методом merge, и результат не зависит от того, как
+    данные были разбиты на части (кроме порядка строк).
+
+    В приближенном режиме города и тематики групп считаются скетчами TopKSketch, а
+    количество различных друзей — HyperLogLog ('friends'). Память таких агрегаторов не
+    растет с количеством записей, а результаты содержат столбец 'Error' и границы ошибки
+    в атрибуте attrs.
+
+    Attributes
+    ----------
+    aggregators : dict
+        Агрегаторы по названиям аналитик: 'ages', 'genders', 'cities', 'stat', 'marks',
+        'interests' и, в приближенном режиме, 'friends'.
+    approximate : bool
+        True, если включен приближенный режим.
+    options : dict
+        Параметры скетчей приближенного режима.
+    seen : dict
+        Количество учтенных друзей, групп и постов.
+
+    Methods
+    -------
+    empty()
+        Создает пустой набор агрегаторов с теми же параметрами.
+    update_friends(friends)
+        Учитывает страницу друзей.
+    update_groups(groups)
+        Учитывает страницу групп.
+    update_wall(wall)
+        Учитывает страницу постов.
+    reset_wall()
+        Сбрасывает агрегаторы постов.
+    merge(other)
+        Добавляет результаты другого набора агрегаторов.
+    results()
+        Возвращает текущие результаты всех аналитик.
+
+    Examples
+    --------
+    >>> aggregators = ProfileAggregators()
+    >>> aggregators.update_wall([{'id': 1, 'date': '2024-01-01 12:00:00', 'likes': {'count': 3}}])
+    >>> aggregators.results()['marks']['values'].tolist()
+    [3, 0, 0, 0]
+    >>> ProfileAggregators(approximate=True, top_k=10).results()['cities'].attrs['epsilon']
+    0.001
+    """
+
+    FRIENDS = ("ages", "genders", "cities", "friends")
+    GROUPS = ("interests",)
+    WALL = ("stat", "marks")
+
+    def __init__(
+        self, approximate=False, top_k=20, epsilon=0.001, delta=0.01, precision=12
+    ):
+        """
+        Инициализирует пустые агрегаторы.
+
+        Parameters
+        ----------
+        approximate : bool, optional
+            Если True, города, тематики групп и количество различных друзей считаются
+            скетчами в фиксированной памяти, по умолчанию False.
+        top_k : int, optional
+            Количество самых частых значений в приближенном режиме, по умолчанию 20.
+        epsilon : float, optional
+            Относительная ошибка частот в приближенном режиме, по умолчанию 0.001.
+        delta : float, optional
+            Вероятность превысить ошибку частот, по умолчанию 0.01.
+        precision : int, optional
+            Точность HyperLogLog, по умолчанию 12 (относительная ошибка около 1.6%).
+        """
+        self.approximate = approximate
+        self.options = {
+            "top_k": top_k,
+            "epsilon": epsilon,
+            "delta": delta,
+            "precision": precision,
+        }
+        self.aggregators = {
+            "ages": AgesAggregator(),
+            "genders": GendersAggregator(),
+            "cities": CitiesAggregator(),
+            "stat": StatAggregator(),
+            "marks": MarksAggregator(),
+            "interests": InterestsAggregator(),
+        }
+        if approximate:
+            self.aggregators["cities"] = ApproxCitiesAggregator(**self.options)
+            self.aggregators["interests"] = ApproxInterestsAggregator(**self.options)
+            self.aggregators["friends"] = DistinctFriendsAggregator(precision)
+        self.seen = {"friends": 0, "groups": 0, "wall": 0}
+
+    def __getitem__(self, name):
+        return self.aggregators[name]
+
+    def empty(self):
+        """
+        Создает пустой набор агрегаторов с теми же параметрами.
+
+        Returns
+        -------
+        ProfileAggregators
+            Набор, который можно объединить с текущим методом merge.
+        """
+        return ProfileAggregators(self.approximate, **self.options)
+
+    def update_friends(self, friends):
+        """
+        Учитывает страницу друзей.
+
+        Parameters
+        ----------
+        friends : list of dict or list of Friend or FriendsFrame or dict
+            Страница друзей или ответ friends.get целиком.
+        """
+        frame = FriendsFrame.from_friends(friends)
+        for name in self.FRIENDS:
+            if name in self.aggregators:
+                self.aggregators[name].update(frame)
+        self.seen["friends"] += len(frame)
+
+    def update_groups(self, groups):
+        """
+        Учитывает страницу групп.
+
+        Parameters
+        ----------
+        groups : list of dict or list of Group or dict
+            Страница групп или ответ groups.get целиком.
+        """
+        groups = decode_groups(groups)
+        for name in self.GROUPS:
+            self.aggregators[name].update(groups)
+        self.seen["groups"] += len(groups)
+
+    def update_wall(self, wall):
+        """
+        Учитывает страницу постов.
+
+        Parameters
+        ----------
+        wall : list of dict or list of Post or dict
+            Страница постов или ответ wall.get целиком.
+        """
+        wall = decode_wall(wall)
+        for name in self.WALL:
+            self.aggregators[name].update(wall)
+        self.seen["wall"] += len(wall)
+
+    def reset_wall(self):
+        """
+        Сбрасывает агрегаторы постов, например, если страницы незавершенного обхода стены
+        не были сохранены.
+        """
+        empty = self.empty()
+        for name in self.WALL:
+            self.aggregators[name] = empty.aggregators[name]
+        self.seen["wall"] = 0
+
+    def merge(self, other):
+        """
+        Добавляет результаты другого набора агрегаторов.
+
+        Parameters
+        ----------
+        other : ProfileAggregators
+            Другой набор агрегаторов.
+        """
+        for name, aggregator in self.aggregators.items():
+            aggregator.merge(other.aggregators[name])
+        for key, count in other.seen.items():
+            self.seen[key] += count
+
+    def results(self):
+        """
+        Возвращает текущие результаты всех аналитик.
+
+        Returns
+        -------
+        dict
+            DataFrame по названиям аналитик.
+        """
+        return {
+            name: aggregator.result() for name, aggregator in self.aggregators.items()
+        }
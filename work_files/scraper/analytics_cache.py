@@ -0,0 +1,378 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from scraper.friends_frame import FriendsFrame
+from scraper.persistence import write_atomic
+
+SHARED_SCOPE = "shared"
+PRUNE_INTERVAL = 60
+
+
+def encode_value(value):
+    """
+    Преобразует объекты, которые не сериализуются в JSON, для вычисления хэша.
+
+    Parameters
+    ----------
+    value : object
+        Запись Friend, Group или Post, массив numpy или FriendsFrame.
+
+    Returns
+    -------
+    list
+        Имя типа и значения полей объекта.
+
+    Raises
+    ------
+    TypeError
+        Возникает для объектов неподдерживаемых типов.
+    """
+    if isinstance(value, FriendsFrame):
+        return [
+            "FriendsFrame",
+            value.ids,
+            value.birth_year,
+            value.sex,
+            value.city_id,
+            value.city.codes,
+            list(value.city.categories),
+            value.sex_labels,
+        ]
+    if isinstance(value, np.ndarray):
+        return [str(value.dtype), hashlib.blake2b(value.tobytes()).hexdigest()]
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(type(value), "__slots__"):
+        return [type(value).__name__] + [
+            getattr(value, name) for name in type(value).__slots__
+        ]
+    raise TypeError(f"Неподдерживаемый тип: {type(value).__name__}")
+
+
+def content_hash(payload):
+    """
+    Вычисляет хэш содержимого входных данных аналитики.
+
+    Parameters
+    ----------
+    payload : object
+        Словари и списки из ответа API, записи Friend, Group и Post или FriendsFrame.
+
+    Returns
+    -------
+    str
+        Шестнадцатеричный хэш BLAKE2b; одинаковое содержимое дает одинаковый хэш.
+
+    Examples
+    --------
+    >>> content_hash([{'id': 1}]) == content_hash([{'id': 1}])
+    True
+    """
+    if isinstance(payload, FriendsFrame):
+        payload = encode_value(payload)
+    text = json.dumps(
+        payload,
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=encode_value,
+    )
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def write_pickle(file, data):
+    """
+    Записывает объект в файл в формате pickle.
+
+    Parameters
+    ----------
+    file : file object
+        Файл, открытый для записи в двоичном режиме.
+    data : object
+        Объект для записи.
+    """
+    pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class AnalyticsCache:
+    """
+    Кэш результатов аналитики по хэшу содержимого входных данных.
+
+    Ключ результата составляется из названия аналитики, ее версии и хэша входных данных,
+    поэтому одинаковые данные не обрабатываются повторно, а изменение данных или версии
+    аналитики автоматически дает новый ключ. Результаты хранятся в памяти в ограниченном
+    LRU-кэше и, если задана директория, на диске, где переживают перезапуск приложения.
+    Результаты можно привязать к пользователю и удалить все сразу при повторном сборе
+    его профиля. Дисковый кэш тоже ограничен: файлы старше max_age удаляются, а сверх
+    max_disk_bytes удаляются файлы, которые дольше всего не читались.
+
+    Результаты на диске хранятся в формате pickle, а загрузка pickle выполняет код из файла,
+    поэтому директория создается доступной только владельцу, и ее нельзя делить с другими
+    пользователями системы.
+
+    Attributes
+    ----------
+    max_entries : int
+        Максимальное количество результатов в памяти.
+    directory : str or None
+        Директория дискового кэша; None — результаты хранятся только в памяти.
+    max_disk_bytes : int
+        Максимальный суммарный размер файлов дискового кэша в байтах.
+    max_age : float
+        Максимальный возраст файла дискового кэша в секундах.
+    entries : OrderedDict
+        Результаты в памяти по ключу в порядке последнего использования.
+    hits : int
+        Количество результатов, найденных в кэше.
+    misses : int
+        Количество результатов, вычисленных заново.
+
+    Methods
+    -------
+    get_or_compute(name, version, payload, compute, scope=None)
+        Возвращает результат из кэша или вычисляет его.
+    invalidate(scope)
+        Удаляет результаты, привязанные к пользователю.
+    prune_disk(force=False)
+        Удаляет устаревшие и лишние файлы дискового кэша.
+    clear()
+        Удаляет все результаты из памяти и с диска.
+
+    Examples
+    --------
+    >>> results = AnalyticsCache(max_entries=128, directory='data_base/analytics')
+    >>> results.get_or_compute('ages', 1, friends, lambda: ages_info(friends), scope=1)
+    >>> results.invalidate(1)
+    """
+
+    def __init__(
+        self,
+        max_entries=256,
+        directory=None,
+        max_disk_bytes=256 * 2**20,
+        max_age=7 * 86400,
+    ):
+        """
+        Инициализирует пустой кэш.
+
+        Parameters
+        ----------
+        max_entries : int, optional
+            Максимальное количество результатов в памяти, по умолчанию 256.
+        directory : str, optional
+            Директория дискового кэша, по умолчанию результаты на диск не сохраняются.
+        max_disk_bytes : int, optional
+            Максимальный размер дискового кэша в байтах, по умолчанию 256 МБ.
+        max_age : float, optional
+            Максимальный возраст файла дискового кэша в секундах, по умолчанию 7 дней.
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self.pruned_at = 0
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.entries = OrderedDict()
+        self.scopes = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def file_path(self, key, scope):
+        """
+        Возвращает путь к файлу результата в дисковом кэше.
+
+        Parameters
+        ----------
+        key : str
+            Ключ результата.
+        scope : int or str or None
+            Пользователь, к которому привязан результат.
+
+        Returns
+        -------
+        str
+            Путь к файлу.
+        """
+        return os.path.join(
+            self.directory, str(SHARED_SCOPE if scope is None else scope), f"{key}.pkl"
+        )
+
+    def get_or_compute(self, name, version, payload, compute, scope=None):
+        """
+        Возвращает результат из кэша или вычисляет его.
+
+        Parameters
+        ----------
+        name : str
+            Название аналитики.
+        version : int
+            Версия аналитики; ее нужно увеличивать при изменении алгоритма.
+        payload : object
+            Входные данные аналитики.
+        compute : callable
+            Функция без аргументов, вычисляющая результат.
+        scope : int or str, optional
+            Пользователь, к которому привязан результат, по умолчанию результат общий.
+
+        Returns
+        -------
+        object
+            Копия результата, которую можно изменять.
+        """
+        key = f"{name}-v{version}-{content_hash(payload)}"
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self.entries[key])
+
+        result = self.load(key, scope)
+        if result is None:
+            result = compute()
+            with self.lock:
+                self.misses += 1
+            if self.directory and result is not None:
+                try:
+                    write_atomic(self.file_path(key, scope), result, write_pickle)
+                except Exception as e:
+                    print(f"Ошибка при сохранении результата {key}: {e}")
+                self.prune_disk()
+        else:
+            with self.lock:
+                self.hits += 1
+
+        if result is not None:
+            self.remember(key, result, scope)
+        return copy.deepcopy(result)
+
+    def load(self, key, scope):
+        """
+        Загружает результат из дискового кэша.
+
+        Parameters
+        ----------
+        key : str
+            Ключ результата.
+        scope : int or str or None
+            Пользователь, к которому привязан результат.
+
+        Returns
+        -------
+        object or None
+            Результат или None, если его нет на диске.
+        """
+        if not self.directory:
+            return None
+        file_path = self.file_path(key, scope)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, "rb") as f:
+                result = pickle.load(f)
+            os.utime(file_path)
+            return result
+        except Exception as e:
+            print(f"Ошибка при загрузке результата {key}: {e}")
+            return None
+
+    def remember(self, key, result, scope):
+        """
+        Сохраняет результат в памяти и вытесняет самые давно использованные.
+
+        Parameters
+        ----------
+        key : str
+            Ключ результата.
+        result : object
+            Результат аналитики.
+        scope : int or str or None
+            Пользователь, к которому привязан результат.
+        """
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            if scope is not None:
+                self.scopes.setdefault(scope, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                for keys in self.scopes.values():
+                    keys.discard(evicted)
+
+    def invalidate(self, scope):
+        """
+        Удаляет результаты, привязанные к пользователю.
+
+        Вызывается при повторном сборе профиля, чтобы результаты по старым данным не занимали
+        место в памяти и на диске.
+
+        Parameters
+        ----------
+        scope : int or str
+            Пользователь, результаты которого нужно удалить.
+        """
+        with self.lock:
+            for key in self.scopes.pop(scope, set()):
+                self.entries.pop(key, None)
+        if self.directory:
+            shutil.rmtree(os.path.join(self.directory, str(scope)), ignore_errors=True)
+
+    def prune_disk(self, force=False):
+        """
+        Удаляет устаревшие и лишние файлы дискового кэша.
+
+        Время изменения файла обновляется при каждом чтении, поэтому сверх max_disk_bytes
+        удаляются файлы, которые дольше всего не использовались. Без force директория
+        просматривается не чаще одного раза за PRUNE_INTERVAL секунд.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Если True, директория просматривается сразу, по умолчанию False.
+        """
+        now = time.time()
+        with self.lock:
+            if not self.directory or (
+                not force and now - self.pruned_at < PRUNE_INTERVAL
+            ):
+                return
+            self.pruned_at = now
+
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, file_path))
+
+        total = sum(size for _, size, _ in files)
+        for mtime, size, file_path in sorted(files):
+            if now - mtime <= self.max_age and total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """
+        Удаляет все результаты из памяти и с диска.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.scopes.clear()
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,549 @@
+import glob
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scraper.persistence import write_atomic
+from scraper.records import birth_year, counter
+
+DEFAULT_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data_base",
+    "columnar",
+)
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMAS = {
+    "friends": pa.schema(
+        [
+            ("friend_id", pa.int64()),
+            ("first_name", pa.string()),
+            ("last_name", pa.string()),
+            ("sex", pa.string()),
+            ("bdate", pa.string()),
+            ("birth_year", pa.int16()),
+            ("city", pa.string()),
+            ("scraped_at", pa.timestamp("s")),
+            ("data", pa.string()),
+        ]
+    ),
+    "groups": pa.schema(
+        [
+            ("group_id", pa.int64()),
+            ("name", pa.string()),
+            ("activity", pa.string()),
+            ("scraped_at", pa.timestamp("s")),
+            ("data", pa.string()),
+        ]
+    ),
+    "wall": pa.schema(
+        [
+            ("post_id", pa.int64()),
+            ("date", pa.timestamp("s")),
+            ("likes", pa.int64()),
+            ("comments", pa.int64()),
+            ("views", pa.int64()),
+            ("reposts", pa.int64()),
+            ("text", pa.string()),
+            ("scraped_at", pa.timestamp("s")),
+            ("data", pa.string()),
+        ]
+    ),
+}
+PARTITION_COLUMNS = [("user_id", pa.int64()), ("scrape_date", pa.string())]
+ROW_GROUP_SIZE = 1000
+
+
+def utc_datetime(seconds):
+    """
+    Возвращает время в UTC без часового пояса.
+
+    Все даты хранилища (дата поста, время сбора и дата в пути снимка) хранятся в UTC,
+    как и даты, конвертированные DataProcessor.
+
+    Parameters
+    ----------
+    seconds : int or float
+        Временная метка Unix.
+
+    Returns
+    -------
+    datetime
+        Время в UTC с точностью до секунды.
+    """
+    return datetime.fromtimestamp(int(seconds), timezone.utc).replace(tzinfo=None)
+
+
+def post_date(value):
+    """
+    Возвращает дату поста в виде datetime.
+
+    Parameters
+    ----------
+    value : int or str or None
+        Временная метка Unix или дата, уже конвертированная DataProcessor.time_convertor.
+
+    Returns
+    -------
+    datetime or None
+        Дата поста.
+    """
+    if isinstance(value, int):
+        return utc_datetime(value)
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, DATE_FORMAT)
+        except ValueError:
+            return None
+    return None
+
+
+def build_table(name, items, scraped_at):
+    """
+    Строит таблицу Arrow для одного снимка друзей, групп или стены.
+
+    Parameters
+    ----------
+    name : str
+        Название таблицы: 'friends', 'groups' или 'wall'.
+    items : list of dict
+        Объекты из ответа API.
+    scraped_at : datetime
+        Время сбора.
+
+    Returns
+    -------
+    pa.Table
+        Таблица со схемой SCHEMAS[name].
+    """
+    if name == "friends":
+        columns = {
+            "friend_id": [item["id"] for item in items],
+            "first_name": [item.get("first_name") for item in items],
+            "last_name": [item.get("last_name") for item in items],
+            "sex": [item.get("sex") for item in items],
+            "bdate": [item.get("bdate") for item in items],
+            "birth_year": [birth_year(item.get("bdate")) for item in items],
+            "city": [(item.get("city") or {}).get("title") for item in items],
+        }
+    elif name == "groups":
+        columns = {
+            "group_id": [item["id"] for item in items],
+            "name": [item.get("name") for item in items],
+            "activity": [item.get("activity") for item in items],
+        }
+    else:
+        columns = {
+            "post_id": [item["id"] for item in items],
+            "date": [post_date(item.get("date")) for item in items],
+            "likes": [counter(item, "likes", None) for item in items],
+            "comments": [counter(item, "comments", None) for item in items],
+            "views": [counter(item, "views", None) for item in items],
+            "reposts": [counter(item, "reposts", None) for item in items],
+            "text": [item.get("text") for item in items],
+        }
+    columns["scraped_at"] = [scraped_at] * len(items)
+    columns["data"] = [json.dumps(item, ensure_ascii=False) for item in items]
+    return pa.table(columns, schema=SCHEMAS[name])
+
+
+def write_parquet(file, table):
+    """
+    Записывает таблицу Arrow в файл Parquet со сжатием zstd.
+
+    Parameters
+    ----------
+    file : file object
+        Файл, открытый для записи в двоичном режиме.
+    table : pa.Table
+        Таблица для записи.
+    """
+    pq.write_table(table, file, compression="zstd")
+
+
+class ParquetTableWriter:
+    """
+    Потоково записывает объекты одной таблицы снимка в файл Parquet.
+
+    Объекты копятся до ROW_GROUP_SIZE строк и записываются группой строк, поэтому в памяти
+    не хранится вся стена. Запись идет во временный файл, который заменяет основной при
+    закрытии; если блок with завершился исключением, временный файл удаляется.
+
+    Attributes
+    ----------
+    file_path : str
+        Путь к файлу Parquet.
+    name : str
+        Название таблицы: 'friends', 'groups' или 'wall'.
+    scraped_at : datetime
+        Время сбора.
+    count : int
+        Количество записанных строк.
+
+    Methods
+    -------
+    write(items)
+        Добавляет объекты в таблицу.
+    close()
+        Записывает оставшиеся строки и заменяет основной файл временным.
+    discard()
+        Закрывает и удаляет временный файл.
+
+    Examples
+    --------
+    >>> with store.wall_writer(1, time.time()) as writer:
+    ...     crawler.crawl(1, writer.write)
+    """
+
+    def __init__(self, file_path, name, scraped_at):
+        """
+        Открывает временный файл Parquet.
+
+        Parameters
+        ----------
+        file_path : str
+            Путь к файлу Parquet.
+        name : str
+            Название таблицы.
+        scraped_at : datetime
+            Время сбора.
+        """
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self.file_path = file_path
+        self.name = name
+        self.scraped_at = scraped_at
+        self.count = 0
+        self.pending = []
+        self.tmp_path = f"{file_path}.tmp"
+        self.writer = pq.ParquetWriter(self.tmp_path, SCHEMAS[name], compression="zstd")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write(self, items):
+        """
+        Добавляет объекты в таблицу.
+
+        Parameters
+        ----------
+        items : list of dict
+            Объекты из ответа API.
+        """
+        self.pending.extend(items)
+        self.count += len(items)
+        if len(self.pending) >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Записывает накопленные объекты группой строк.
+        """
+        if self.pending:
+            self.writer.write_table(
+                build_table(self.name, self.pending, self.scraped_at)
+            )
+            self.pending = []
+
+    def close(self):
+        """
+        Записывает оставшиеся строки и заменяет основной файл временным.
+        """
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.writer = None
+            os.replace(self.tmp_path, self.file_path)
+
+    def discard(self):
+        """
+        Закрывает и удаляет временный файл.
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            os.remove(self.tmp_path)
+
+
+class ColumnarStore:
+    """
+    Колоночное хранилище снимков профилей в формате Parquet с запросами через DuckDB.
+
+    Друзья, группы и посты каждого сбора записываются в отдельные файлы Parquet, разложенные
+    по директориям вида <таблица>/user_id=<id>/scrape_date=<ГГГГ-ММ-ДД>/. Аналитические поля
+    хранятся в отдельных столбцах, а полный объект — в столбце data в формате JSON. Запросы
+    выполняются встроенной базой DuckDB сразу по всем сохраненным профилям, а результат
+    возвращается в виде DataFrame на основе Arrow без копирования данных.
+
+    Attributes
+    ----------
+    root : str
+        Корневая директория хранилища.
+    persistence : PersistenceQueue or None
+        Очередь фоновой записи; None — файлы записываются сразу.
+
+    Methods
+    -------
+    write_snapshot(user_id, friends, groups, wall, scraped_at=None)
+        Сохраняет снимок друзей, групп и стены пользователя.
+    write_table(name, user_id, items, scraped_at=None)
+        Сохраняет одну таблицу снимка.
+    wall_writer(user_id, scraped_at)
+        Открывает потоковую запись стены в снимок.
+    snapshot_path(name, user_id, scraped_at)
+        Возвращает путь к файлу таблицы снимка.
+    snapshot_files(name, latest=True)
+        Возвращает файлы снимков таблицы.
+    query(sql, params=None, latest=True)
+        Выполняет SQL-запрос по всем сохраненным профилям.
+    read_frame(table, user_id)
+        Загружает последний снимок таблицы для одного пользователя.
+    age_distribution()
+        Вычисляет распределение возрастов друзей по всем сохраненным профилям.
+
+    Examples
+    --------
+    >>> store = ColumnarStore('data_base/columnar')
+    >>> store.write_snapshot(1, friends, groups, wall)
+    >>> store.query('SELECT city, count(*) AS n FROM friends GROUP BY city ORDER BY n DESC')
+    """
+
+    def __init__(self, root=None, persistence=None):
+        """
+        Инициализирует хранилище.
+
+        Parameters
+        ----------
+        root : str, optional
+            Корневая директория, по умолчанию значение переменной окружения
+            COLUMNAR_STORE_PATH или data_base/columnar.
+        persistence : PersistenceQueue, optional
+            Очередь фоновой записи файлов, по умолчанию файлы записываются сразу.
+        """
+        self.root = root or os.getenv("COLUMNAR_STORE_PATH", DEFAULT_ROOT)
+        self.persistence = persistence
+
+    def write_snapshot(self, user_id, friends, groups, wall, scraped_at=None):
+        """
+        Сохраняет снимок друзей, групп и стены пользователя.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        friends : list of dict
+            Друзья пользователя.
+        groups : list of dict
+            Группы пользователя.
+        wall : list of dict
+            Посты со стены пользователя.
+        scraped_at : float, optional
+            Время сбора в секундах Unix, по умолчанию текущее время.
+        """
+        scraped_at = scraped_at or time.time()
+        for name, items in (("friends", friends), ("groups", groups), ("wall", wall)):
+            self.write_table(name, user_id, items, scraped_at)
+
+    def write_table(self, name, user_id, items, scraped_at=None):
+        """
+        Сохраняет одну таблицу снимка.
+
+        Parameters
+        ----------
+        name : str
+            Название таблицы: 'friends', 'groups' или 'wall'.
+        user_id : int
+            Идентификатор пользователя.
+        items : list of dict or None
+            Объекты из ответа API.
+        scraped_at : float, optional
+            Время сбора в секундах Unix, по умолчанию текущее время.
+        """
+        scraped_at = scraped_at or time.time()
+        file_path = self.snapshot_path(name, user_id, scraped_at)
+        table = build_table(name, items or [], utc_datetime(scraped_at))
+        if self.persistence:
+            self.persistence.submit(file_path, table, writer=write_parquet)
+        else:
+            write_atomic(file_path, table, writer=write_parquet)
+
+    def wall_writer(self, user_id, scraped_at):
+        """
+        Открывает потоковую запись стены в снимок.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        scraped_at : float
+            Время сбора в секундах Unix; то же, что у друзей и групп снимка.
+
+        Returns
+        -------
+        ParquetTableWriter
+            Писатель, которому страницы стены передаются по мере получения.
+        """
+        return ParquetTableWriter(
+            self.snapshot_path("wall", user_id, scraped_at),
+            "wall",
+            utc_datetime(scraped_at),
+        )
+
+    def snapshot_path(self, name, user_id, scraped_at):
+        """
+        Возвращает путь к файлу таблицы снимка.
+
+        Parameters
+        ----------
+        name : str
+            Название таблицы.
+        user_id : int
+            Идентификатор пользователя.
+        scraped_at : float
+            Время сбора в секундах Unix.
+
+        Returns
+        -------
+        str
+            Путь вида <таблица>/user_id=<id>/scrape_date=<ГГГГ-ММ-ДД>/<мс>.parquet, дата
+            в UTC.
+        """
+        moment = utc_datetime(scraped_at)
+        return os.path.join(
+            self.root,
+            name,
+            f"user_id={user_id}",
+            f"scrape_date={moment:%Y-%m-%d}",
+            f"{int(scraped_at * 1000)}.parquet",
+        )
+
+    def snapshot_files(self, name, latest=True):
+        """
+        Возвращает файлы снимков таблицы.
+
+        Последний снимок пользователя выбирается по времени сбора в имени файла, а не по
+        строкам, поэтому пустой последний снимок (друзья скрыты, стена очищена) скрывает
+        более ранние.
+
+        Parameters
+        ----------
+        name : str
+            Название таблицы.
+        latest : bool, optional
+            Если True, возвращается только последний снимок каждого пользователя,
+            по умолчанию True.
+
+        Returns
+        -------
+        list of str
+            Пути к файлам Parquet.
+        """
+        files = glob.glob(os.path.join(self.root, name, "*", "*", "*.parquet"))
+        if not latest:
+            return sorted(files)
+        newest = {}
+        for path in files:
+            user_dir = os.path.dirname(os.path.dirname(path))
+            stamp = int(os.path.splitext(os.path.basename(path))[0])
+            if user_dir not in newest or stamp > newest[user_dir][0]:
+                newest[user_dir] = (stamp, path)
+        return sorted(path for _, path in newest.values())
+
+    def query(self, sql, params=None, latest=True):
+        """
+        Выполняет SQL-запрос по всем сохраненным профилям.
+
+        В запросе доступны представления friends, groups и wall. Кроме столбцов из SCHEMAS
+        в каждом из них есть столбцы user_id и scrape_date.
+
+        Parameters
+        ----------
+        sql : str
+            Текст запроса на диалекте DuckDB.
+        params : list, optional
+            Параметры запроса, подставляемые вместо '?'.
+        latest : bool, optional
+            Если True, для каждого пользователя видны только данные последнего сбора,
+            даже если он пуст, по умолчанию True.
+
+        Returns
+        -------
+        pd.DataFrame
+            Результат запроса со столбцами на основе Arrow.
+
+        Examples
+        --------
+        >>> store.query(
+        ...     'SELECT user_id, count(*) AS friends FROM friends GROUP BY user_id'
+        ... )
+        """
+        with duckdb.connect() as connection:
+            for name, schema in SCHEMAS.items():
+                files = self.snapshot_files(name, latest)
+                if not files:
+                    empty = pa.schema(list(schema) + PARTITION_COLUMNS).empty_table()
+                    connection.register(name, empty)
+                    continue
+                paths = ", ".join(
+                    f"'{path.replace(chr(39), chr(39) * 2)}'" for path in files
+                )
+                connection.execute(
+                    f"CREATE VIEW {name} AS SELECT * FROM read_parquet("
+                    f"[{paths}], hive_partitioning = true)"
+                )
+
+            result = connection.execute(sql, params or []).fetch_record_batch()
+            return result.read_all().to_pandas(types_mapper=pd.ArrowDtype)
+
+    def read_frame(self, table, user_id):
+        """
+        Загружает последний снимок таблицы для одного пользователя.
+
+        Parameters
+        ----------
+        table : str
+            Название таблицы: 'friends', 'groups' или 'wall'.
+        user_id : int
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        pd.DataFrame
+            Данные последнего сбора пользователя.
+
+        Raises
+        ------
+        ValueError
+            Возникает, если передано неизвестное название таблицы.
+        """
+        if table not in SCHEMAS:
+            raise ValueError(f"Неизвестная таблица: {table}")
+        return self.query(f"SELECT * FROM {table} WHERE user_id = ?", [user_id])
+
+    def age_distribution(self):
+        """
+        Вычисляет распределение возрастов друзей по всем сохраненным профилям.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'Age' и 'Count', как в результате ages_info.
+        """
+        return self.query("""
+            SELECT year(current_date) - birth_year AS Age, count(*) AS Count
+            FROM friends
+            WHERE birth_year IS NOT NULL
+            GROUP BY Age
+            HAVING Age > 5 AND Age < 90
+            ORDER BY Age
+            """)
@@ -1,6 +1,9 @@
-import json
 import re
-from datetime import datetime
+
+from scraper.persistence import write_atomic
+from scraper.records import format_date, sex_label
+
+COUNTER_KEYS = ("likes", "comments", "views", "reposts")
 
 
 class DataProcessor:
@@ -12,7 +15,7 @@ class DataProcessor:
     get_user_id(url)
         Извлекает идентификатор пользователя из URL.
     save_data(file_path, data)
-        Сохраняет данные в файл JSON.
+        Атомарно сохраняет данные в файл JSON.
     time_convertor(data_wall)
         Конвертирует временную метку в читаемый формат даты и времени.
     gender_convertor(data_friends)
@@ -23,6 +26,8 @@ class DataProcessor:
         Конвертирует данные друзей.
     convert_wall_data(wall_data)
         Конвертирует данные стены (постов).
+    merge_wall_data(stored, fetched)
+        Объединяет сохраненные посты с новыми и обновленными.
     """
 
     @staticmethod
@@ -59,7 +64,10 @@ class DataProcessor:
     @staticmethod
     def save_data(file_path, data):
         """
-        Сохраняет данные в файл JSON.
+        Атомарно сохраняет данные в файл JSON.
+
+        Данные записываются в компактном виде во временный файл, который затем заменяет
+        основной. Для файлов с суффиксом '.zst' данные сжимаются zstd.
 
         Parameters
         ----------
@@ -79,8 +87,7 @@ class DataProcessor:
         >>> DataProcessor.save_data('data.json', data)
         """
         try:
-            with open(file_path, "w") as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
+            write_atomic(file_path, data)
         except Exception as e:
             print(f"Ошибка при сохранении файла: {e}")
 
@@ -107,9 +114,7 @@ class DataProcessor:
         '2021-03-31 12:00:00'
         """
         try:
-            date_time = datetime.utcfromtimestamp(data_wall["date"])
-            formatted_date = date_time.strftime("%Y-%m-%d %H:%M:%S")
-            data_wall["date"] = formatted_date
+            data_wall["date"] = format_date(data_wall["date"])
         except Exception:
             print('Отсутствует ключ "date" в объекте данных')
 
@@ -136,12 +141,7 @@ class DataProcessor:
         'Мужской'
         """
         try:
-            if data_friends["sex"] == 2:
-                data_friends["sex"] = "Мужской"
-            elif data_friends["sex"] == 1:
-                data_friends["sex"] = "Женский"
-            else:
-                data_friends["sex"] = None
+            data_friends["sex"] = sex_label(data_friends["sex"])
         except Exception:
             print('Отсутствует ключ "sex" в объекте данных')
 
@@ -205,3 +205,42 @@ class DataProcessor:
         """
         for post in wall_data["items"]:
             DataProcessor.time_convertor(post)
+
+    @staticmethod
+    def merge_wall_data(stored, fetched):
+        """
+        Объединяет сохраненные посты с новыми и обновленными.
+
+        Новые посты добавляются целиком, у уже сохраненных постов обновляются только счетчики
+        лайков, комментариев, просмотров и репостов.
+
+        Parameters
+        ----------
+        stored : list of dict
+            Сохраненные посты.
+        fetched : list of dict
+            Посты, полученные при повторном сборе данных.
+
+        Returns
+        -------
+        list of dict
+            Объединенный список постов, отсортированный от новых к старым.
+
+        Examples
+        --------
+        >>> stored = [{'id': 1, 'likes': {'count': 1}}]
+        >>> fetched = [{'id': 2, 'likes': {'count': 0}}, {'id': 1, 'likes': {'count': 5}}]
+        >>> DataProcessor.merge_wall_data(stored, fetched)
+        [{'id': 2, 'likes': {'count': 0}}, {'id': 1, 'likes': {'count': 5}}]
+        """
+        posts = {post["id"]: post for post in stored}
+
+        for post in fetched:
+            if post["id"] in posts:
+                for key in COUNTER_KEYS:
+                    if key in post:
+                        posts[post["id"]][key] = post[key]
+            else:
+                posts[post["id"]] = post
+
+        return sorted(posts.values(), key=lambda post: post["id"], reverse=True)
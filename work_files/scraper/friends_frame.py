@@ -0,0 +1,201 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scraper.records import SEX_LABELS, Friend
+
+SEX_CODES = {label: code for code, label in SEX_LABELS.items()}
+BIRTH_YEAR_PATTERN = r"^[^.]*\.[^.]*\.(\d+)$"
+MIN_AGE = 5
+MAX_AGE = 90
+
+
+class FriendsFrame:
+    """
+    Колоночное представление списка друзей для вычисления распределений.
+
+    Список друзей проходится в Python один раз, чтобы собрать значения полей в столбцы.
+    Дальше год рождения разбирается векторно, пол хранится кодом int8, а города — категориями,
+    поэтому распределения возрастов, полов и городов вычисляются через np.bincount без циклов
+    по объектам. Это важно для графа друзей друзей, где записей сотни тысяч.
+
+    Attributes
+    ----------
+    ids : np.ndarray
+        Идентификаторы друзей (int64).
+    birth_year : np.ndarray
+        Год рождения (int16); 0 — год не указан.
+    sex : np.ndarray
+        Пол в формате VK API (int8): 1 — женский, 2 — мужской, 0 — не указан.
+    city_id : np.ndarray
+        Идентификатор города (int32); 0 — город не указан.
+    city : pd.Categorical
+        Название города; категории упорядочены по первому появлению в списке.
+    sex_labels : bool
+        True, если пол во входных данных был конвертирован в 'Мужской'/'Женский'; тогда
+        распределение полов возвращается с такими же подписями.
+
+    Methods
+    -------
+    from_friends(friends)
+        Строит представление из списка друзей.
+    ages(year=None)
+        Вычисляет распределение возрастов друзей.
+    genders()
+        Вычисляет распределение полов среди друзей.
+    cities()
+        Вычисляет распределение городов, в которых живут друзья.
+    distributions()
+        Вычисляет все распределения сразу.
+
+    Examples
+    --------
+    >>> frame = FriendsFrame.from_friends(
+    ...     [{'id': 1, 'sex': 2, 'bdate': '1.1.1990', 'city': {'id': 1, 'title': 'Москва'}}]
+    ... )
+    >>> frame.cities()
+         City  Count
+    0  Москва      1
+    """
+
+    def __init__(self, ids, birth_year, sex, city_id, city, sex_labels=False):
+        self.ids = ids
+        self.birth_year = birth_year
+        self.sex = sex
+        self.city_id = city_id
+        self.city = city
+        self.sex_labels = sex_labels
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return f"FriendsFrame(friends={len(self)}, cities={len(self.city.categories)})"
+
+    @classmethod
+    def from_friends(cls, friends):
+        """
+        Строит представление из списка друзей.
+
+        Parameters
+        ----------
+        friends : list of dict or list of Friend or dict or FriendsFrame
+            Друзья пользователя, ответ friends.get целиком или уже готовое представление.
+
+        Returns
+        -------
+        FriendsFrame
+            Колоночное представление друзей.
+        """
+        if isinstance(friends, cls):
+            return friends
+        if isinstance(friends, dict):
+            friends = friends.get("items", [])
+        friends = friends or []
+
+        ids, bdates, sexes, city_ids, cities = [], [], [], [], []
+        for friend in friends:
+            if isinstance(friend, Friend):
+                ids.append(friend.id or 0)
+                bdates.append(friend.bdate)
+                sexes.append(friend.sex)
+                city_ids.append(0)
+                cities.append(friend.city)
+            else:
+                city = friend.get("city") or {}
+                ids.append(friend.get("id") or 0)
+                bdates.append(friend.get("bdate"))
+                sexes.append(friend.get("sex"))
+                city_ids.append(city.get("id", 0))
+                cities.append(city.get("title"))
+
+        years = (
+            pd.Series(bdates, dtype=object)
+            .str.extract(BIRTH_YEAR_PATTERN, expand=False)
+            .astype(float)
+        )
+        sex = pd.Series(sexes, dtype=object)
+        sex_labels = bool(sex.isin(list(SEX_CODES)).any())
+        codes, categories = pd.factorize(pd.Series(cities, dtype=object))
+
+        return cls(
+            np.asarray(ids, dtype=np.int64),
+            years.fillna(0).to_numpy(dtype=np.int16),
+            pd.to_numeric(sex.replace(SEX_CODES), errors="coerce")
+            .fillna(0)
+            .to_numpy(dtype=np.int8),
+            np.asarray(city_ids, dtype=np.int32),
+            pd.Categorical.from_codes(codes, categories),
+            sex_labels,
+        )
+
+    def ages(self, year=None):
+        """
+        Вычисляет распределение возрастов друзей.
+
+        Друзья без года рождения не учитываются, а возрасты не старше MIN_AGE и не младше
+        MAX_AGE отбрасываются как нереалистичные.
+
+        Parameters
+        ----------
+        year : int, optional
+            Год, на который считается возраст, по умолчанию текущий.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'Age' и 'Count', упорядоченные по возрасту.
+        """
+        year = year or datetime.now().year
+        known = self.birth_year[self.birth_year > 0].astype(np.int64)
+        ages = year - known
+        counts = np.bincount(ages[(ages > MIN_AGE) & (ages < MAX_AGE)])
+        present = np.flatnonzero(counts)
+        return pd.DataFrame({"Age": present, "Count": counts[present]})
+
+    def genders(self):
+        """
+        Вычисляет распределение полов среди друзей.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'Sex' и 'Count' в порядке первого появления пола в списке друзей.
+        """
+        known = self.sex[self.sex > 0]
+        codes, first = np.unique(known, return_index=True)
+        codes = codes[np.argsort(first)]
+        counts = np.bincount(known)
+        sex = [
+            SEX_LABELS.get(code, code) if self.sex_labels else code
+            for code in codes.tolist()
+        ]
+        return pd.DataFrame({"Sex": sex, "Count": counts[codes]})
+
+    def cities(self):
+        """
+        Вычисляет распределение городов, в которых живут друзья.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы 'City' и 'Count' в порядке первого появления города в списке друзей.
+        """
+        codes = self.city.codes
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.city.categories))
+        return pd.DataFrame({"City": list(self.city.categories), "Count": counts})
+
+    def distributions(self):
+        """
+        Вычисляет все распределения сразу.
+
+        Returns
+        -------
+        dict
+            Словарь с ключами 'ages', 'genders' и 'cities'.
+        """
+        return {
+            "ages": self.ages(),
+            "genders": self.genders(),
+            "cities": self.cities(),
+        }
@@ -0,0 +1,394 @@
+import numpy as np
+import vk_api
+
+EXECUTE_LIMIT = 25
+ID_DTYPE = np.uint32
+INDEX_DTYPE = np.int32
+
+FRIENDS_BATCH_SCRIPT = """
+var ids = [%(ids)s];
+var result = [];
+var i = 0;
+while (i < ids.length) {
+    var friends = API.friends.get({"user_id": ids[i]});
+    if (friends) {
+        result.push(friends.items);
+    } else {
+        result.push(null);
+    }
+    i = i + 1;
+}
+return result;
+"""
+
+
+class VisitedSet:
+    """
+    Компактное множество идентификаторов пользователей.
+
+    Идентификаторы хранятся в отсортированном массиве NumPy (4 байта на пользователя),
+    а проверка принадлежности выполняется бинарным поиском сразу для всего массива.
+
+    Attributes
+    ----------
+    ids : np.ndarray
+        Отсортированный массив уникальных идентификаторов.
+
+    Methods
+    -------
+    filter_new(ids)
+        Возвращает идентификаторы, которых еще нет в множестве.
+    add(ids)
+        Добавляет идентификаторы в множество.
+    """
+
+    def __init__(self):
+        """
+        Инициализирует пустое множество.
+        """
+        self.ids = np.empty(0, dtype=ID_DTYPE)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def filter_new(self, ids):
+        """
+        Возвращает идентификаторы, которых еще нет в множестве.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Массив идентификаторов.
+
+        Returns
+        -------
+        np.ndarray
+            Отсортированный массив уникальных идентификаторов, отсутствующих в множестве.
+        """
+        ids = np.unique(np.asarray(ids, dtype=ID_DTYPE))
+        if not len(self.ids):
+            return ids
+        positions = np.searchsorted(self.ids, ids)
+        positions[positions == len(self.ids)] = 0
+        return ids[self.ids[positions] != ids]
+
+    def add(self, ids):
+        """
+        Добавляет идентификаторы в множество.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Массив идентификаторов.
+        """
+        self.ids = np.union1d(self.ids, np.asarray(ids, dtype=ID_DTYPE))
+
+
+class FriendsGraph:
+    """
+    Граф дружбы в формате CSR (compressed sparse row).
+
+    Вершины нумеруются подряд; соседи вершины i — это neighbours[offsets[i]:offsets[i + 1]].
+
+    Attributes
+    ----------
+    ids : np.ndarray
+        Идентификатор пользователя ВКонтакте для каждой вершины (отсортирован по возрастанию).
+    offsets : np.ndarray
+        Массив смещений длины num_nodes + 1.
+    neighbours : np.ndarray
+        Номера вершин-соседей.
+
+    Methods
+    -------
+    from_edges(src, dst, symmetric=True)
+        Строит граф из массивов ребер.
+    index_of(user_id)
+        Возвращает номер вершины пользователя.
+    friends_of(user_id)
+        Возвращает идентификаторы друзей пользователя.
+    degrees()
+        Возвращает степень каждой вершины.
+    save(file_path)
+        Сохраняет граф в файл .npz.
+    load(file_path)
+        Загружает граф из файла .npz.
+    """
+
+    def __init__(self, ids, offsets, neighbours):
+        """
+        Инициализирует граф из готовых массивов CSR.
+
+        Parameters
+        ----------
+        ids : np.ndarray
+            Идентификаторы пользователей для вершин.
+        offsets : np.ndarray
+            Массив смещений.
+        neighbours : np.ndarray
+            Номера вершин-соседей.
+        """
+        self.ids = ids
+        self.offsets = offsets
+        self.neighbours = neighbours
+
+    @property
+    def num_nodes(self):
+        return len(self.ids)
+
+    @property
+    def num_edges(self):
+        return len(self.neighbours)
+
+    @classmethod
+    def from_edges(cls, src, dst, symmetric=True):
+        """
+        Строит граф из массивов ребер.
+
+        Parameters
+        ----------
+        src : np.ndarray
+            Идентификаторы пользователей — начала ребер.
+        dst : np.ndarray
+            Идентификаторы пользователей — концы ребер.
+        symmetric : bool, optional
+            Если True, для каждого ребра добавляется обратное, по умолчанию True.
+
+        Returns
+        -------
+        FriendsGraph
+            Граф без повторяющихся ребер.
+
+        Examples
+        --------
+        >>> graph = FriendsGraph.from_edges(np.array([1, 1]), np.array([2, 3]))
+        >>> graph.friends_of(1)
+        array([2, 3], dtype=uint32)
+        """
+        ids, inverse = np.unique(np.concatenate([src, dst]), return_inverse=True)
+        ids = ids.astype(ID_DTYPE)
+        source = inverse[: len(src)]
+        target = inverse[len(src) :]
+        if symmetric:
+            source, target = np.concatenate([source, target]), np.concatenate(
+                [target, source]
+            )
+
+        n = len(ids)
+        keys = np.unique(source.astype(np.int64) * n + target)
+        source = (keys // n).astype(INDEX_DTYPE)
+        neighbours = (keys % n).astype(INDEX_DTYPE)
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=n), out=offsets[1:])
+        return cls(ids, offsets, neighbours)
+
+    def index_of(self, user_id):
+        """
+        Возвращает номер вершины пользователя.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        int or None
+            Номер вершины или None, если пользователя нет в графе.
+        """
+        index = int(np.searchsorted(self.ids, user_id))
+        if index < self.num_nodes and self.ids[index] == user_id:
+            return index
+        return None
+
+    def friends_of(self, user_id):
+        """
+        Возвращает идентификаторы друзей пользователя.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        np.ndarray
+            Идентификаторы друзей; пустой массив, если пользователя нет в графе.
+        """
+        index = self.index_of(user_id)
+        if index is None:
+            return np.empty(0, dtype=ID_DTYPE)
+        return self.ids[self.neighbours[self.offsets[index] : self.offsets[index + 1]]]
+
+    def degrees(self):
+        """
+        Возвращает степень каждой вершины.
+
+        Returns
+        -------
+        np.ndarray
+            Количество соседей для каждой вершины.
+        """
+        return np.diff(self.offsets)
+
+    def save(self, file_path):
+        """
+        Сохраняет граф в файл .npz.
+
+        Parameters
+        ----------
+        file_path : str
+            Путь к файлу.
+        """
+        np.savez_compressed(
+            file_path, ids=self.ids, offsets=self.offsets, neighbours=self.neighbours
+        )
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Загружает граф из файла .npz.
+
+        Parameters
+        ----------
+        file_path : str
+            Путь к файлу.
+
+        Returns
+        -------
+        FriendsGraph
+            Загруженный граф.
+        """
+        with np.load(file_path) as data:
+            return cls(data["ids"], data["offsets"], data["neighbours"])
+
+
+class FriendsGraphCrawler:
+    """
+    Класс для обхода графа друзей пользователя на заданную глубину.
+
+    Списки друзей запрашиваются пакетами по 25 пользователей одним вызовом execute. Уже
+    обработанные пользователи пропускаются, а ребра накапливаются в массивах NumPy.
+
+    Attributes
+    ----------
+    profile : VkProfile
+        Экземпляр класса VkProfile для взаимодействия с VK API.
+    depth : int
+        Глубина обхода: 1 — только друзья пользователя, 2 — друзья друзей и т.д.
+    batch_size : int
+        Количество пользователей в одном вызове execute.
+    max_nodes : int or None
+        Максимальное количество пользователей, списки друзей которых будут запрошены.
+
+    Methods
+    -------
+    crawl(user_id)
+        Обходит граф друзей пользователя и возвращает его в формате CSR.
+    fetch_friends(user_ids)
+        Получает списки друзей нескольких пользователей одним вызовом execute.
+    """
+
+    def __init__(self, profile, depth=2, batch_size=EXECUTE_LIMIT, max_nodes=None):
+        """
+        Инициализирует обходчик графа друзей.
+
+        Parameters
+        ----------
+        profile : VkProfile
+            Экземпляр класса VkProfile для взаимодействия с VK API.
+        depth : int, optional
+            Глубина обхода, по умолчанию 2.
+        batch_size : int, optional
+            Количество пользователей в одном вызове execute (от 1 до 25), по умолчанию 25.
+        max_nodes : int, optional
+            Максимальное количество запрошенных списков друзей, по умолчанию без ограничения.
+        """
+        self.profile = profile
+        self.depth = depth
+        self.batch_size = max(1, min(batch_size, EXECUTE_LIMIT))
+        self.max_nodes = max_nodes
+
+    def crawl(self, user_id):
+        """
+        Обходит граф друзей пользователя и возвращает его в формате CSR.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя, с которого начинается обход.
+
+        Returns
+        -------
+        FriendsGraph
+            Граф дружбы, содержащий все найденные ребра.
+
+        Examples
+        --------
+        >>> crawler = FriendsGraphCrawler(VkProfile(token), depth=2)
+        >>> graph = crawler.crawl(1)
+        >>> graph.save('friends_graph.npz')
+        """
+        visited = VisitedSet()
+        frontier = np.array([user_id], dtype=ID_DTYPE)
+        sources = []
+        targets = []
+
+        for level in range(self.depth):
+            frontier = visited.filter_new(frontier)
+            if self.max_nodes is not None:
+                frontier = frontier[: max(0, self.max_nodes - len(visited))]
+            if not len(frontier):
+                break
+            visited.add(frontier)
+
+            found = []
+            for start in range(0, len(frontier), self.batch_size):
+                batch = frontier[start : start + self.batch_size]
+                lists = self.fetch_friends(batch)
+                if lists is None:
+                    continue
+                for source, friends in zip(batch, lists):
+                    if not friends:
+                        continue
+                    friends = np.asarray(friends, dtype=ID_DTYPE)
+                    sources.append(np.full(len(friends), source, dtype=ID_DTYPE))
+                    targets.append(friends)
+                    found.append(friends)
+
+            print(
+                f"Уровень {level + 1}: обработано {len(frontier)} пользователей, "
+                f"ребер {sum(len(t) for t in targets)}"
+            )
+            frontier = np.concatenate(found) if found else np.empty(0, dtype=ID_DTYPE)
+
+        if not sources:
+            return FriendsGraph.from_edges(
+                np.empty(0, dtype=ID_DTYPE), np.empty(0, dtype=ID_DTYPE)
+            )
+        return FriendsGraph.from_edges(np.concatenate(sources), np.concatenate(targets))
+
+    def fetch_friends(self, user_ids):
+        """
+        Получает списки друзей нескольких пользователей одним вызовом execute.
+
+        Parameters
+        ----------
+        user_ids : np.ndarray
+            Идентификаторы пользователей (не более 25).
+
+        Returns
+        -------
+        list or None
+            Списки идентификаторов друзей в порядке user_ids (None для закрытых и удаленных
+            профилей), если запрос успешен, иначе None.
+        """
+        try:
+            return self.profile.api.execute(
+                code=FRIENDS_BATCH_SCRIPT % {"ids": ",".join(map(str, user_ids))}
+            )
+        except vk_api.ApiError as e:
+            print(f"Ошибка API ВКонтакте при запросе списков друзей: {e}")
+        except Exception as e:
+            print(f"Произошла ошибка при запросе списков друзей: {e}")
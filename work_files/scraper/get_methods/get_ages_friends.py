@@ -1,9 +1,10 @@
-from datetime import datetime
-
 import pandas as pd
+from scraper.aggregators import AgesAggregator
+from scraper.friends_frame import FriendsFrame
+from scraper.sampling import add_intervals
 
 
-def ages_info(friends):
+def ages_info(friends, population=None, confidence=0.95):
     """
     Вычисляет распределение возрастов друзей.
 
@@ -12,14 +13,21 @@ def ages_info(friends):
 
     Parameters
     ----------
-    friends : list of dict
+    friends : list of dict or list of Friend or FriendsFrame
         Список словарей, где каждый словарь представляет собой профиль друга.
         Каждый профиль может содержать ключ 'bdate' с датой рождения в формате 'дд.мм.гггг'.
+    population : int, optional
+        Размер совокупности, если список — случайная выборка (например, из ProfileSampler).
+        Тогда к распределению добавляются доли и доверительные интервалы.
+    confidence : float, optional
+        Уровень доверия интервалов, по умолчанию 0.95.
 
     Returns
     -------
     pd.DataFrame
         DataFrame с двумя столбцами: 'Age' (возраст) и 'Count' (количество друзей данного возраста).
+        Если задан population, добавляются столбцы 'Share', 'Low' и 'High' с долями и
+        границами доверительных интервалов.
 
     Raises
     ------
@@ -37,35 +45,24 @@ def ages_info(friends):
     ... ]
     >>> ages_info(friends)
        Age  Count
-    0   31      1
-    1   36      1
-    2   51      1
-    3   16      1
+    0   16      1
+    1   31      1
+    2   36      1
+    3   51      1
 
     Notes
     -----
     Друзья без указанной даты рождения или с неполной датой (без года) не учитываются в расчетах.
     """
     try:
-        ages = dict()
-
-        for i in friends:
-            if "bdate" in i.keys():
-                year = i["bdate"].split(".")
-                if len(year) == 3:
-                    age = datetime.now().year - int(year[2])
-                    if age not in ages:
-                        ages[age] = 1
-                    else:
-                        ages[age] += 1
-                else:
-                    continue
-            else:
-                continue
-
-        ages = pd.DataFrame(ages.items(), columns=["Age", "Count"])
-
-        return ages[(ages["Age"] > 5) & (ages["Age"] < 90)]
+        friends = FriendsFrame.from_friends(friends)
+        aggregator = AgesAggregator()
+        aggregator.update(friends)
+        if population is None:
+            return aggregator.result()
+        return add_intervals(
+            aggregator.result(), "Count", len(friends), population, confidence
+        )
     except Exception as e:
         print(f"Ошибка в обработке возраста пользователя: {e}")
         return pd.DataFrame(columns=["Age", "Count"])
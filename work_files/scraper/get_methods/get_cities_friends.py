@@ -1,7 +1,10 @@
 import pandas as pd
+from scraper.aggregators import CitiesAggregator
+from scraper.friends_frame import FriendsFrame
+from scraper.sampling import add_intervals
 
 
-def cities_info(friends):
+def cities_info(friends, population=None, confidence=0.95):
     """
     Вычисляет распределение городов, в которых живут друзья.
 
@@ -10,14 +13,21 @@ def cities_info(friends):
 
     Parameters
     ----------
-    friends : list of dict
+    friends : list of dict or list of Friend or FriendsFrame
         Список словарей, где каждый словарь представляет собой профиль друга.
         Каждый профиль может содержать ключ 'city' с вложенным словарем, содержащим ключ 'title' (название города).
+    population : int, optional
+        Размер совокупности, если список — случайная выборка (например, из ProfileSampler).
+        Тогда к распределению добавляются доли и доверительные интервалы.
+    confidence : float, optional
+        Уровень доверия интервалов, по умолчанию 0.95.
 
     Returns
     -------
     pd.DataFrame
         DataFrame с двумя столбцами: 'City' (город) и 'Count' (количество друзей в этом городе).
+        Если задан population, добавляются столбцы 'Share', 'Low' и 'High' с долями и
+        границами доверительных интервалов.
 
     Raises
     ------
@@ -44,21 +54,14 @@ def cities_info(friends):
     Друзья без указанной информации о городе не учитываются в расчетах.
     """
     try:
-        cities = dict()
-
-        for i in friends:
-            if "city" in i.keys():
-                city = i["city"]["title"]
-
-                if city not in cities:
-                    cities[city] = 1
-                else:
-                    cities[city] += 1
-            else:
-                continue
-
-        cities = pd.DataFrame(cities.items(), columns=["City", "Count"])
-        return cities
+        friends = FriendsFrame.from_friends(friends)
+        aggregator = CitiesAggregator()
+        aggregator.update(friends)
+        if population is None:
+            return aggregator.result()
+        return add_intervals(
+            aggregator.result(), "Count", len(friends), population, confidence
+        )
     except Exception as e:
         print(f"Ошибка в обработке города пользователя: {e}")
         return pd.DataFrame(columns=["City", "Count"])
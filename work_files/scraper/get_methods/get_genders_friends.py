@@ -1,7 +1,9 @@
-import pandas as pd
+from scraper.aggregators import GendersAggregator
+from scraper.friends_frame import FriendsFrame
+from scraper.sampling import add_intervals
 
 
-def geenders_info(friends):
+def geenders_info(friends, population=None, confidence=0.95):
     """
     Вычисляет распределение полов среди друзей.
 
@@ -9,14 +11,21 @@ def geenders_info(friends):
 
     Parameters
     ----------
-    friends : list of dict
+    friends : list of dict or list of Friend or FriendsFrame
         Список словарей, где каждый словарь представляет собой профиль друга.
         Каждый профиль может содержать ключ 'sex' с числовым значением, представляющим пол (1 - женский, 2 - мужской).
+    population : int, optional
+        Размер совокупности, если список — случайная выборка (например, из ProfileSampler).
+        Тогда к распределению добавляются доли и доверительные интервалы.
+    confidence : float, optional
+        Уровень доверия интервалов, по умолчанию 0.95.
 
     Returns
     -------
     pd.DataFrame
         DataFrame с двумя столбцами: 'Sex' (пол) и 'Count' (количество друзей данного пола).
+        Если задан population, добавляются столбцы 'Share', 'Low' и 'High' с долями и
+        границами доверительных интервалов.
 
     Raises
     ------
@@ -43,22 +52,14 @@ def geenders_info(friends):
     Друзья без указанной информации о поле не учитываются в расчетах.
     """
     try:
-        genders = dict()
-
-        for i in friends:
-            if "sex" in i.keys():
-                sex = i["sex"]
-                if sex:
-                    if sex not in genders:
-                        genders[sex] = 1
-                    else:
-                        genders[sex] += 1
-                else:
-                    continue
-
-        genders = pd.DataFrame(genders.items(), columns=["Sex", "Count"])
-
-        return genders
+        friends = FriendsFrame.from_friends(friends)
+        aggregator = GendersAggregator()
+        aggregator.update(friends)
+        if population is None:
+            return aggregator.result()
+        return add_intervals(
+            aggregator.result(), "Count", len(friends), population, confidence
+        )
     except Exception as e:
         print(f"Ошибка в обработке пола пользователя: {e}")
         return dict()
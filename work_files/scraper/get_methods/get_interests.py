@@ -1,7 +1,10 @@
 import pandas as pd
+from scraper.aggregators import InterestsAggregator
+from scraper.records import decode_groups
+from scraper.sampling import add_intervals
 
 
-def interests_info(groups):
+def interests_info(groups, population=None, confidence=0.95):
     """
     Вычисляет распределение интересов среди групп.
 
@@ -9,14 +12,21 @@ def interests_info(groups):
 
     Parameters
     ----------
-    groups : list of dict
+    groups : list of dict or list of Group
         Список словарей, где каждый словарь представляет собой информацию о группе.
         Каждый словарь может содержать ключ 'activity', представляющий тип активности группы.
+    population : int, optional
+        Размер совокупности, если список групп — случайная выборка (например, из ProfileSampler).
+        Тогда к распределению добавляются доли и доверительные интервалы.
+    confidence : float, optional
+        Уровень доверия интервалов, по умолчанию 0.95.
 
     Returns
     -------
     pd.DataFrame
         DataFrame с двумя столбцами: 'Activities' (тип активности) и 'States' (количество групп с таким типом активности).
+        Если задан population, добавляются столбцы 'Share', 'Low' и 'High' с долями и
+        границами доверительных интервалов.
 
     Raises
     ------
@@ -44,18 +54,14 @@ def interests_info(groups):
     Группы без указанной информации об активности не учитываются в расчетах.
     """
     try:
-        interests = dict()
-
-        for i in groups:
-            if "activity" in i.keys():
-                act = i["activity"]
-                if act not in interests:
-                    interests[act] = 1
-                else:
-                    interests[act] += 1
-
-        interests = pd.DataFrame(interests.items(), columns=["Activities", "States"])
-        return interests
+        groups = decode_groups(groups)
+        aggregator = InterestsAggregator()
+        aggregator.update(groups)
+        if population is None:
+            return aggregator.result()
+        return add_intervals(
+            aggregator.result(), "States", len(groups), population, confidence
+        )
     except Exception as e:
         print(f"Ошибка в обработке интересов пользователя: {e}")
         return pd.DataFrame(columns=["Activities", "States"])
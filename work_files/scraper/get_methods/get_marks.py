@@ -1,4 +1,5 @@
 import pandas as pd
+from scraper.aggregators import MarksAggregator
 
 
 def marks_info(wall):
@@ -10,7 +11,7 @@ def marks_info(wall):
 
     Parameters
     ----------
-    wall : list of dict
+    wall : list of dict or list of Post
         Список словарей, где каждый словарь представляет собой пост на стене пользователя.
         Каждый пост может содержать ключи 'likes', 'comments', 'views' и 'reposts' с информацией о количестве.
 
@@ -44,30 +45,9 @@ def marks_info(wall):
     Посты без указанных ключей ('likes', 'comments', 'views', 'reposts') не учитываются в расчетах.
     """
     try:
-        likes = 0
-        comments = 0
-        views = 0
-        reposts = 0
-
-        for i in wall:
-            if "likes" in i.keys():
-                likes += i["likes"]["count"]
-
-            if "comments" in i.keys():
-                comments += i["comments"]["count"]
-
-            if "views" in i.keys():
-                views += i["views"]["count"]
-
-            if "reposts" in i.keys():
-                reposts += i["reposts"]["count"]
-
-        return pd.DataFrame(
-            {
-                "stats": ["likes", "comments", "views", "reposts"],
-                "values": [likes, comments, views, reposts],
-            }
-        )
+        aggregator = MarksAggregator()
+        aggregator.update(wall)
+        return aggregator.result()
     except Exception as e:
         print(f"Ошибка в обработке статистики пользователя: {e}")
         return pd.DataFrame(columns=["stats", "values"])
@@ -1,4 +1,5 @@
 import pandas as pd
+from scraper.aggregators import StatAggregator
 
 
 def stat_info(wall):
@@ -10,7 +11,7 @@ def stat_info(wall):
 
     Parameters
     ----------
-    wall : list of dict
+    wall : list of dict or list of Post
         Список словарей, где каждый словарь представляет собой пост на стене пользователя.
         Каждый пост должен содержать ключ 'date' с датой в формате 'YYYY-MM-DD'.
 
@@ -45,17 +46,9 @@ def stat_info(wall):
     Посты без указанного ключа 'date' не учитываются в расчетах.
     """
     try:
-        posts = dict()
-
-        for i in wall:
-            if "date" in i.keys():
-                date = i["date"][:7]
-                if date not in posts:
-                    posts[date] = 1
-                else:
-                    posts[date] += 1
-
-        return pd.DataFrame(posts.items(), columns=["Mounth", "Count posts"])
+        aggregator = StatAggregator()
+        aggregator.update(wall)
+        return aggregator.result()
     except Exception as e:
         print(f"Ошибка в обработке cтатистики пользователя: {e}")
-        return pd.DataFrame(lumns=["Mounth", "Count posts"])
+        return pd.DataFrame(columns=["Mounth", "Count posts"])
@@ -1,25 +1,62 @@
-import re
+import os
 
+import numpy as np
 import pandas as pd
-import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
+from scraper.inference_service import ServiceError, ServiceOverloaded, connect
+from scraper.model_registry import TOXIC_MODEL, registry
+from scraper.records import decode_wall
+from scraper.toxicity_cache import default_cache, normalize_text, text_hash
+
+TOXIC_LABELS = ("Non-toxic", "Insult", "Obscenity", "Threat", "Dangerous")
 
 
 class Toxic:
     """
     Класс для определения токсичности текстов с использованием модели 'cointegrated/rubert-tiny-toxicity'.
 
+    Модель загружается один раз на процесс через реестр моделей, поэтому создание экземпляра
+    после первой загрузки ничего не стоит. Посты оцениваются пакетами: тексты сортируются
+    по длине, соседние по длине тексты токенизируются одним вызовом с дополнением до самого
+    длинного текста пакета и проходят через модель одним прямым проходом. Если задана
+    переменная окружения TOXIC_SERVICE, тексты оцениваются в отдельном сервисе инференса,
+    который объединяет запросы всех процессов в общие пакеты. Вероятности
+    сохраняются в дисковом кэше по хэшу нормализованного текста и версии модели, и модель
+    получает только тексты, которых в кэше еще нет.
+
     Attributes
     ----------
+    handle : ModelHandle, OnnxModelHandle or InferenceClient
+        Общая для процесса модель из реестра или подключение к сервису инференса.
     tokinizer : transformers.AutoTokenizer
         Токенизатор, используемый для преобразования текста в тензоры.
-    model : transformers.AutoModelForSequenceClassification
-        Модель для классификации текстов на токсичность.
+    model : transformers.AutoModelForSequenceClassification or None
+        Модель для классификации текстов на токсичность; None для модели в ONNX Runtime
+        и в сервисе инференса.
+    batch_size : int
+        Количество текстов в одном пакете.
+    max_length : int or None
+        Максимальная длина текста в токенах; None — ограничение токенизатора.
+    backend : str or None
+        Реализация модели, запрошенная для этого процесса.
+    cache : ToxicityCache or None
+        Кэш вероятностей; None — тексты всегда оцениваются моделью.
+    model_version : str
+        Версия модели в ключах кэша: название, реализация и ограничение длины.
 
     Methods
     -------
+    use_handle(handle)
+        Переключает экземпляр на другую модель или подключение к сервису.
+    configured_version(model=TOXIC_MODEL, backend=None, max_length=None)
+        Возвращает версию модели по настройкам, не загружая модель.
+    load_handle(model, backend)
+        Подключается к сервису инференса или получает модель из реестра.
     text_toxicity(text, aggregate=False)
         Определяет вероятность токсичности для заданного текста.
+    score_texts(texts)
+        Вычисляет вероятности токсичности для списка текстов с учетом кэша.
+    predict_batches(texts)
+        Вычисляет вероятности токсичности моделью пакетами.
     process_set(wall)
         Обрабатывает список постов и возвращает DataFrame с текстами постов.
     apply_toxicity(row)
@@ -28,13 +65,116 @@ class Toxic:
         Возвращает среднюю вероятность различных типов токсичности для списка постов.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        model=TOXIC_MODEL,
+        batch_size=None,
+        max_length=None,
+        backend=None,
+        cache=None,
+    ):
+        """
+        Получает токенизатор и модель для определения токсичности текстов из реестра моделей
+        или подключается к сервису инференса.
+
+        Parameters
+        ----------
+        model : str, optional
+            Название модели, по умолчанию TOXIC_MODEL.
+        batch_size : int, optional
+            Количество текстов в одном пакете, по умолчанию значение переменной окружения
+            TOXIC_BATCH_SIZE или 32.
+        max_length : int, optional
+            Максимальная длина текста в токенах, по умолчанию значение переменной окружения
+            TOXIC_MAX_LENGTH или ограничение токенизатора.
+        backend : str, optional
+            Реализация модели: 'torch' или 'onnx' (квантованная до int8 в ONNX Runtime),
+            по умолчанию значение переменной окружения TOXIC_BACKEND или 'torch'.
+        cache : ToxicityCache, optional
+            Кэш вероятностей, по умолчанию общий для процесса кэш из default_cache()
+            (отключается переменной окружения TOXICITY_CACHE=0).
+        """
+        max_length = max_length or os.getenv("TOXIC_MAX_LENGTH")
+        self.batch_size = batch_size or int(os.getenv("TOXIC_BATCH_SIZE", "32"))
+        self.max_length = int(max_length) if max_length else None
+        self.backend = backend
+        self.cache = cache or default_cache()
+        self.use_handle(self.load_handle(model, backend))
+
+    def use_handle(self, handle):
         """
-        Инициализирует токенизатор и модель для определения токсичности текстов.
+        Переключает экземпляр на другую модель или подключение к сервису.
+
+        Parameters
+        ----------
+        handle : ModelHandle, OnnxModelHandle or InferenceClient
+            Модель или подключение к сервису.
+        """
+        self.handle = handle
+        self.tokinizer = handle.tokenizer
+        self.model = getattr(handle, "model", None)
+        self.model_version = f"{handle.name}:{handle.backend}:{self.max_length or 0}"
+
+    @staticmethod
+    def configured_version(model=TOXIC_MODEL, backend=None, max_length=None):
+        """
+        Возвращает версию модели по настройкам, не загружая модель.
+
+        Версия строится так же, как model_version, но реализация берется из настроек,
+        а не из загруженной модели, поэтому ее можно использовать в ключах кэша до
+        создания экземпляра.
+
+        Parameters
+        ----------
+        model : str, optional
+            Название модели, по умолчанию TOXIC_MODEL.
+        backend : str, optional
+            Реализация модели, по умолчанию значение переменной окружения TOXIC_BACKEND
+            или 'torch'.
+        max_length : int, optional
+            Максимальная длина текста в токенах, по умолчанию значение переменной окружения
+            TOXIC_MAX_LENGTH или ограничение токенизатора.
+
+        Returns
+        -------
+        str
+            Название модели, реализация и ограничение длины.
+        """
+        name, backend = registry.key(model, backend)
+        max_length = max_length or os.getenv("TOXIC_MAX_LENGTH")
+        return f"{name}:{backend}:{int(max_length) if max_length else 0}"
+
+    @staticmethod
+    def load_handle(model, backend):
+        """
+        Подключается к сервису инференса или получает модель из реестра.
+
+        Сервис используется, если переменная окружения TOXIC_SERVICE содержит путь к его
+        Unix-сокету; если подключиться не удалось, модель загружается в этом процессе.
+
+        Parameters
+        ----------
+        model : str
+            Название модели.
+        backend : str or None
+            Реализация модели: 'torch' или 'onnx'.
+
+        Returns
+        -------
+        ModelHandle, OnnxModelHandle or InferenceClient
+            Модель или подключение к сервису.
         """
-        MODEL = "cointegrated/rubert-tiny-toxicity"
-        self.tokinizer = AutoTokenizer.from_pretrained(MODEL)
-        self.model = AutoModelForSequenceClassification.from_pretrained(MODEL)
+        if address := os.getenv("TOXIC_SERVICE"):
+            try:
+                client = connect(address)
+                if client.name == model:
+                    return client
+                print(
+                    f"Сервис инференса {address} обслуживает другую модель: {client.name}"
+                )
+            except Exception as e:
+                print(f"Ошибка при подключении к сервису инференса {address}: {e}")
+        return registry.get(model, backend)
 
     def text_toxicity(self, text, aggregate=False):
         """
@@ -52,24 +192,116 @@ class Toxic:
         numpy.ndarray or float
             Вероятность каждого типа токсичности для каждого текста или агрегированная вероятность токсичности.
         """
-        with torch.no_grad():
-            inputs = self.tokinizer(
-                text, return_tensors="pt", truncation=True, padding=True
-            ).to(self.model.device)
-            proba = torch.sigmoid(self.model(**inputs).logits).cpu().numpy()
+        proba = self.handle.predict(text, self.max_length)
         if isinstance(text, str):
             proba = proba[0]
         if aggregate:
             return 1 - proba.T[0] * (1 - proba.T[-1])
         return proba
 
+    def score_texts(self, texts):
+        """
+        Вычисляет вероятности токсичности для списка текстов с учетом кэша.
+
+        Повторяющиеся тексты оцениваются один раз, вероятности найденных в кэше текстов
+        берутся из него, а остальные тексты оцениваются моделью и сохраняются в кэш.
+        Версия модели читается один раз до поиска в кэше и один раз после оценки: если
+        сервис инференса отказал и тексты оценила модель этого процесса, новые вероятности
+        сохраняются под ее версией, а не под версией сервиса.
+
+        Parameters
+        ----------
+        texts : list of str
+            Нормализованные тексты для анализа токсичности.
+
+        Returns
+        -------
+        numpy.ndarray
+            Матрица len(texts) x len(TOXIC_LABELS) с вероятностями каждого типа токсичности.
+        """
+        codes, unique = pd.factorize(pd.Series(texts, dtype=object))
+        unique = list(unique)
+        hashes = [text_hash(text) for text in unique]
+        scores = np.zeros((len(unique), len(TOXIC_LABELS)), dtype=np.float32)
+
+        version = self.model_version
+        found = {}
+        if self.cache is not None and hashes:
+            try:
+                found = self.cache.get_many(hashes, version)
+            except Exception as e:
+                print(f"Ошибка при чтении кэша токсичности: {e}")
+        missing = [i for i, key in enumerate(hashes) if key not in found]
+        for i, key in enumerate(hashes):
+            if key in found:
+                scores[i] = found[key]
+
+        if missing:
+            scores[missing] = self.predict_batches([unique[i] for i in missing])
+            version = self.model_version
+            if self.cache is not None:
+                try:
+                    self.cache.put_many(
+                        [hashes[i] for i in missing],
+                        version,
+                        scores[missing],
+                    )
+                except Exception as e:
+                    print(f"Ошибка при сохранении кэша токсичности: {e}")
+
+        return scores[codes]
+
+    def predict_batches(self, texts):
+        """
+        Вычисляет вероятности токсичности моделью пакетами.
+
+        Тексты сортируются по длине и делятся на пакеты по batch_size, поэтому в пакете
+        почти нет дополнения, а каждый пакет токенизируется одним вызовом и проходит через
+        модель одним прямым проходом. Результаты возвращаются в исходном порядке. Сервису
+        инференса тексты передаются целиком: клиент сам делит их на части, а пакеты
+        собирает сервис. Если сервис перегружен, недоступен или не ответил вовремя,
+        экземпляр переключается на модель в этом процессе.
+
+        Parameters
+        ----------
+        texts : list of str
+            Тексты для анализа токсичности.
+
+        Returns
+        -------
+        numpy.ndarray
+            Матрица len(texts) x len(TOXIC_LABELS) с вероятностями каждого типа токсичности.
+        """
+        if self.handle.remote:
+            try:
+                return self.handle.predict(texts, self.max_length)
+            except (
+                ServiceOverloaded,
+                ServiceError,
+                ConnectionError,
+                TimeoutError,
+            ) as e:
+                print(
+                    f"Ошибка сервиса инференса, модель загружается в этом процессе: {e}"
+                )
+                self.use_handle(registry.get(self.handle.name, self.backend))
+
+        scores = np.zeros((len(texts), len(TOXIC_LABELS)), dtype=np.float32)
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start : start + self.batch_size]
+            scores[batch] = self.handle.predict(
+                [texts[i] for i in batch], self.max_length
+            )
+        return scores
+
     def process_set(self, wall):
         """
         Обрабатывает список постов и возвращает DataFrame с текстами постов.
 
         Parameters
         ----------
-        wall : list of dict
+        wall : list of dict or list of Post
             Список словарей, где каждый словарь представляет собой пост на стене пользователя.
             Каждый пост должен содержать ключ 'text' или 'copy_history'.
 
@@ -78,17 +310,13 @@ class Toxic:
         pd.DataFrame
             DataFrame с одним столбцом 'Text', содержащим обработанные тексты постов.
         """
-        posts = pd.DataFrame(columns=["Text"])
+        texts = []
 
-        for i in wall:
-            if text := i["text"]:
-                text = re.sub(r"[\n\t]", " ", text)
-                posts.loc[len(posts.index)] = re.sub(r"[^\w\s]", "", text)
-            elif ("copy_history" in i) and (text := i["copy_history"][0]["text"]):
-                text = re.sub(r"[\n\t]", " ", text)
-                posts.loc[len(posts.index)] = re.sub(r"[^\w\s]", "", text)
+        for post in decode_wall(wall):
+            if text := post.text or post.copy_text:
+                texts.append(normalize_text(text))
 
-        return posts
+        return pd.DataFrame({"Text": texts}, dtype=object)
 
     def apply_toxicity(self, row):
         """
@@ -105,11 +333,8 @@ class Toxic:
             Строка DataFrame с добавленными вероятностями токсичности.
         """
         proba = self.text_toxicity(row["Text"])
-        row["Non-toxic"] = proba[0]
-        row["Insult"] = proba[1]
-        row["Obscenity"] = proba[2]
-        row["Threat"] = proba[3]
-        row["Dangerous"] = proba[4]
+        for label, value in zip(TOXIC_LABELS, proba):
+            row[label] = value
         return row
 
     def toxicity_info(self, wall):
@@ -127,16 +352,9 @@ class Toxic:
             DataFrame с вероятностями различных типов токсичности.
         """
         posts = self.process_set(wall)
-
-        posts["Non-toxic"] = 0
-        posts["Insult"] = 0
-        posts["Obscenity"] = 0
-        posts["Threat"] = 0
-        posts["Dangerous"] = 0
-
-        posts = posts.apply(self.apply_toxicity, axis=1)
+        scores = self.score_texts(posts["Text"].tolist())
 
         return pd.DataFrame(
-            posts[["Non-toxic", "Insult", "Obscenity", "Threat", "Dangerous"]].mean(),
+            pd.DataFrame(scores, columns=list(TOXIC_LABELS), dtype=np.float64).mean(),
             columns=["Probability"],
         )
@@ -0,0 +1,579 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+import numpy as np
+import torch
+from scraper.model_registry import TOXIC_MODEL, registry
+
+DEFAULT_SOCKET_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data_base",
+    "inference.sock",
+)
+OVERLOADED = "overloaded"
+OVERLOAD_RETRIES = 5
+OVERLOAD_BACKOFF = 0.05
+
+
+class ServiceOverloaded(Exception):
+    """
+    Исключение, возникающее, когда в очереди сервиса инференса слишком много текстов.
+    """
+
+
+class ServiceError(RuntimeError):
+    """
+    Исключение, возникающее, когда сервис инференса не смог обработать запрос.
+    """
+
+
+def service_authkey():
+    """
+    Возвращает ключ аутентификации подключений к сервису инференса.
+
+    Returns
+    -------
+    bytes or None
+        Значение переменной окружения TOXIC_SERVICE_KEY или None, если она не задана.
+    """
+    key = os.getenv("TOXIC_SERVICE_KEY")
+    return key.encode() if key else None
+
+
+class InferenceServer:
+    """
+    Сервис инференса модели токсичности, работающий в отдельном процессе.
+
+    Веб-процессы подключаются к сервису через Unix-сокет и присылают тексты. Запросы всех
+    подключений попадают в одну очередь, из которой собираются микропакеты: после первого
+    запроса сервис ждет следующие не дольше max_wait или пока в пакете не наберется max_batch
+    текстов. Тексты пакета сортируются по длине и проходят через модель пакетами
+    по max_batch, а вероятности возвращаются каждому клиенту по его запросам. Если в очереди
+    уже больше max_pending текстов, новый запрос сразу отклоняется, чтобы клиенты не ждали
+    дольше, чем готовы; запрос в пустую очередь принимается при любом размере.
+
+    Сообщения подключений распаковываются pickle, поэтому сокет создается доступным только
+    владельцу (0600), а если задана переменная окружения TOXIC_SERVICE_KEY, клиенты
+    дополнительно проходят аутентификацию этим ключом до первого сообщения.
+
+    Attributes
+    ----------
+    address : str
+        Путь к Unix-сокету.
+    model : str
+        Название модели.
+    backend : str or None
+        Реализация модели: 'torch' или 'onnx'.
+    max_batch : int
+        Максимальное количество текстов в пакете.
+    max_wait : float
+        Максимальное время ожидания запросов для пакета в секундах.
+    max_pending : int
+        Максимальное количество текстов в очереди.
+    threads : int or None
+        Количество потоков PyTorch и ONNX Runtime.
+    pending : int
+        Количество текстов в очереди и в обработке.
+
+    Methods
+    -------
+    serve_forever()
+        Загружает модель и принимает подключения.
+    handle_connection(connection)
+        Принимает запросы одного подключения.
+    collect_batch()
+        Собирает микропакет запросов.
+    run_batch(batch)
+        Вычисляет вероятности для микропакета и отправляет ответы.
+
+    Examples
+    --------
+    >>> InferenceServer('data_base/inference.sock', max_batch=64, max_wait=0.01).serve_forever()
+    """
+
+    def __init__(
+        self,
+        address=None,
+        model=TOXIC_MODEL,
+        backend=None,
+        max_batch=64,
+        max_wait=0.01,
+        max_pending=1024,
+        threads=None,
+    ):
+        """
+        Инициализирует сервис.
+
+        Parameters
+        ----------
+        address : str, optional
+            Путь к Unix-сокету, по умолчанию значение переменной окружения TOXIC_SERVICE
+            или data_base/inference.sock.
+        model : str, optional
+            Название модели, по умолчанию TOXIC_MODEL.
+        backend : str, optional
+            Реализация модели: 'torch' или 'onnx', по умолчанию значение переменной
+            окружения TOXIC_BACKEND или 'torch'.
+        max_batch : int, optional
+            Максимальное количество текстов в пакете, по умолчанию 64.
+        max_wait : float, optional
+            Максимальное время ожидания запросов для пакета в секундах, по умолчанию 0.01.
+        max_pending : int, optional
+            Максимальное количество текстов в очереди, по умолчанию 1024.
+        threads : int, optional
+            Количество потоков PyTorch и ONNX Runtime, по умолчанию выбирается библиотеками.
+        """
+        self.address = address or os.getenv("TOXIC_SERVICE", DEFAULT_SOCKET_PATH)
+        self.model = model
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.threads = threads
+        self.pending = 0
+        self.handle = None
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+
+    def serve_forever(self):
+        """
+        Загружает модель и принимает подключения.
+        """
+        if self.threads:
+            torch.set_num_threads(self.threads)
+            os.environ.setdefault("TOXIC_ONNX_THREADS", str(self.threads))
+        self.handle = registry.get(self.model, self.backend)
+        threading.Thread(target=self.batch_loop, name="batcher", daemon=True).start()
+
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        os.makedirs(os.path.dirname(os.path.abspath(self.address)), exist_ok=True)
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(
+                self.address, family="AF_UNIX", authkey=service_authkey()
+            )
+        finally:
+            os.umask(umask)
+        os.chmod(self.address, 0o600)
+        with listener:
+            print(
+                f"Сервис инференса {self.handle.name} ({self.handle.backend}) "
+                f"слушает {self.address}"
+            )
+            while True:
+                try:
+                    connection = listener.accept()
+                except (AuthenticationError, OSError) as e:
+                    print(f"Ошибка при подключении клиента к сервису инференса: {e}")
+                    continue
+                threading.Thread(
+                    target=self.handle_connection, args=(connection,), daemon=True
+                ).start()
+
+    def handle_connection(self, connection):
+        """
+        Принимает запросы одного подключения.
+
+        Сначала клиенту отправляются название и реализация модели, max_batch
+        и max_pending, затем каждый запрос (id, тексты, max_length) ставится в общую
+        очередь или сразу отклоняется, если очередь переполнена.
+
+        Parameters
+        ----------
+        connection : multiprocessing.connection.Connection
+            Подключение клиента.
+        """
+        send_lock = threading.Lock()
+        try:
+            connection.send(
+                (
+                    self.handle.name,
+                    self.handle.backend,
+                    self.max_batch,
+                    self.max_pending,
+                )
+            )
+            while True:
+                request_id, texts, max_length = connection.recv()
+                with self.lock:
+                    accepted = (
+                        self.pending == 0
+                        or self.pending + len(texts) <= self.max_pending
+                    )
+                    if accepted:
+                        self.pending += len(texts)
+                if accepted:
+                    self.requests.put(
+                        (connection, send_lock, request_id, texts, max_length)
+                    )
+                else:
+                    self.reply(connection, send_lock, request_id, None, OVERLOADED)
+        except (EOFError, OSError):
+            pass
+        finally:
+            connection.close()
+
+    def batch_loop(self):
+        """
+        Собирает микропакеты и обрабатывает их, пока работает процесс.
+        """
+        while True:
+            self.run_batch(self.collect_batch())
+
+    def collect_batch(self):
+        """
+        Собирает микропакет запросов.
+
+        Returns
+        -------
+        list of tuple
+            Запросы, пришедшие не позже max_wait после первого, но не больше max_batch
+            текстов (первый запрос берется целиком).
+        """
+        batch = [self.requests.get()]
+        size = len(batch[0][3])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request[3])
+        return batch
+
+    def run_batch(self, batch):
+        """
+        Вычисляет вероятности для микропакета и отправляет ответы.
+
+        Parameters
+        ----------
+        batch : list of tuple
+            Запросы (подключение, блокировка отправки, id, тексты, max_length).
+        """
+        groups = {}
+        for request in batch:
+            groups.setdefault(request[4], []).append(request)
+
+        for max_length, requests in groups.items():
+            texts = [text for request in requests for text in request[3]]
+            try:
+                scores = self.predict(texts, max_length)
+                error = None
+            except Exception as e:
+                print(f"Ошибка при вычислении пакета из {len(texts)} текстов: {e}")
+                scores, error = None, str(e)
+
+            start = 0
+            for connection, send_lock, request_id, request_texts, _ in requests:
+                end = start + len(request_texts)
+                result = None if scores is None else scores[start:end]
+                self.reply(connection, send_lock, request_id, result, error)
+                start = end
+            with self.lock:
+                self.pending -= len(texts)
+
+    def predict(self, texts, max_length):
+        """
+        Вычисляет вероятности текстов пакетами по max_batch в порядке длины.
+
+        Parameters
+        ----------
+        texts : list of str
+            Тексты.
+        max_length : int or None
+            Максимальная длина текста в токенах.
+
+        Returns
+        -------
+        numpy.ndarray
+            Вероятности классов в исходном порядке текстов.
+        """
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        scores = None
+        for start in range(0, len(order), self.max_batch):
+            chunk = order[start : start + self.max_batch]
+            proba = self.handle.predict([texts[i] for i in chunk], max_length)
+            if scores is None:
+                scores = np.zeros((len(texts), proba.shape[1]), dtype=np.float32)
+            scores[chunk] = proba
+        return scores
+
+    @staticmethod
+    def reply(connection, send_lock, request_id, scores, error):
+        """
+        Отправляет ответ клиенту; ошибки отключившихся клиентов игнорируются.
+
+        Parameters
+        ----------
+        connection : multiprocessing.connection.Connection
+            Подключение клиента.
+        send_lock : threading.Lock
+            Блокировка отправки в это подключение.
+        request_id : int
+            Идентификатор запроса.
+        scores : numpy.ndarray or None
+            Вероятности классов.
+        error : str or None
+            Ошибка или OVERLOADED.
+        """
+        try:
+            with send_lock:
+                connection.send((request_id, scores, error))
+        except (OSError, ValueError):
+            pass
+
+
+class InferenceClient:
+    """
+    Клиент сервиса инференса с тем же методом predict, что и у моделей реестра.
+
+    Одно подключение используется всеми потоками процесса: запросы отправляются
+    под блокировкой, а ответы разбирает отдельный поток и передает их в Future запросов.
+    Тексты отправляются частями по max_batch сервиса, и одновременно ожидается не больше
+    window частей, поэтому большой запрос не переполняет очередь сервиса; отклоненные
+    из-за перегрузки части отправляются повторно с растущей задержкой.
+
+    Attributes
+    ----------
+    address : str
+        Путь к Unix-сокету сервиса.
+    name : str
+        Название модели сервиса.
+    backend : str
+        Реализация модели сервиса.
+    remote : bool
+        Всегда True: тексты делит на пакеты сервис.
+    timeout : float
+        Максимальное время ожидания ответа в секундах.
+    max_batch : int
+        Количество текстов в одной части запроса.
+    window : int
+        Количество частей, ожидающих ответа одновременно.
+
+    Methods
+    -------
+    submit(texts, max_length=None)
+        Отправляет тексты сервису.
+    wait(future)
+        Ожидает ответ сервиса.
+    predict(texts, max_length=None)
+        Вычисляет вероятности классов для текстов в сервисе.
+    close()
+        Закрывает подключение.
+    """
+
+    remote = True
+    tokenizer = None
+
+    def __init__(self, address=None, timeout=60):
+        """
+        Подключается к сервису.
+
+        Parameters
+        ----------
+        address : str, optional
+            Путь к Unix-сокету, по умолчанию значение переменной окружения TOXIC_SERVICE
+            или data_base/inference.sock.
+        timeout : float, optional
+            Максимальное время ожидания ответа в секундах, по умолчанию 60.
+        """
+        self.address = address or os.getenv("TOXIC_SERVICE", DEFAULT_SOCKET_PATH)
+        self.timeout = timeout
+        self.connection = Client(
+            self.address, family="AF_UNIX", authkey=service_authkey()
+        )
+        self.name, self.backend, self.max_batch, max_pending = self.connection.recv()
+        self.window = max(1, max_pending // (2 * self.max_batch))
+        self.futures = {}
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.closed = False
+        threading.Thread(target=self.receive_loop, daemon=True).start()
+
+    def __repr__(self):
+        return f"InferenceClient(address={self.address!r}, name={self.name!r})"
+
+    def receive_loop(self):
+        """
+        Получает ответы сервиса и передает их в Future запросов.
+        """
+        try:
+            while True:
+                request_id, scores, error = self.connection.recv()
+                with self.lock:
+                    future = self.futures.pop(request_id, None)
+                if future is None:
+                    continue
+                if error == OVERLOADED:
+                    future.set_exception(
+                        ServiceOverloaded("сервис инференса перегружен")
+                    )
+                elif error:
+                    future.set_exception(ServiceError(error))
+                else:
+                    future.set_result(scores)
+        except (EOFError, OSError):
+            pass
+        with self.lock:
+            self.closed = True
+            futures, self.futures = self.futures, {}
+        for future in futures.values():
+            future.set_exception(ConnectionError("сервис инференса недоступен"))
+
+    def submit(self, texts, max_length=None):
+        """
+        Отправляет тексты сервису.
+
+        Parameters
+        ----------
+        texts : list of str
+            Тексты.
+        max_length : int, optional
+            Максимальная длина текста в токенах.
+
+        Returns
+        -------
+        Future
+            Future с вероятностями классов.
+
+        Raises
+        ------
+        ConnectionError
+            Возникает, если подключение к сервису потеряно.
+        """
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise ConnectionError("сервис инференса недоступен")
+            request_id = next(self.ids)
+            future.request_id = request_id
+            self.futures[request_id] = future
+            self.connection.send((request_id, list(texts), max_length))
+        return future
+
+    def wait(self, future):
+        """
+        Ожидает ответ сервиса.
+
+        Parameters
+        ----------
+        future : Future
+            Future, возвращенный методом submit.
+
+        Returns
+        -------
+        numpy.ndarray
+            Вероятности классов.
+
+        Raises
+        ------
+        TimeoutError
+            Возникает, если ответа нет дольше timeout; запрос перестает ожидаться.
+        """
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self.lock:
+                self.futures.pop(future.request_id, None)
+            raise TimeoutError(
+                f"сервис инференса не ответил за {self.timeout} с"
+            ) from None
+
+    def predict(self, texts, max_length=None):
+        """
+        Вычисляет вероятности классов для текстов в сервисе.
+
+        Parameters
+        ----------
+        texts : str or list of str
+            Текст или список текстов.
+        max_length : int, optional
+            Максимальная длина текста в токенах.
+
+        Returns
+        -------
+        numpy.ndarray
+            Вероятности классов, по строке на текст.
+
+        Raises
+        ------
+        ServiceOverloaded
+            Возникает, если часть запроса отклонена OVERLOAD_RETRIES раз подряд.
+        ServiceError
+            Возникает, если сервис не смог обработать часть запроса.
+        ConnectionError
+            Возникает, если подключение к сервису потеряно.
+        TimeoutError
+            Возникает, если сервис не ответил за timeout.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        chunks = [
+            texts[start : start + self.max_batch]
+            for start in range(0, len(texts), self.max_batch)
+        ]
+        results = [None] * len(chunks)
+        attempts = [0] * len(chunks)
+        waiting = deque()
+        submitted = 0
+
+        while submitted < len(chunks) or waiting:
+            while submitted < len(chunks) and len(waiting) < self.window:
+                waiting.append((submitted, self.submit(chunks[submitted], max_length)))
+                submitted += 1
+            index, future = waiting.popleft()
+            try:
+                results[index] = self.wait(future)
+            except ServiceOverloaded:
+                attempts[index] += 1
+                if attempts[index] > OVERLOAD_RETRIES:
+                    raise
+                time.sleep(OVERLOAD_BACKOFF * 2 ** (attempts[index] - 1))
+                waiting.appendleft((index, self.submit(chunks[index], max_length)))
+
+        return np.concatenate(results) if results else np.zeros((0, 0), np.float32)
+
+    def close(self):
+        """
+        Закрывает подключение.
+        """
+        with self.lock:
+            self.closed = True
+        self.connection.close()
+
+
+clients = {}
+clients_lock = threading.Lock()
+
+
+def connect(address):
+    """
+    Возвращает общее для процесса подключение к сервису инференса.
+
+    Parameters
+    ----------
+    address : str
+        Путь к Unix-сокету сервиса.
+
+    Returns
+    -------
+    InferenceClient
+        Подключение; потерянное подключение открывается заново.
+    """
+    with clients_lock:
+        client = clients.get(address)
+        if client is None or client.closed:
+            client = clients[address] = InferenceClient(address)
+        return client
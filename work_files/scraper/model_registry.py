@@ -0,0 +1,297 @@
+import os
+import threading
+from concurrent.futures import Future
+
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+TOXIC_MODEL = "cointegrated/rubert-tiny-toxicity"
+BACKENDS = ("torch", "onnx")
+
+
+class ModelHandle:
+    """
+    Общий потокобезопасный доступ к загруженной модели классификации текстов.
+
+    Быстрые токенизаторы нельзя вызывать из нескольких потоков одновременно, поэтому вызовы
+    predict выполняются под блокировкой.
+
+    Attributes
+    ----------
+    name : str
+        Название модели.
+    backend : str
+        Всегда 'torch'.
+    remote : bool
+        Всегда False: модель выполняется в этом процессе.
+    tokenizer : transformers.AutoTokenizer
+        Токенизатор модели.
+    model : transformers.AutoModelForSequenceClassification
+        Модель в режиме eval.
+    lock : threading.Lock
+        Блокировка вызовов модели.
+
+    Methods
+    -------
+    predict(texts, max_length=None)
+        Вычисляет вероятности классов для текстов.
+    """
+
+    backend = "torch"
+    remote = False
+
+    def __init__(self, name, tokenizer, model):
+        self.name = name
+        self.tokenizer = tokenizer
+        self.model = model
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"ModelHandle(name={self.name!r})"
+
+    def predict(self, texts, max_length=None):
+        """
+        Вычисляет вероятности классов для текстов.
+
+        Тексты дополняются до самого длинного текста в вызове, а не до max_length.
+
+        Parameters
+        ----------
+        texts : str or list of str
+            Текст или список текстов.
+        max_length : int, optional
+            Максимальная длина текста в токенах, по умолчанию ограничение токенизатора.
+
+        Returns
+        -------
+        numpy.ndarray
+            Вероятности классов (сигмоида логитов), по строке на текст.
+        """
+        with self.lock, torch.no_grad():
+            inputs = self.tokenizer(
+                texts,
+                return_tensors="pt",
+                truncation=True,
+                padding=True,
+                max_length=max_length,
+            ).to(self.model.device)
+            return torch.sigmoid(self.model(**inputs).logits).cpu().numpy()
+
+
+class ModelRegistry:
+    """
+    Реестр моделей, загружающий каждую модель один раз на процесс.
+
+    Первый запрос модели загружает ее, а одновременные запросы той же модели ждут окончания
+    этой загрузки, а не загружают ее повторно. Модель можно загрузить заранее в фоновом
+    потоке, чтобы первый пользователь не ждал чтения модели с диска. Если загрузка
+    завершилась ошибкой, следующий запрос пробует загрузить модель снова.
+
+    Модель выполняется в PyTorch ('torch') или квантованной до int8 в ONNX Runtime ('onnx');
+    по умолчанию реализация выбирается переменной окружения TOXIC_BACKEND. Если квантованную
+    модель не удалось получить или ее вероятности слишком расходятся с PyTorch, вместо нее
+    выдается модель PyTorch.
+
+    Attributes
+    ----------
+    models : dict
+        Future с ModelHandle или OnnxModelHandle по названию модели и реализации.
+    lock : threading.Lock
+        Блокировка словаря models.
+
+    Methods
+    -------
+    get(name=TOXIC_MODEL, backend=None)
+        Возвращает общую модель, загружая ее при первом запросе.
+    warm_up(name=TOXIC_MODEL, backend=None)
+        Загружает модель в фоновом потоке.
+    load(name, backend)
+        Загружает модель в выбранной реализации.
+    load_torch(name)
+        Загружает токенизатор и модель PyTorch.
+
+    Examples
+    --------
+    >>> registry.warm_up()
+    >>> registry.get().predict(['привет'])
+    """
+
+    def __init__(self):
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def reserve(self, key):
+        """
+        Возвращает Future модели и признак того, что загружать ее должен вызывающий.
+
+        Parameters
+        ----------
+        key : tuple of (str, str)
+            Название модели и реализация.
+
+        Returns
+        -------
+        tuple of (Future, bool)
+            Future с ModelHandle и True, если загрузка модели еще не начата.
+        """
+        with self.lock:
+            future = self.models.get(key)
+            if future is not None:
+                return future, False
+            future = self.models[key] = Future()
+            return future, True
+
+    def resolve(self, key, future):
+        """
+        Загружает модель и передает результат или ошибку в Future.
+
+        Parameters
+        ----------
+        key : tuple of (str, str)
+            Название модели и реализация.
+        future : Future
+            Future, зарезервированный методом reserve.
+        """
+        try:
+            future.set_result(self.load(*key))
+        except Exception as e:
+            print(f"Ошибка при загрузке модели {key[0]}: {e}")
+            with self.lock:
+                self.models.pop(key, None)
+            future.set_exception(e)
+
+    @staticmethod
+    def key(name, backend):
+        """
+        Возвращает ключ модели в словаре models.
+
+        Parameters
+        ----------
+        name : str
+            Название модели.
+        backend : str or None
+            Реализация; None — значение переменной окружения TOXIC_BACKEND или 'torch'.
+
+        Returns
+        -------
+        tuple of (str, str)
+            Название модели и реализация.
+
+        Raises
+        ------
+        ValueError
+            Возникает для неизвестной реализации.
+        """
+        backend = backend or os.getenv("TOXIC_BACKEND", "torch")
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестная реализация модели: {backend}")
+        return name, backend
+
+    def get(self, name=TOXIC_MODEL, backend=None):
+        """
+        Возвращает общую модель, загружая ее при первом запросе.
+
+        Parameters
+        ----------
+        name : str, optional
+            Название модели, по умолчанию TOXIC_MODEL.
+        backend : str, optional
+            Реализация: 'torch' или 'onnx', по умолчанию значение переменной окружения
+            TOXIC_BACKEND или 'torch'.
+
+        Returns
+        -------
+        ModelHandle or OnnxModelHandle
+            Общая для всего процесса модель.
+
+        Raises
+        ------
+        Exception
+            Возникает, если модель не удалось загрузить.
+        """
+        key = self.key(name, backend)
+        future, owner = self.reserve(key)
+        if owner:
+            self.resolve(key, future)
+        return future.result()
+
+    def warm_up(self, name=TOXIC_MODEL, backend=None):
+        """
+        Загружает модель в фоновом потоке.
+
+        Parameters
+        ----------
+        name : str, optional
+            Название модели, по умолчанию TOXIC_MODEL.
+        backend : str, optional
+            Реализация: 'torch' или 'onnx', по умолчанию значение переменной окружения
+            TOXIC_BACKEND или 'torch'.
+
+        Returns
+        -------
+        Future
+            Future с моделью; если модель уже загружена или загружается, возвращается
+            тот же Future.
+        """
+        key = self.key(name, backend)
+        future, owner = self.reserve(key)
+        if owner:
+            threading.Thread(
+                target=self.resolve,
+                args=(key, future),
+                name=f"warm-up-{name}-{key[1]}",
+                daemon=True,
+            ).start()
+        return future
+
+    def load(self, name, backend):
+        """
+        Загружает модель в выбранной реализации.
+
+        Квантованная модель экспортируется из общей модели PyTorch только при первом запуске;
+        если получить ее не удалось, возвращается общая модель PyTorch.
+
+        Parameters
+        ----------
+        name : str
+            Название модели.
+        backend : str
+            Реализация: 'torch' или 'onnx'.
+
+        Returns
+        -------
+        ModelHandle or OnnxModelHandle
+            Загруженная модель.
+        """
+        if backend == "torch":
+            return self.load_torch(name)
+        try:
+            from scraper.onnx_backend import load_onnx
+
+            return load_onnx(name, lambda: self.get(name, "torch"))
+        except Exception as e:
+            print(f"Модель {name} в ONNX Runtime недоступна, используется PyTorch: {e}")
+            return self.get(name, "torch")
+
+    @staticmethod
+    def load_torch(name):
+        """
+        Загружает токенизатор и модель PyTorch.
+
+        Parameters
+        ----------
+        name : str
+            Название модели на Hugging Face Hub или путь к ней.
+
+        Returns
+        -------
+        ModelHandle
+            Загруженная модель в режиме eval.
+        """
+        tokenizer = AutoTokenizer.from_pretrained(name)
+        model = AutoModelForSequenceClassification.from_pretrained(name)
+        model.eval()
+        return ModelHandle(name, tokenizer, model)
+
+
+registry = ModelRegistry()
@@ -0,0 +1,302 @@
+import json
+import os
+import threading
+
+import numpy as np
+import onnxruntime as ort
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from scraper.persistence import write_atomic
+from transformers import AutoTokenizer
+
+DEFAULT_ONNX_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data_base",
+    "onnx",
+)
+MODEL_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+OPSET_VERSION = 14
+PARITY_TOLERANCE = 0.05
+PARITY_TEXTS = [
+    "Спасибо за помощь, всё получилось",
+    "Отличная погода сегодня, идем гулять в парк",
+    "Ты полный идиот и ничего не понимаешь",
+    "Заткнись уже, надоел",
+    "Я тебя найду и тебе не поздоровится",
+    "Как приготовить борщ без свеклы",
+    "Поздравляю с днем рождения, счастья и здоровья",
+    "Этот фильм просто ужасен, зря потратил вечер",
+]
+
+
+class LogitsModule(torch.nn.Module):
+    """
+    Обертка модели классификации, возвращающая только логиты, для экспорта в ONNX.
+
+    Входы передаются по позициям в порядке MODEL_INPUTS, поэтому порядок входов графа
+    не зависит от порядка ключей в ответе токенизатора.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        return self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+        ).logits
+
+
+class OnnxModelHandle:
+    """
+    Общий доступ к квантованной модели классификации текстов в ONNX Runtime.
+
+    Имеет тот же метод predict, что и ModelHandle, поэтому Toxic работает с любым из них.
+    Под блокировкой выполняется только токенизация: сессия ONNX Runtime сама допускает
+    одновременные вызовы.
+
+    Attributes
+    ----------
+    name : str
+        Название модели.
+    backend : str
+        Всегда 'onnx'.
+    remote : bool
+        Всегда False: модель выполняется в этом процессе.
+    tokenizer : transformers.AutoTokenizer
+        Токенизатор модели.
+    session : onnxruntime.InferenceSession
+        Сессия с квантованным графом модели.
+    parity : dict or None
+        Отчет о расхождении вероятностей с PyTorch, полученный при экспорте.
+    lock : threading.Lock
+        Блокировка вызовов токенизатора.
+
+    Methods
+    -------
+    predict(texts, max_length=None)
+        Вычисляет вероятности классов для текстов.
+    """
+
+    backend = "onnx"
+    remote = False
+
+    def __init__(self, name, tokenizer, session, parity=None):
+        self.name = name
+        self.tokenizer = tokenizer
+        self.session = session
+        self.parity = parity
+        self.inputs = [item.name for item in session.get_inputs()]
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"OnnxModelHandle(name={self.name!r})"
+
+    def predict(self, texts, max_length=None):
+        """
+        Вычисляет вероятности классов для текстов.
+
+        Parameters
+        ----------
+        texts : str or list of str
+            Текст или список текстов.
+        max_length : int, optional
+            Максимальная длина текста в токенах, по умолчанию ограничение токенизатора.
+
+        Returns
+        -------
+        numpy.ndarray
+            Вероятности классов (сигмоида логитов), по строке на текст.
+        """
+        with self.lock:
+            encoded = self.tokenizer(
+                texts,
+                return_tensors="np",
+                truncation=True,
+                padding=True,
+                max_length=max_length,
+            )
+        feed = {name: encoded[name].astype(np.int64) for name in self.inputs}
+        logits = self.session.run(None, feed)[0]
+        return (1 / (1 + np.exp(-logits))).astype(np.float32)
+
+
+def model_dir(name, directory=None):
+    """
+    Возвращает директорию экспортированной модели.
+
+    Parameters
+    ----------
+    name : str
+        Название модели.
+    directory : str, optional
+        Корневая директория, по умолчанию значение переменной окружения TOXIC_ONNX_PATH
+        или DEFAULT_ONNX_DIR.
+
+    Returns
+    -------
+    str
+        Путь к директории модели.
+    """
+    directory = directory or os.getenv("TOXIC_ONNX_PATH", DEFAULT_ONNX_DIR)
+    return os.path.join(directory, name.replace("/", "--"))
+
+
+def export_quantized(handle, path):
+    """
+    Экспортирует модель PyTorch в ONNX и квантует веса в int8.
+
+    Parameters
+    ----------
+    handle : ModelHandle
+        Загруженная модель PyTorch.
+    path : str
+        Путь к итоговому файлу квантованной модели.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sample = handle.tokenizer(PARITY_TEXTS[:2], return_tensors="pt", padding=True)
+    names = [name for name in MODEL_INPUTS if name in sample]
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes["logits"] = {0: "batch"}
+    fp32_path = f"{path}.fp32.onnx"
+    tmp_path = f"{path}.tmp.onnx"
+
+    with torch.no_grad():
+        torch.onnx.export(
+            LogitsModule(handle.model).eval(),
+            tuple(sample[name] for name in names),
+            fp32_path,
+            input_names=names,
+            output_names=["logits"],
+            dynamic_axes=axes,
+            opset_version=OPSET_VERSION,
+        )
+    try:
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, path)
+    finally:
+        for file_path in (fp32_path, tmp_path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+
+def create_session(path):
+    """
+    Создает сессию ONNX Runtime для CPU.
+
+    Количество потоков задается переменной окружения TOXIC_ONNX_THREADS, по умолчанию
+    его выбирает ONNX Runtime.
+
+    Parameters
+    ----------
+    path : str
+        Путь к файлу модели.
+
+    Returns
+    -------
+    onnxruntime.InferenceSession
+        Сессия с включенными оптимизациями графа.
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = int(os.getenv("TOXIC_ONNX_THREADS", "0"))
+    return ort.InferenceSession(
+        path, sess_options=options, providers=["CPUExecutionProvider"]
+    )
+
+
+def parity_check(reference, candidate, texts=None):
+    """
+    Сравнивает вероятности двух реализаций модели на одних и тех же текстах.
+
+    Parameters
+    ----------
+    reference : ModelHandle or OnnxModelHandle
+        Эталонная модель, обычно PyTorch.
+    candidate : ModelHandle or OnnxModelHandle
+        Проверяемая модель.
+    texts : list of str, optional
+        Тексты для сравнения, по умолчанию PARITY_TEXTS.
+
+    Returns
+    -------
+    dict
+        Количество текстов ('texts'), наибольшее ('max') и среднее ('mean') абсолютное
+        расхождение вероятностей и наибольшее расхождение по каждому классу ('per_class').
+
+    Examples
+    --------
+    >>> parity_check(registry.get(backend='torch'), registry.get(backend='onnx'))
+    {'texts': 8, 'max': 0.012, 'mean': 0.003, 'per_class': [...]}
+    """
+    texts = texts or PARITY_TEXTS
+    diff = np.abs(reference.predict(texts) - candidate.predict(texts))
+    return {
+        "texts": len(texts),
+        "max": float(diff.max()),
+        "mean": float(diff.mean()),
+        "per_class": diff.max(axis=0).tolist(),
+    }
+
+
+def load_onnx(name, reference=None, directory=None):
+    """
+    Загружает квантованную модель, при необходимости экспортируя ее.
+
+    При первом запуске модель экспортируется из PyTorch, квантуется и сравнивается
+    с исходной на PARITY_TEXTS; отчет сохраняется в parity.json рядом с моделью.
+    При следующих запусках загружаются только токенизатор и квантованный граф, без модели
+    PyTorch.
+
+    Parameters
+    ----------
+    name : str
+        Название модели.
+    reference : callable, optional
+        Функция без аргументов, возвращающая модель PyTorch; нужна только для экспорта.
+    directory : str, optional
+        Корневая директория экспортированных моделей.
+
+    Returns
+    -------
+    OnnxModelHandle
+        Квантованная модель с отчетом о расхождении в атрибуте parity.
+
+    Raises
+    ------
+    ValueError
+        Возникает, если расхождение с PyTorch больше PARITY_TOLERANCE (или значения
+        переменной окружения TOXIC_PARITY_TOLERANCE).
+    """
+    path = os.path.join(model_dir(name, directory), "model.int8.onnx")
+    parity_path = os.path.join(model_dir(name, directory), "parity.json")
+    tolerance = float(os.getenv("TOXIC_PARITY_TOLERANCE", str(PARITY_TOLERANCE)))
+
+    if not os.path.exists(path) or not os.path.exists(parity_path):
+        if reference is None:
+            raise ValueError(f"модель {name} еще не экспортирована в ONNX")
+        torch_handle = reference()
+        export_quantized(torch_handle, path)
+        handle = OnnxModelHandle(
+            name, AutoTokenizer.from_pretrained(name), create_session(path)
+        )
+        handle.parity = parity_check(torch_handle, handle)
+        write_atomic(parity_path, handle.parity)
+    else:
+        with open(parity_path) as f:
+            parity = json.load(f)
+        handle = OnnxModelHandle(
+            name, AutoTokenizer.from_pretrained(name), create_session(path), parity
+        )
+
+    print(
+        f"Расхождение ONNX int8 и PyTorch для {name}: "
+        f"max {handle.parity['max']:.4f}, mean {handle.parity['mean']:.4f}"
+    )
+    if handle.parity["max"] > tolerance:
+        raise ValueError(
+            f"расхождение {handle.parity['max']:.4f} больше допустимого {tolerance}"
+        )
+    return handle
@@ -0,0 +1,239 @@
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+import zstandard
+
+ZSTD_SUFFIX = ".zst"
+
+
+def dump_json(file, data, compress=False):
+    """
+    Записывает данные в файл JSON в компактном виде.
+
+    Parameters
+    ----------
+    file : file object
+        Файл, открытый для записи в двоичном режиме.
+    data : object
+        Данные, сериализуемые в JSON.
+    compress : bool, optional
+        Если True, данные сжимаются zstd, по умолчанию False.
+    """
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+    if compress:
+        payload = zstandard.ZstdCompressor().compress(payload)
+    file.write(payload)
+
+
+def read_json(file_path):
+    """
+    Загружает данные из файла JSON, в том числе сжатого zstd.
+
+    Parameters
+    ----------
+    file_path : str
+        Путь к файлу; файлы с суффиксом '.zst' распаковываются.
+
+    Returns
+    -------
+    object
+        Загруженные данные.
+    """
+    with open(file_path, "rb") as f:
+        payload = f.read()
+    if file_path.endswith(ZSTD_SUFFIX):
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    return json.loads(payload)
+
+
+def write_atomic(file_path, data, writer=None):
+    """
+    Записывает файл атомарно.
+
+    Данные записываются во временный файл в той же директории, сбрасываются на диск и затем
+    заменяют основной файл, поэтому читатель видит либо старую, либо новую версию целиком.
+
+    Parameters
+    ----------
+    file_path : str
+        Путь к файлу.
+    data : object
+        Данные для записи.
+    writer : callable, optional
+        Функция writer(file, data), записывающая данные в открытый двоичный файл, по умолчанию
+        компактный JSON, сжатый zstd для файлов с суффиксом '.zst'.
+
+    Examples
+    --------
+    >>> write_atomic('data_base/user_data.json', {'id': 1})
+    >>> read_json('data_base/user_data.json')
+    {'id': 1}
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(
+        directory, f".{os.path.basename(file_path)}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with open(tmp_path, "wb") as f:
+            if writer is None:
+                dump_json(f, data, compress=file_path.endswith(ZSTD_SUFFIX))
+            else:
+                writer(f, data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class PersistenceQueue:
+    """
+    Очередь отложенной записи файлов в фоновом потоке.
+
+    Вызывающий код ставит данные в очередь и сразу продолжает работу, а фоновый поток
+    записывает их атомарно (через временный файл и os.replace). Если файл поставлен в очередь
+    несколько раз до того, как был записан, записывается только последняя версия.
+
+    Attributes
+    ----------
+    pending : dict
+        Для каждого файла, ожидающего записи, данные, функция записи и ожидающие Future.
+    errors : list of Exception
+        Ошибки записи, еще не переданные вызывающему коду через flush.
+
+    Methods
+    -------
+    submit(file_path, data, writer=None)
+        Ставит файл в очередь на запись.
+    flush(timeout=None)
+        Ожидает записи всех файлов, поставленных в очередь.
+    close()
+        Записывает оставшиеся файлы и останавливает фоновый поток.
+
+    Examples
+    --------
+    >>> persistence = PersistenceQueue()
+    >>> persistence.submit('data_base/wall_data.json.zst', posts)
+    >>> persistence.flush()
+    """
+
+    def __init__(self):
+        """
+        Инициализирует очередь и запускает фоновый поток записи.
+        """
+        self.pending = {}
+        self.errors = []
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, file_path, data, writer=None):
+        """
+        Ставит файл в очередь на запись.
+
+        Parameters
+        ----------
+        file_path : str
+            Путь к файлу.
+        data : object
+            Данные для записи. После постановки в очередь их нельзя изменять.
+        writer : callable, optional
+            Функция writer(file, data), записывающая данные в открытый двоичный файл,
+            по умолчанию компактный JSON, сжатый zstd для файлов с суффиксом '.zst'.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Завершается, когда файл записан на диск, или содержит ошибку записи.
+        """
+        future = Future()
+        with self.lock:
+            if file_path in self.pending:
+                self.pending[file_path]["data"] = data
+                self.pending[file_path]["writer"] = writer
+                self.pending[file_path]["futures"].append(future)
+                return future
+            self.pending[file_path] = {
+                "data": data,
+                "writer": writer,
+                "futures": [future],
+            }
+        self.queue.put(file_path)
+        return future
+
+    def run(self):
+        """
+        Записывает файлы из очереди; выполняется в фоновом потоке.
+        """
+        while True:
+            file_path = self.queue.get()
+            if file_path is None:
+                self.queue.task_done()
+                return
+
+            with self.lock:
+                task = self.pending.pop(file_path)
+            try:
+                write_atomic(file_path, task["data"], task["writer"])
+            except Exception as e:
+                print(f"Ошибка при сохранении файла {file_path}: {e}")
+                with self.lock:
+                    self.errors.append(e)
+                for future in task["futures"]:
+                    future.set_exception(e)
+            else:
+                for future in task["futures"]:
+                    future.set_result(file_path)
+            finally:
+                self.queue.task_done()
+
+    def flush(self, timeout=None):
+        """
+        Ожидает записи всех файлов, поставленных в очередь.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Максимальное время ожидания в секундах, по умолчанию без ограничения.
+
+        Raises
+        ------
+        TimeoutError
+            Возникает, если файлы не были записаны за отведенное время.
+        Exception
+            Первая ошибка записи, возникшая с момента предыдущего вызова flush.
+        """
+        if timeout is None:
+            self.queue.join()
+        else:
+            done = threading.Event()
+            threading.Thread(
+                target=lambda: (self.queue.join(), done.set()), daemon=True
+            ).start()
+            if not done.wait(timeout):
+                raise TimeoutError("Файлы не были записаны за отведенное время")
+
+        with self.lock:
+            errors, self.errors = self.errors, []
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        """
+        Записывает оставшиеся файлы и останавливает фоновый поток.
+        """
+        self.queue.put(None)
+        self.thread.join()
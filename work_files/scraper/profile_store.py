@@ -0,0 +1,545 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from scraper.records import counter
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data_base",
+    "profiles.db",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrapes (
+    scrape_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    domain TEXT,
+    scraped_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scrapes_user ON scrapes (user_id, scraped_at);
+CREATE INDEX IF NOT EXISTS scrapes_domain ON scrapes (domain);
+
+CREATE TABLE IF NOT EXISTS friends (
+    scrape_id INTEGER NOT NULL REFERENCES scrapes (scrape_id) ON DELETE CASCADE,
+    friend_id INTEGER NOT NULL,
+    sex TEXT,
+    bdate TEXT,
+    city TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scrape_id, friend_id)
+);
+CREATE INDEX IF NOT EXISTS friends_sex ON friends (scrape_id, sex);
+CREATE INDEX IF NOT EXISTS friends_city ON friends (scrape_id, city);
+
+CREATE TABLE IF NOT EXISTS groups (
+    scrape_id INTEGER NOT NULL REFERENCES scrapes (scrape_id) ON DELETE CASCADE,
+    group_id INTEGER NOT NULL,
+    activity TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scrape_id, group_id)
+);
+CREATE INDEX IF NOT EXISTS groups_activity ON groups (scrape_id, activity);
+
+CREATE TABLE IF NOT EXISTS posts (
+    user_id INTEGER NOT NULL,
+    post_id INTEGER NOT NULL,
+    date TEXT,
+    likes INTEGER,
+    comments INTEGER,
+    views INTEGER,
+    reposts INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_id, post_id)
+);
+CREATE INDEX IF NOT EXISTS posts_date ON posts (user_id, date);
+
+CREATE TABLE IF NOT EXISTS staged_posts (
+    user_id INTEGER NOT NULL,
+    post_id INTEGER NOT NULL,
+    date TEXT,
+    likes INTEGER,
+    comments INTEGER,
+    views INTEGER,
+    reposts INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_id, post_id)
+);
+
+CREATE TABLE IF NOT EXISTS gigachat_responses (
+    user_id INTEGER,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS gigachat_user ON gigachat_responses (user_id, created_at);
+"""
+
+UPSERT_POST = """
+INSERT INTO {table} (user_id, post_id, date, likes, comments, views, reposts, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, post_id) DO UPDATE SET
+    date = excluded.date,
+    likes = excluded.likes,
+    comments = excluded.comments,
+    views = excluded.views,
+    reposts = excluded.reposts,
+    data = excluded.data
+"""
+
+
+class ProfileStore:
+    """
+    Хранилище собранных профилей ВКонтакте в базе SQLite.
+
+    Для каждого пользователя хранится последний сбор профиля с временем сбора, поэтому в базе
+    одновременно хранятся данные многих пользователей. Повторный сбор заменяет предыдущий;
+    история изменений хранится отдельно в SnapshotStore. Друзья и группы привязаны к записи
+    сбора, а посты хранятся по пользователю и обновляются при повторном сборе. Поля,
+    которые используются в аналитике (пол, дата рождения и город друзей, тематика групп,
+    дата и счетчики постов), вынесены в отдельные проиндексированные столбцы; полные
+    объекты хранятся в формате JSON.
+
+    Attributes
+    ----------
+    path : str
+        Путь к файлу базы данных.
+    connection : sqlite3.Connection
+        Соединение с базой данных, общее для всех потоков.
+
+    Methods
+    -------
+    save_profile(user, friends, groups, scraped_at=None)
+        Сохраняет профиль, друзей и группы пользователя.
+    add_posts(user_id, posts)
+        Добавляет новые посты и обновляет сохраненные.
+    stage_posts(user_id, posts)
+        Добавляет посты в новую версию стены, не меняя сохраненную.
+    replace_wall(user_id)
+        Заменяет сохраненную стену новой версией.
+    merge_staged(user_id)
+        Добавляет посты новой версии стены к сохраненным.
+    discard_staged(user_id)
+        Удаляет новую версию стены.
+    clear_wall(user_id)
+        Удаляет сохраненные посты пользователя.
+    max_post_id(user_id)
+        Возвращает наибольший id сохраненного поста пользователя.
+    find_user_id(user_name)
+        Возвращает идентификатор пользователя по короткому имени или id.
+    latest_user_id()
+        Возвращает идентификатор последнего собранного пользователя.
+    list_users()
+        Возвращает всех сохраненных пользователей и время последнего сбора.
+    load_profile(user_id)
+        Загружает последний сбор профиля вместе со стеной.
+    get_wall(user_id)
+        Возвращает сохраненные посты пользователя.
+    save_gigachat_response(user_id, responses)
+        Сохраняет ответы GigaChat для пользователя.
+    query_value(sql, params=())
+        Выполняет запрос и возвращает первое значение первой строки.
+    close()
+        Закрывает соединение с базой данных.
+
+    Examples
+    --------
+    >>> store = ProfileStore('profiles.db')
+    >>> store.save_profile({'id': 1, 'domain': 'durov'}, [], [])
+    1
+    >>> store.add_posts(1, [{'id': 10, 'date': '2024-01-01 12:00:00', 'text': ''}])
+    >>> store.load_profile(1)['wall'][0]['id']
+    10
+    """
+
+    def __init__(self, path=None):
+        """
+        Открывает базу данных и создает таблицы, если их еще нет.
+
+        Parameters
+        ----------
+        path : str, optional
+            Путь к файлу базы данных, по умолчанию значение переменной окружения
+            PROFILE_DB_PATH или data_base/profiles.db.
+        """
+        self.path = path or os.getenv("PROFILE_DB_PATH", DEFAULT_DB_PATH)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA foreign_keys=ON")
+            self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """
+        Закрывает соединение с базой данных.
+        """
+        with self.lock:
+            self.connection.close()
+
+    def save_profile(self, user, friends, groups, scraped_at=None):
+        """
+        Сохраняет профиль, друзей и группы пользователя, заменяя предыдущий сбор.
+
+        Parameters
+        ----------
+        user : dict
+            Информация о пользователе.
+        friends : list of dict
+            Друзья пользователя.
+        groups : list of dict
+            Группы пользователя.
+        scraped_at : float, optional
+            Время сбора в секундах Unix, по умолчанию текущее время.
+
+        Returns
+        -------
+        int
+            Идентификатор записи сбора.
+        """
+        scraped_at = scraped_at or time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM scrapes WHERE user_id = ?", (user["id"],)
+            )
+            cursor = self.connection.execute(
+                "INSERT INTO scrapes (user_id, domain, scraped_at, data) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    user["id"],
+                    user.get("domain"),
+                    scraped_at,
+                    json.dumps(user, ensure_ascii=False),
+                ),
+            )
+            scrape_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO friends "
+                "(scrape_id, friend_id, sex, bdate, city, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        scrape_id,
+                        friend["id"],
+                        friend.get("sex"),
+                        friend.get("bdate"),
+                        (friend.get("city") or {}).get("title"),
+                        json.dumps(friend, ensure_ascii=False),
+                    )
+                    for friend in friends or []
+                ),
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO groups (scrape_id, group_id, activity, data) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        scrape_id,
+                        group["id"],
+                        group.get("activity"),
+                        json.dumps(group, ensure_ascii=False),
+                    )
+                    for group in groups or []
+                ),
+            )
+        return scrape_id
+
+    def add_posts(self, user_id, posts, table="posts"):
+        """
+        Добавляет новые посты и обновляет сохраненные.
+
+        Метод подходит для использования в качестве приемника страниц WallCrawler.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        posts : list of dict
+            Посты со стены.
+        table : str, optional
+            Таблица постов: 'posts' или 'staged_posts', по умолчанию 'posts'.
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                UPSERT_POST.format(table=table),
+                (
+                    (
+                        user_id,
+                        post["id"],
+                        post.get("date"),
+                        counter(post, "likes", None),
+                        counter(post, "comments", None),
+                        counter(post, "views", None),
+                        counter(post, "reposts", None),
+                        json.dumps(post, ensure_ascii=False),
+                    )
+                    for post in posts
+                ),
+            )
+
+    def stage_posts(self, user_id, posts):
+        """
+        Добавляет посты в новую версию стены, не меняя сохраненную.
+
+        Пока стена обходится заново, читатели видят прежние посты; новая версия заменяет
+        их методом replace_wall только после успешного обхода.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        posts : list of dict
+            Посты со стены.
+        """
+        self.add_posts(user_id, posts, table="staged_posts")
+
+    def replace_wall(self, user_id):
+        """
+        Заменяет сохраненную стену новой версией в одной транзакции.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        """
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM posts WHERE user_id = ?", (user_id,))
+            self.connection.execute(
+                "INSERT INTO posts SELECT * FROM staged_posts WHERE user_id = ?",
+                (user_id,),
+            )
+            self.connection.execute(
+                "DELETE FROM staged_posts WHERE user_id = ?", (user_id,)
+            )
+
+    def merge_staged(self, user_id):
+        """
+        Добавляет посты новой версии стены к сохраненным в одной транзакции.
+
+        Сохраненные посты с теми же id заменяются, остальные остаются без изменений.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO posts SELECT * FROM staged_posts WHERE user_id = ?",
+                (user_id,),
+            )
+            self.connection.execute(
+                "DELETE FROM staged_posts WHERE user_id = ?", (user_id,)
+            )
+
+    def discard_staged(self, user_id):
+        """
+        Удаляет новую версию стены, оставляя сохраненную.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM staged_posts WHERE user_id = ?", (user_id,)
+            )
+
+    def clear_wall(self, user_id):
+        """
+        Удаляет сохраненные посты пользователя.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        """
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM posts WHERE user_id = ?", (user_id,))
+
+    def max_post_id(self, user_id):
+        """
+        Возвращает наибольший id сохраненного поста пользователя.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        int or None
+            Наибольший id поста или None, если стена пользователя не сохранялась.
+        """
+        return self.query_value(
+            "SELECT MAX(post_id) FROM posts WHERE user_id = ?", (user_id,)
+        )
+
+    def find_user_id(self, user_name):
+        """
+        Возвращает идентификатор пользователя по короткому имени или id.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Короткое имя, строка вида 'id123' или идентификатор пользователя.
+
+        Returns
+        -------
+        int or None
+            Идентификатор пользователя, если его профиль сохранен, иначе None.
+        """
+        user_name = str(user_name)
+        if user_name.startswith("id") and user_name[2:].isdigit():
+            user_name = user_name[2:]
+        if user_name.isdigit():
+            return self.query_value(
+                "SELECT user_id FROM scrapes WHERE user_id = ? LIMIT 1",
+                (int(user_name),),
+            )
+        return self.query_value(
+            "SELECT user_id FROM scrapes WHERE domain = ? "
+            "ORDER BY scraped_at DESC LIMIT 1",
+            (user_name,),
+        )
+
+    def latest_user_id(self):
+        """
+        Возвращает идентификатор последнего собранного пользователя.
+
+        Returns
+        -------
+        int or None
+            Идентификатор пользователя или None, если база пуста.
+        """
+        return self.query_value(
+            "SELECT user_id FROM scrapes ORDER BY scraped_at DESC LIMIT 1"
+        )
+
+    def list_users(self):
+        """
+        Возвращает всех сохраненных пользователей и время последнего сбора.
+
+        Returns
+        -------
+        list of tuple of (int, float)
+            Идентификатор пользователя и время последнего сбора, от новых к старым.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT user_id, MAX(scraped_at) AS scraped_at FROM scrapes "
+                "GROUP BY user_id ORDER BY scraped_at DESC"
+            ).fetchall()
+        return [(row["user_id"], row["scraped_at"]) for row in rows]
+
+    def load_profile(self, user_id):
+        """
+        Загружает последний сбор профиля вместе со стеной.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        dict or None
+            Словарь с ключами 'user', 'friends', 'groups', 'wall' и 'scraped_at' или None,
+            если профиль не сохранен.
+        """
+        with self.lock:
+            scrape = self.connection.execute(
+                "SELECT scrape_id, scraped_at, data FROM scrapes WHERE user_id = ? "
+                "ORDER BY scraped_at DESC LIMIT 1",
+                (user_id,),
+            ).fetchone()
+            if scrape is None:
+                return None
+            friends = self.connection.execute(
+                "SELECT data FROM friends WHERE scrape_id = ? ORDER BY rowid",
+                (scrape["scrape_id"],),
+            ).fetchall()
+            groups = self.connection.execute(
+                "SELECT data FROM groups WHERE scrape_id = ? ORDER BY rowid",
+                (scrape["scrape_id"],),
+            ).fetchall()
+
+        return {
+            "user": json.loads(scrape["data"]),
+            "friends": [json.loads(row["data"]) for row in friends],
+            "groups": [json.loads(row["data"]) for row in groups],
+            "wall": self.get_wall(user_id),
+            "scraped_at": scrape["scraped_at"],
+        }
+
+    def get_wall(self, user_id):
+        """
+        Возвращает сохраненные посты пользователя.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        list of dict
+            Посты, отсортированные от новых к старым.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT data FROM posts WHERE user_id = ? ORDER BY post_id DESC",
+                (user_id,),
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def save_gigachat_response(self, user_id, responses):
+        """
+        Сохраняет ответы GigaChat для пользователя.
+
+        Parameters
+        ----------
+        user_id : int or None
+            Идентификатор пользователя.
+        responses : dict
+            Ответы GigaChat API.
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO gigachat_responses (user_id, created_at, data) "
+                "VALUES (?, ?, ?)",
+                (user_id, time.time(), json.dumps(responses, ensure_ascii=False)),
+            )
+
+    def query_value(self, sql, params=()):
+        """
+        Выполняет запрос и возвращает первое значение первой строки.
+
+        Parameters
+        ----------
+        sql : str
+            Текст запроса.
+        params : tuple, optional
+            Параметры запроса.
+
+        Returns
+        -------
+        object or None
+            Значение или None, если запрос не вернул строк.
+        """
+        with self.lock:
+            row = self.connection.execute(sql, params).fetchone()
+        return row[0] if row else None
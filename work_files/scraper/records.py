@@ -0,0 +1,388 @@
+from datetime import datetime
+
+SEX_LABELS = {1: "Женский", 2: "Мужской"}
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def sex_label(value):
+    """
+    Возвращает строковое представление пола.
+
+    Parameters
+    ----------
+    value : int or str or None
+        Пол в формате VK API (1 — женский, 2 — мужской) или уже конвертированное значение.
+
+    Returns
+    -------
+    str or None
+        'Мужской', 'Женский' или None, если пол не указан.
+
+    Examples
+    --------
+    >>> sex_label(2)
+    'Мужской'
+    >>> sex_label('Женский')
+    'Женский'
+    """
+    if isinstance(value, str):
+        return value or None
+    return SEX_LABELS.get(value)
+
+
+def format_date(value):
+    """
+    Возвращает дату в формате '%Y-%m-%d %H:%M:%S'.
+
+    Parameters
+    ----------
+    value : int or str or None
+        Временная метка Unix или уже конвертированная дата.
+
+    Returns
+    -------
+    str or None
+        Дата в читаемом формате.
+
+    Examples
+    --------
+    >>> format_date('2021-03-31 12:00:00')
+    '2021-03-31 12:00:00'
+    """
+    if isinstance(value, int):
+        return datetime.utcfromtimestamp(value).strftime(DATE_FORMAT)
+    return value
+
+
+def birth_year(bdate):
+    """
+    Возвращает год рождения из даты в формате ВКонтакте.
+
+    Parameters
+    ----------
+    bdate : str or None
+        Дата рождения вида 'Д.М.ГГГГ' или 'Д.М'.
+
+    Returns
+    -------
+    int or None
+        Год рождения или None, если он не указан.
+
+    Examples
+    --------
+    >>> birth_year('1.1.1990')
+    1990
+    >>> birth_year('1.1') is None
+    True
+    """
+    parts = (bdate or "").split(".")
+    return int(parts[2]) if len(parts) == 3 and parts[2].isdigit() else None
+
+
+def counter(item, key, default=0):
+    """
+    Возвращает значение счетчика поста.
+
+    Parameters
+    ----------
+    item : dict
+        Пост со стены.
+    key : str
+        Название счетчика: 'likes', 'comments', 'views' или 'reposts'.
+    default : int or None, optional
+        Значение, если счетчика нет, по умолчанию 0; хранилища передают None, чтобы
+        отличать отсутствующий счетчик от нулевого.
+
+    Returns
+    -------
+    int or None
+        Значение счетчика или default, если счетчика нет.
+    """
+    value = item.get(key)
+    return value.get("count", default) if isinstance(value, dict) else default
+
+
+class Friend:
+    """
+    Компактная запись о друге пользователя.
+
+    Attributes
+    ----------
+    id : int
+        Идентификатор пользователя.
+    first_name : str or None
+        Имя.
+    last_name : str or None
+        Фамилия.
+    sex : int or str or None
+        Пол в формате VK API или 'Мужской'/'Женский' после DataProcessor.convert_friends_data.
+    bdate : str or None
+        Дата рождения в формате ВКонтакте.
+    birth_year : int or None
+        Год рождения, если он указан.
+    city : str or None
+        Название города.
+    """
+
+    __slots__ = ("bdate", "birth_year", "city", "first_name", "id", "last_name", "sex")
+
+    def __init__(
+        self,
+        id,
+        first_name=None,
+        last_name=None,
+        sex=None,
+        bdate=None,
+        birth_year=None,
+        city=None,
+    ):
+        self.id = id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.sex = sex
+        self.bdate = bdate
+        self.birth_year = birth_year
+        self.city = city
+
+    def __repr__(self):
+        return f"Friend(id={self.id}, sex={self.sex!r}, city={self.city!r})"
+
+    @classmethod
+    def from_dict(cls, item):
+        """
+        Создает запись из объекта ответа friends.get.
+
+        Parameters
+        ----------
+        item : dict
+            Объект пользователя.
+
+        Returns
+        -------
+        Friend
+            Запись о друге.
+        """
+        bdate = item.get("bdate")
+        return cls(
+            item.get("id"),
+            item.get("first_name"),
+            item.get("last_name"),
+            item.get("sex"),
+            bdate,
+            birth_year(bdate),
+            (item.get("city") or {}).get("title"),
+        )
+
+
+class Group:
+    """
+    Компактная запись о группе пользователя.
+
+    Attributes
+    ----------
+    id : int
+        Идентификатор группы.
+    name : str or None
+        Название группы.
+    activity : str or None
+        Тематика группы.
+    """
+
+    __slots__ = ("activity", "id", "name")
+
+    def __init__(self, id, name=None, activity=None):
+        self.id = id
+        self.name = name
+        self.activity = activity
+
+    def __repr__(self):
+        return f"Group(id={self.id}, activity={self.activity!r})"
+
+    @classmethod
+    def from_dict(cls, item):
+        """
+        Создает запись из объекта ответа groups.get.
+
+        Parameters
+        ----------
+        item : dict
+            Объект группы.
+
+        Returns
+        -------
+        Group
+            Запись о группе.
+        """
+        return cls(item.get("id"), item.get("name"), item.get("activity"))
+
+
+class Post:
+    """
+    Компактная запись о посте со стены пользователя.
+
+    Attributes
+    ----------
+    id : int
+        Идентификатор поста.
+    date : str or None
+        Дата публикации в формате '%Y-%m-%d %H:%M:%S'.
+    likes : int
+        Количество лайков.
+    comments : int
+        Количество комментариев.
+    views : int
+        Количество просмотров.
+    reposts : int
+        Количество репостов.
+    text : str
+        Текст поста.
+    copy_text : str
+        Текст репостнутой записи, если пост является репостом.
+    """
+
+    __slots__ = (
+        "comments",
+        "copy_text",
+        "date",
+        "id",
+        "likes",
+        "reposts",
+        "text",
+        "views",
+    )
+
+    def __init__(
+        self,
+        id,
+        date=None,
+        likes=0,
+        comments=0,
+        views=0,
+        reposts=0,
+        text="",
+        copy_text="",
+    ):
+        self.id = id
+        self.date = date
+        self.likes = likes
+        self.comments = comments
+        self.views = views
+        self.reposts = reposts
+        self.text = text
+        self.copy_text = copy_text
+
+    def __repr__(self):
+        return f"Post(id={self.id}, date={self.date!r})"
+
+    @classmethod
+    def from_dict(cls, item):
+        """
+        Создает запись из объекта ответа wall.get.
+
+        Parameters
+        ----------
+        item : dict
+            Объект поста.
+
+        Returns
+        -------
+        Post
+            Запись о посте.
+        """
+        copy_history = item.get("copy_history")
+        return cls(
+            item.get("id"),
+            format_date(item.get("date")),
+            counter(item, "likes"),
+            counter(item, "comments"),
+            counter(item, "views"),
+            counter(item, "reposts"),
+            item.get("text") or "",
+            (copy_history[0].get("text") or "") if copy_history else "",
+        )
+
+
+def decode(items, record):
+    """
+    Преобразует объекты ответа API в записи за один проход.
+
+    Повторное преобразование уже готовых записей ничего не делает, поэтому функции из
+    get_methods могут принимать как словари, так и записи.
+
+    Parameters
+    ----------
+    items : list of dict or list of record or dict or None
+        Объекты ответа API, ответ целиком (словарь с ключом 'items') или уже готовые записи.
+    record : type
+        Класс записи: Friend, Group или Post.
+
+    Returns
+    -------
+    list
+        Список записей.
+    """
+    if isinstance(items, dict):
+        items = items.get("items", [])
+    if not items:
+        return []
+    if isinstance(items[0], record):
+        return items
+    return [
+        item if isinstance(item, record) else record.from_dict(item) for item in items
+    ]
+
+
+def decode_friends(items):
+    """
+    Преобразует друзей из ответа friends.get в записи Friend.
+
+    Parameters
+    ----------
+    items : list of dict or dict
+        Друзья пользователя или ответ friends.get целиком.
+
+    Returns
+    -------
+    list of Friend
+        Записи о друзьях.
+
+    Examples
+    --------
+    >>> decode_friends([{'id': 1, 'sex': 2, 'city': {'title': 'Москва'}}])
+    [Friend(id=1, sex=2, city='Москва')]
+    """
+    return decode(items, Friend)
+
+
+def decode_groups(items):
+    """
+    Преобразует группы из ответа groups.get в записи Group.
+
+    Parameters
+    ----------
+    items : list of dict or dict
+        Группы пользователя или ответ groups.get целиком.
+
+    Returns
+    -------
+    list of Group
+        Записи о группах.
+    """
+    return decode(items, Group)
+
+
+def decode_wall(items):
+    """
+    Преобразует посты из ответа wall.get в записи Post.
+
+    Parameters
+    ----------
+    items : list of dict or dict
+        Посты пользователя или ответ wall.get целиком.
+
+    Returns
+    -------
+    list of Post
+        Записи о постах.
+    """
+    return decode(items, Post)
@@ -0,0 +1,269 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from scraper.friends_frame import FriendsFrame
+from scraper.records import decode_groups, decode_wall
+
+SOURCES = ("user", "friends", "groups", "wall")
+
+NODES = {
+    "friends_frame": (
+        ("friends",),
+        lambda parser, user_id, friends: FriendsFrame.from_friends(friends),
+    ),
+    "group_records": (
+        ("groups",),
+        lambda parser, user_id, groups: decode_groups(groups),
+    ),
+    "post_records": (
+        ("wall",),
+        lambda parser, user_id, wall: decode_wall(wall),
+    ),
+    "user_info": (
+        ("user",),
+        lambda parser, user_id, user: parser.get_user_info(user, user_id),
+    ),
+    "ages": (
+        ("friends_frame",),
+        lambda parser, user_id, frame: parser.get_ages_friends(frame, user_id),
+    ),
+    "genders": (
+        ("friends_frame",),
+        lambda parser, user_id, frame: parser.get_genders_friends(frame, user_id),
+    ),
+    "cities": (
+        ("friends_frame",),
+        lambda parser, user_id, frame: parser.get_cities_friends(frame, user_id),
+    ),
+    "stat": (
+        ("post_records",),
+        lambda parser, user_id, posts: parser.get_stat(posts, user_id),
+    ),
+    "marks": (
+        ("post_records",),
+        lambda parser, user_id, posts: parser.get_marks(posts, user_id),
+    ),
+    "interests": (
+        ("group_records",),
+        lambda parser, user_id, groups: parser.get_interests(groups, user_id),
+    ),
+    "toxic": (
+        ("post_records",),
+        lambda parser, user_id, posts: parser.get_toxic(posts, user_id),
+    ),
+}
+ANALYTICS = (
+    "user_info",
+    "ages",
+    "genders",
+    "cities",
+    "stat",
+    "marks",
+    "interests",
+    "toxic",
+)
+
+
+class ProfileReport:
+    """
+    Результаты всех аналитик одного сбора профиля.
+
+    Отчет строится один раз после сбора, а затем из него читают и вкладки дэшборда,
+    и GigaChat.
+
+    Attributes
+    ----------
+    user_id : int or None
+        Идентификатор пользователя.
+    results : dict
+        Результаты аналитик по названиям из ANALYTICS.
+    errors : dict
+        Ошибки аналитик, которые не удалось вычислить, по названиям узлов.
+    timings : dict
+        Время вычисления каждого узла в секундах.
+    elapsed : float
+        Общее время построения отчета в секундах.
+
+    Methods
+    -------
+    get(name, default=None)
+        Возвращает результат аналитики.
+    """
+
+    def __init__(self, user_id, results, errors=None, timings=None, elapsed=0.0):
+        self.user_id = user_id
+        self.results = results
+        self.errors = errors or {}
+        self.timings = timings or {}
+        self.elapsed = elapsed
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    def __repr__(self):
+        return (
+            f"ProfileReport(user_id={self.user_id}, ready={len(self.results)}, "
+            f"errors={len(self.errors)}, elapsed={self.elapsed:.2f})"
+        )
+
+    def get(self, name, default=None):
+        """
+        Возвращает результат аналитики.
+
+        Parameters
+        ----------
+        name : str
+            Название аналитики из ANALYTICS.
+        default : object, optional
+            Значение, если аналитику не удалось вычислить, по умолчанию None.
+
+        Returns
+        -------
+        object
+            Результат аналитики.
+        """
+        return self.results.get(name, default)
+
+
+class ReportBuilder:
+    """
+    Построитель отчета по профилю, выполняющий аналитики как граф зависимостей.
+
+    Каждый узел графа NODES объявляет свои входы: исходные данные профиля ('user', 'friends',
+    'groups', 'wall') или результаты других узлов (колоночное представление друзей, записи
+    групп и постов). Узел запускается в пуле потоков, как только готовы все его входы,
+    поэтому независимые аналитики выполняются одновременно, и отчет готов за время самой
+    долгой цепочки, а не за сумму времени всех аналитик. Если узел завершился ошибкой,
+    зависящие от него узлы не выполняются, а ошибки сохраняются в отчете.
+
+    Attributes
+    ----------
+    parser : UserProfileParser
+        Парсер профилей, методы которого вычисляют аналитики.
+    executor : ThreadPoolExecutor
+        Пул потоков для выполнения узлов.
+
+    Methods
+    -------
+    build(data, user_id=None)
+        Строит отчет по данным профиля.
+    close()
+        Останавливает пул потоков.
+
+    Examples
+    --------
+    >>> builder = ReportBuilder(UserProfileParser())
+    >>> report = builder.build(store.load_profile(1))
+    >>> report['ages']
+    """
+
+    def __init__(self, parser, max_workers=None):
+        """
+        Инициализирует построитель и пул потоков.
+
+        Parameters
+        ----------
+        parser : UserProfileParser
+            Парсер профилей.
+        max_workers : int, optional
+            Количество потоков, по умолчанию значение переменной окружения
+            REPORT_WORKERS или количество узлов графа.
+        """
+        self.parser = parser
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers
+            or int(os.getenv("REPORT_WORKERS", str(len(NODES)))),
+            thread_name_prefix="report",
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """
+        Останавливает пул потоков.
+        """
+        self.executor.shutdown(wait=True)
+
+    def run_node(self, name, function, user_id, args):
+        """
+        Выполняет узел графа и замеряет время его выполнения.
+
+        Parameters
+        ----------
+        name : str
+            Название узла.
+        function : callable
+            Функция узла.
+        user_id : int or None
+            Идентификатор пользователя.
+        args : list
+            Значения входов узла.
+
+        Returns
+        -------
+        tuple of (object, float)
+            Результат узла и время выполнения в секундах.
+        """
+        start = time.perf_counter()
+        result = function(self.parser, user_id, *args)
+        return result, time.perf_counter() - start
+
+    def build(self, data, user_id=None):
+        """
+        Строит отчет по данным профиля.
+
+        Parameters
+        ----------
+        data : dict
+            Данные профиля с ключами 'user', 'friends', 'groups' и 'wall'.
+        user_id : int, optional
+            Идентификатор пользователя, по умолчанию берется из data['user'].
+
+        Returns
+        -------
+        ProfileReport
+            Отчет со всеми аналитиками, которые удалось вычислить.
+        """
+        start = time.perf_counter()
+        user_id = user_id or (data.get("user") or {}).get("id")
+        values = {source: data.get(source) for source in SOURCES}
+        errors, timings, running = {}, {}, {}
+        pending = dict(NODES)
+
+        while pending or running:
+            for name, (inputs, function) in list(pending.items()):
+                failed = [item for item in inputs if item in errors]
+                if failed:
+                    errors[name] = errors[failed[0]]
+                    del pending[name]
+                elif all(item in values for item in inputs):
+                    args = [values[item] for item in inputs]
+                    future = self.executor.submit(
+                        self.run_node, name, function, user_id, args
+                    )
+                    running[future] = name
+                    del pending[name]
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    values[name], timings[name] = future.result()
+                except Exception as e:
+                    print(f"Ошибка при вычислении {name}: {e}")
+                    errors[name] = e
+
+        return ProfileReport(
+            user_id,
+            {name: values[name] for name in ANALYTICS if name in values},
+            errors,
+            timings,
+            time.perf_counter() - start,
+        )
@@ -0,0 +1,401 @@
+import asyncio
+import json
+import math
+from statistics import NormalDist
+
+import numpy as np
+import vk_api
+from scraper.take_profile_info import FRIENDS_FIELDS, GROUPS_FIELDS
+
+EXECUTE_LIMIT = 25
+
+SAMPLE_SOURCES = {
+    "followers": ("users.getFollowers", 1000, {"fields": FRIENDS_FIELDS}),
+    "friends": ("friends.get", 5000, {"fields": FRIENDS_FIELDS}),
+    "groups": ("groups.get", 1000, {"extended": 1, "fields": GROUPS_FIELDS}),
+}
+
+SAMPLE_SCRIPT = """
+var calls = [%(calls)s];
+var items = [];
+var total = null;
+var i = 0;
+while (i < calls.length) {
+    var page = API.%(method)s({%(params)s"offset": calls[i], "count": calls[i + 1]});
+    if (page) {
+        total = page.count;
+        items.push(page.items);
+    } else {
+        items.push(null);
+    }
+    i = i + 2;
+}
+return {"count": total, "items": items};
+"""
+
+
+def z_score(confidence):
+    """
+    Возвращает квантиль нормального распределения для двустороннего интервала.
+
+    Parameters
+    ----------
+    confidence : float
+        Уровень доверия, например 0.95.
+
+    Returns
+    -------
+    float
+        Квантиль, например 1.96 для уровня 0.95.
+    """
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def sample_size(target_error, population=None, confidence=0.95):
+    """
+    Вычисляет размер выборки, при котором доля оценивается с заданной ошибкой.
+
+    Берется худший случай доли 0.5, а для известного размера совокупности применяется
+    поправка на конечность совокупности.
+
+    Parameters
+    ----------
+    target_error : float
+        Допустимая абсолютная ошибка доли (половина ширины интервала), например 0.03.
+    population : int, optional
+        Размер совокупности, по умолчанию совокупность считается бесконечной.
+    confidence : float, optional
+        Уровень доверия, по умолчанию 0.95.
+
+    Returns
+    -------
+    int
+        Размер выборки; не больше размера совокупности.
+
+    Examples
+    --------
+    >>> sample_size(0.03)
+    1068
+    >>> sample_size(0.03, population=2000)
+    697
+    >>> sample_size(0.03, population=0)
+    0
+    """
+    if population == 0:
+        return 0
+    n = z_score(confidence) ** 2 * 0.25 / target_error**2
+    if population is not None:
+        n = n / (1 + (n - 1) / population)
+        return min(math.ceil(n), population)
+    return math.ceil(n)
+
+
+def wilson_interval(counts, n, population=None, confidence=0.95):
+    """
+    Вычисляет доверительные интервалы Уилсона для долей.
+
+    Если известен размер совокупности, размер выборки увеличивается на поправку
+    на конечность совокупности, поэтому при выборке всей совокупности интервал сужается
+    до точки.
+
+    Parameters
+    ----------
+    counts : np.ndarray
+        Количество записей с каждым значением в выборке.
+    n : int
+        Количество записей в выборке.
+    population : int, optional
+        Размер совокупности, по умолчанию совокупность считается бесконечной.
+    confidence : float, optional
+        Уровень доверия, по умолчанию 0.95.
+
+    Returns
+    -------
+    tuple of (np.ndarray, np.ndarray, np.ndarray)
+        Доли, нижние и верхние границы интервалов.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    if n <= 0:
+        empty = np.zeros(len(counts))
+        return empty, empty, empty
+    share = counts / n
+    if population is not None and population <= n:
+        return share, share, share
+    if population is not None:
+        n = n * (population - 1) / (population - n)
+    z = z_score(confidence)
+    center = (share + z**2 / (2 * n)) / (1 + z**2 / n)
+    margin = z / (1 + z**2 / n) * np.sqrt(share * (1 - share) / n + z**2 / (4 * n**2))
+    return share, np.clip(center - margin, 0, 1), np.clip(center + margin, 0, 1)
+
+
+def add_intervals(frame, count_column, sampled, population=None, confidence=0.95):
+    """
+    Добавляет к распределению, вычисленному по выборке, доли и доверительные интервалы.
+
+    Доли считаются среди записей, у которых значение указано. Размер совокупности для
+    поправки уменьшается в той же пропорции, что и выборка.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Распределение, например результат cities_info.
+    count_column : str
+        Название столбца с количеством записей.
+    sampled : int
+        Количество записей в выборке, включая записи без значения.
+    population : int, optional
+        Размер совокупности, из которой взята выборка.
+    confidence : float, optional
+        Уровень доверия, по умолчанию 0.95.
+
+    Returns
+    -------
+    pd.DataFrame
+        Копия распределения со столбцами 'Share', 'Low' и 'High'. В атрибуте attrs —
+        размер выборки ('sample'), совокупности ('population'), уровень доверия
+        ('confidence') и наибольшая половина ширины интервала ('margin').
+    """
+    frame = frame.copy()
+    counts = frame[count_column].to_numpy(dtype=np.int64)
+    n = int(counts.sum())
+    known = None
+    if population is not None and sampled:
+        known = max(n, round(population * n / sampled))
+    share, low, high = wilson_interval(counts, n, known, confidence)
+    frame["Share"] = share
+    frame["Low"] = low
+    frame["High"] = high
+    frame.attrs.update(
+        {
+            "sample": sampled,
+            "population": population,
+            "confidence": confidence,
+            "margin": float(np.max(high - low) / 2) if len(frame) else 0.0,
+        }
+    )
+    return frame
+
+
+class ProfileSampler:
+    """
+    Класс для получения равномерной случайной выборки подписчиков, друзей или групп.
+
+    Большие публичные страницы нельзя обойти целиком в пределах лимитов API, поэтому
+    из всех смещений списка выбирается случайное подмножество нужного размера, соседние
+    смещения объединяются в диапазоны, а диапазоны запрашиваются по EXECUTE_LIMIT за один
+    вызов execute. Если размер выборки не меньше размера списка, диапазоны сливаются
+    в обычные страницы и список получается целиком.
+
+    Attributes
+    ----------
+    profile : VkProfile or AsyncVkProfile
+        Клиент VK API: VkProfile для sample или AsyncVkProfile для sample_async.
+    target_error : float
+        Допустимая абсолютная ошибка долей.
+    confidence : float
+        Уровень доверия.
+    rng : np.random.Generator
+        Генератор случайных чисел.
+
+    Methods
+    -------
+    sample(user_id, source='followers')
+        Получает выборку из списка пользователя.
+    sample_async(user_id, source='followers')
+        Асинхронная версия sample для клиента AsyncVkProfile.
+    plan(total, page_size)
+        Выбирает смещения и объединяет их в диапазоны.
+    build_script(user_id, source, ranges)
+        Формирует код VKScript для получения диапазонов.
+
+    Examples
+    --------
+    >>> sampler = ProfileSampler(VkProfile(token), target_error=0.03)
+    >>> followers = sampler.sample(1, 'followers')
+    >>> cities_info(followers, population=followers['count'])
+    """
+
+    def __init__(self, profile, target_error=0.03, confidence=0.95, seed=None):
+        """
+        Инициализирует выборку.
+
+        Parameters
+        ----------
+        profile : VkProfile or AsyncVkProfile
+            Клиент VK API.
+        target_error : float, optional
+            Допустимая абсолютная ошибка долей, по умолчанию 0.03.
+        confidence : float, optional
+            Уровень доверия, по умолчанию 0.95.
+        seed : int, optional
+            Начальное значение генератора случайных чисел для воспроизводимой выборки.
+        """
+        self.profile = profile
+        self.target_error = target_error
+        self.confidence = confidence
+        self.rng = np.random.default_rng(seed)
+
+    def plan(self, total, page_size):
+        """
+        Выбирает смещения и объединяет их в диапазоны.
+
+        Parameters
+        ----------
+        total : int
+            Количество записей в списке.
+        page_size : int
+            Максимальное количество записей в одном запросе.
+
+        Returns
+        -------
+        list of tuple
+            Диапазоны (смещение, количество) в порядке возрастания смещения; пустой список
+            для пустого списка записей.
+        """
+        if not total:
+            return []
+        size = sample_size(self.target_error, total, self.confidence)
+        offsets = np.sort(self.rng.choice(total, size=size, replace=False))
+        ranges = []
+        for offset in offsets.tolist():
+            if (
+                ranges
+                and ranges[-1][0] + ranges[-1][1] == offset
+                and ranges[-1][1] < page_size
+            ):
+                ranges[-1] = (ranges[-1][0], ranges[-1][1] + 1)
+                continue
+            ranges.append((offset, 1))
+        return ranges
+
+    def build_script(self, user_id, source, ranges):
+        """
+        Формирует код VKScript для получения диапазонов.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя или сообщества.
+        source : str
+            Список: 'followers', 'friends' или 'groups'.
+        ranges : list of tuple
+            Диапазоны (смещение, количество), не больше EXECUTE_LIMIT.
+
+        Returns
+        -------
+        str
+            Код VKScript для метода execute.
+        """
+        method, _, params = SAMPLE_SOURCES[source]
+        params = {"user_id": int(user_id), **params}
+        return SAMPLE_SCRIPT % {
+            "calls": ",".join(f"{offset},{count}" for offset, count in ranges),
+            "method": method,
+            "params": "".join(
+                f"{json.dumps(key)}: {json.dumps(value)}, "
+                for key, value in params.items()
+            ),
+        }
+
+    def result(self, total, responses):
+        """
+        Собирает ответы execute в ответ в формате исходного метода.
+
+        Parameters
+        ----------
+        total : int
+            Количество записей в списке.
+        responses : list of dict
+            Ответы execute.
+
+        Returns
+        -------
+        dict
+            Словарь с ключами 'count' (размер списка), 'items' (выборка) и 'sampled'
+            (True, если получена не вся совокупность).
+        """
+        items = [
+            item
+            for response in responses
+            for page in response["items"]
+            if page
+            for item in page
+        ]
+        return {"count": total, "items": items, "sampled": len(items) < total}
+
+    def sample(self, user_id, source="followers"):
+        """
+        Получает выборку из списка пользователя.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        source : str, optional
+            Список: 'followers', 'friends' или 'groups', по умолчанию 'followers'.
+
+        Returns
+        -------
+        dict or None
+            Ответ в формате friends.get с ключами 'count', 'items' и 'sampled', если запрос
+            успешен, иначе None.
+        """
+        method, page_size, params = SAMPLE_SOURCES[source]
+        try:
+            first = self.profile.method(method, user_id=user_id, count=1, **params)
+            ranges = self.plan(first["count"], page_size)
+            responses = [
+                self.profile.method(
+                    "execute",
+                    code=self.build_script(
+                        user_id, source, ranges[i : i + EXECUTE_LIMIT]
+                    ),
+                )
+                for i in range(0, len(ranges), EXECUTE_LIMIT)
+            ]
+            return self.result(first["count"], responses)
+        except vk_api.ApiError as e:
+            print(f"Ошибка API ВКонтакте при получении выборки {source}: {e}")
+        except Exception as e:
+            print(f"Произошла ошибка при получении выборки {source}: {e}")
+
+    async def sample_async(self, user_id, source="followers"):
+        """
+        Асинхронная версия sample для клиента AsyncVkProfile.
+
+        Вызовы execute выполняются одновременно в пределах ограничения частоты клиента.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        source : str, optional
+            Список: 'followers', 'friends' или 'groups', по умолчанию 'followers'.
+
+        Returns
+        -------
+        dict or None
+            Ответ в формате friends.get с ключами 'count', 'items' и 'sampled', если запрос
+            успешен, иначе None.
+        """
+        method, page_size, params = SAMPLE_SOURCES[source]
+        try:
+            first = await self.profile.method(
+                method, user_id=user_id, count=1, **params
+            )
+            ranges = self.plan(first["count"], page_size)
+            responses = await asyncio.gather(
+                *(
+                    self.profile.method(
+                        "execute",
+                        code=self.build_script(
+                            user_id, source, ranges[i : i + EXECUTE_LIMIT]
+                        ),
+                    )
+                    for i in range(0, len(ranges), EXECUTE_LIMIT)
+                )
+            )
+            return self.result(first["count"], responses)
+        except Exception as e:
+            print(f"Произошла ошибка при получении выборки {source}: {e}")
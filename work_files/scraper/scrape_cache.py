@@ -0,0 +1,423 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ProfileUnavailable(Exception):
+    """
+    Ошибка, возникающая, если профиль закрыт, удален или заблокирован.
+
+    Attributes
+    ----------
+    user_id : int or None
+        Идентификатор пользователя.
+    reason : str
+        Причина недоступности: 'closed', 'deleted' или 'banned'.
+    """
+
+    def __init__(self, user_id, reason):
+        self.user_id = user_id
+        self.reason = reason
+        super().__init__(f"Профиль {user_id} недоступен: {reason}")
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одинаковым ключом в один.
+
+    Первый вызов выполняет функцию, а остальные вызовы с тем же ключом, пришедшие до ее
+    завершения, ждут и получают тот же результат или ту же ошибку.
+
+    Methods
+    -------
+    do(key, fn)
+        Выполняет функцию или дожидается уже выполняющегося вызова с тем же ключом.
+    """
+
+    def __init__(self):
+        """
+        Инициализирует пустой набор выполняющихся вызовов.
+        """
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Выполняет функцию или дожидается уже выполняющегося вызова с тем же ключом.
+
+        Parameters
+        ----------
+        key : hashable
+            Ключ вызова.
+        fn : callable
+            Функция без аргументов.
+
+        Returns
+        -------
+        object
+            Результат функции.
+
+        Raises
+        ------
+        Exception
+            Ошибка, возникшая при выполнении функции.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self.calls[key] = call
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call["event"].set()
+
+
+class ScrapeCache:
+    """
+    Кэш собранных данных профилей с ограниченным временем жизни.
+
+    Данные хранятся по идентификатору пользователя, а короткие имена из URL запоминаются как
+    псевдонимы, поэтому повторный запрос того же профиля не требует обращений к API.
+    Одновременные запросы одного профиля выполняют один сбор данных, а закрытые, удаленные
+    и заблокированные профили запоминаются на короткое время как недоступные. Размер кэша
+    ограничен: при добавлении записи устаревшие записи удаляются, а сверх max_entries
+    вытесняются давно не запрашивавшиеся профили.
+
+    Attributes
+    ----------
+    ttl : float
+        Время жизни записи в секундах.
+    negative_ttl : float
+        Время жизни записи о недоступном профиле в секундах.
+    max_entries : int
+        Максимальное количество профилей в entries и в negative.
+    entries : OrderedDict
+        Для каждого идентификатора пользователя кортеж (время сбора, данные) в порядке
+        последнего обращения.
+    negative : OrderedDict
+        Для каждого недоступного профиля кортеж (время сбора, причина).
+    aliases : OrderedDict
+        Идентификатор пользователя для каждого короткого имени.
+    flight : SingleFlight
+        Объединение одновременных сборов одного профиля.
+    resolver : callable or None
+        Функция, возвращающая идентификатор пользователя по короткому имени.
+
+    Methods
+    -------
+    get(user_name)
+        Возвращает данные профиля, если они есть в кэше и не устарели.
+    put(user_name, user_id, data)
+        Сохраняет данные профиля в кэш.
+    get_negative(user_name)
+        Возвращает причину недоступности профиля, если она есть в кэше и не устарела.
+    put_negative(user_name, user_id, reason)
+        Запоминает профиль как недоступный.
+    invalidate(user_name)
+        Удаляет данные профиля из кэша.
+    prune()
+        Удаляет устаревшие записи и вытесняет лишние.
+    flight_key(user_name)
+        Возвращает ключ, под которым объединяются одновременные сборы профиля.
+    get_or_scrape(user_name, scrape, force=False)
+        Возвращает данные из кэша или собирает их заново.
+    """
+
+    def __init__(self, ttl=3600, negative_ttl=300, max_entries=256, resolver=None):
+        """
+        Инициализирует пустой кэш.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            Время жизни записи в секундах, по умолчанию 3600.
+        negative_ttl : float, optional
+            Время жизни записи о недоступном профиле в секундах, по умолчанию 300.
+        max_entries : int, optional
+            Максимальное количество профилей в кэше, по умолчанию 256.
+        resolver : callable, optional
+            Функция resolver(screen_name), возвращающая идентификатор пользователя или None,
+            например, через utils.resolveScreenName; по умолчанию короткие имена, которые
+            еще не собирались, не разрешаются.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.negative = OrderedDict()
+        self.aliases = OrderedDict()
+        self.swept_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.flight = SingleFlight()
+        self.resolver = resolver
+
+    def resolve(self, user_name):
+        """
+        Возвращает идентификатор пользователя по короткому имени или идентификатору.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Короткое имя или идентификатор пользователя.
+
+        Returns
+        -------
+        int or None
+            Идентификатор пользователя, если профиль уже собирался, иначе None.
+        """
+        user_name = str(user_name)
+        if user_name in self.aliases:
+            return self.aliases[user_name]
+        if user_name.startswith("id") and user_name[2:].isdigit():
+            user_name = user_name[2:]
+        if user_name.isdigit():
+            user_id = int(user_name)
+            if user_id in self.entries or user_id in self.negative:
+                return user_id
+        return None
+
+    def get(self, user_name):
+        """
+        Возвращает данные профиля, если они есть в кэше и не устарели.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Короткое имя или идентификатор пользователя.
+
+        Returns
+        -------
+        dict or None
+            Данные профиля или None.
+        """
+        with self.lock:
+            user_id = self.resolve(user_name)
+            if user_id is None or user_id not in self.entries:
+                return None
+            scraped_at, data = self.entries[user_id]
+            if time.monotonic() - scraped_at > self.ttl:
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return data
+
+    def put(self, user_name, user_id, data):
+        """
+        Сохраняет данные профиля в кэш.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Короткое имя пользователя, под которым профиль был запрошен.
+        user_id : int
+            Идентификатор пользователя.
+        data : dict
+            Данные профиля.
+        """
+        with self.lock:
+            self.aliases[str(user_name)] = user_id
+            self.aliases.move_to_end(str(user_name))
+            self.entries[user_id] = (time.monotonic(), data)
+            self.entries.move_to_end(user_id)
+            self.prune()
+
+    def get_negative(self, user_name):
+        """
+        Возвращает причину недоступности профиля, если она есть в кэше и не устарела.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Короткое имя или идентификатор пользователя.
+
+        Returns
+        -------
+        tuple of (int, str) or None
+            Идентификатор пользователя и причина недоступности или None.
+        """
+        with self.lock:
+            user_id = self.resolve(user_name)
+            if user_id is None or user_id not in self.negative:
+                return None
+            checked_at, reason = self.negative[user_id]
+            if time.monotonic() - checked_at > self.negative_ttl:
+                del self.negative[user_id]
+                return None
+            return user_id, reason
+
+    def put_negative(self, user_name, user_id, reason):
+        """
+        Запоминает профиль как недоступный.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Короткое имя пользователя, под которым профиль был запрошен.
+        user_id : int or None
+            Идентификатор пользователя; если неизвестен, запись хранится под коротким именем.
+        reason : str
+            Причина недоступности.
+        """
+        with self.lock:
+            if user_id is None:
+                user_id = str(user_name)
+            self.aliases[str(user_name)] = user_id
+            self.aliases.move_to_end(str(user_name))
+            self.negative[user_id] = (time.monotonic(), reason)
+            self.negative.move_to_end(user_id)
+            self.entries.pop(user_id, None)
+            self.prune()
+
+    def invalidate(self, user_name):
+        """
+        Удаляет данные профиля из кэша.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Короткое имя или идентификатор пользователя.
+        """
+        with self.lock:
+            user_id = self.resolve(user_name)
+            self.entries.pop(user_id, None)
+            self.negative.pop(user_id, None)
+
+    def prune(self):
+        """
+        Удаляет устаревшие записи и вытесняет лишние.
+
+        Устаревшие записи ищутся не чаще одного раза за меньшее из ttl и negative_ttl, а сверх max_entries
+        удаляются профили, к которым дольше всего не обращались. Вызывается под блокировкой.
+        """
+        now = time.monotonic()
+        if now - self.swept_at > min(self.ttl, self.negative_ttl):
+            self.swept_at = now
+            for records, ttl in (
+                (self.entries, self.ttl),
+                (self.negative, self.negative_ttl),
+            ):
+                for user_id in [
+                    user_id
+                    for user_id, (checked_at, _) in records.items()
+                    if now - checked_at > ttl
+                ]:
+                    del records[user_id]
+
+        for records in (self.entries, self.negative):
+            while len(records) > self.max_entries:
+                records.popitem(last=False)
+        while len(self.aliases) > 2 * self.max_entries:
+            self.aliases.popitem(last=False)
+
+    def flight_key(self, user_name):
+        """
+        Возвращает ключ, под которым объединяются одновременные сборы профиля.
+
+        Идентификаторы вида 'id1' и '1' приводятся к числу, а короткие имена разрешаются
+        через уже известные псевдонимы или resolver, поэтому 'durov' и 'id1', запрошенные
+        одновременно впервые, собираются один раз.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Короткое имя или идентификатор пользователя.
+
+        Returns
+        -------
+        int or str
+            Идентификатор пользователя или короткое имя в нижнем регистре, если его
+            не удалось разрешить.
+        """
+        with self.lock:
+            user_id = self.resolve(user_name)
+        if user_id is not None:
+            return user_id
+
+        name = str(user_name).lower()
+        if name.startswith("id") and name[2:].isdigit():
+            return int(name[2:])
+        if name.isdigit():
+            return int(name)
+        if self.resolver is not None:
+            try:
+                user_id = self.resolver(name)
+            except Exception as e:
+                print(f"Ошибка при разрешении короткого имени {name}: {e}")
+            if user_id is not None:
+                with self.lock:
+                    self.aliases[str(user_name)] = user_id
+                return user_id
+        return name
+
+    def get_or_scrape(self, user_name, scrape, force=False):
+        """
+        Возвращает данные из кэша или собирает их заново.
+
+        Одновременные вызовы для одного профиля выполняют scrape один раз и получают
+        одинаковый результат.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Короткое имя или идентификатор пользователя.
+        scrape : callable
+            Функция без аргументов, которая собирает профиль и возвращает кортеж
+            (идентификатор пользователя, данные) или None при ошибке. Для закрытых, удаленных
+            и заблокированных профилей функция вызывает ProfileUnavailable.
+        force : bool, optional
+            Если True, данные собираются заново даже при наличии в кэше, по умолчанию False.
+
+        Returns
+        -------
+        dict or None
+            Данные профиля или None, если собрать их не удалось.
+
+        Raises
+        ------
+        ProfileUnavailable
+            Возникает, если профиль недоступен (в том числе по записи в кэше).
+
+        Examples
+        --------
+        >>> cache = ScrapeCache(ttl=600)
+        >>> data = cache.get_or_scrape("durov", lambda: (1, {"user": {"id": 1}}))
+        >>> cache.get("durov") is data
+        True
+        """
+        if not force:
+            negative = self.get_negative(user_name)
+            if negative is not None:
+                raise ProfileUnavailable(*negative)
+            data = self.get(user_name)
+            if data is not None:
+                return data
+
+        def load():
+            try:
+                result = scrape()
+            except ProfileUnavailable as e:
+                self.put_negative(user_name, e.user_id, e.reason)
+                raise
+            if result is None:
+                return None
+
+            user_id, data = result
+            self.put(user_name, user_id, data)
+            return data
+
+        return self.flight.do(self.flight_key(user_name), load)
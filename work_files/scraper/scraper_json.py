@@ -1,4 +1,8 @@
+import os
+
 from geopy.geocoders import Nominatim
+from scraper.analytics_cache import AnalyticsCache
+from scraper.friends_frame import FriendsFrame
 from scraper.get_methods.get_ages_friends import ages_info
 from scraper.get_methods.get_cities_friends import cities_info
 from scraper.get_methods.get_coordinates import coord_info
@@ -9,6 +13,18 @@ from scraper.get_methods.get_marks import marks_info
 from scraper.get_methods.get_stat import stat_info
 from scraper.get_methods.get_toxic import Toxic
 from scraper.get_methods.get_user_info import user_info
+from scraper.records import decode_groups, decode_wall
+
+ANALYTICS_VERSIONS = {
+    "user_info": 1,
+    "ages": 2,
+    "genders": 2,
+    "cities": 2,
+    "stat": 1,
+    "marks": 1,
+    "interests": 1,
+    "toxic": 1,
+}
 
 
 class UserProfileParser:
@@ -19,39 +35,110 @@ class UserProfileParser:
     ----------
     cache : dict
         Кэш для хранения координат городов.
+    results : AnalyticsCache
+        Кэш результатов аналитики по хэшу входных данных; размер задается переменной
+        окружения ANALYTICS_CACHE_SIZE (по умолчанию 256), а директория дискового кэша —
+        ANALYTICS_CACHE_PATH (по умолчанию результаты хранятся только в памяти); размер
+        и возраст файлов на диске ограничиваются переменными ANALYTICS_CACHE_DISK_MB
+        (по умолчанию 256) и ANALYTICS_CACHE_MAX_AGE_DAYS (по умолчанию 7).
     geolocator : geopy.geocoders.Nominatim
         Геолокатор для получения координат городов.
 
     Methods
     -------
-    get_user_info(data)
+    memoize(name, payload, compute, user_id=None)
+        Возвращает результат аналитики из кэша или вычисляет его.
+    decode_profile(data)
+        Преобразует друзей в колоночное представление, а группы и посты — в компактные записи.
+    get_user_info(data, user_id=None)
         Извлекает информацию о пользователе.
-    get_ages_friends(friends)
+    get_ages_friends(friends, user_id=None)
         Вычисляет распределение возрастов друзей.
-    get_genders_friends(friends)
+    get_genders_friends(friends, user_id=None)
         Вычисляет распределение полов среди друзей.
-    get_cities_friends(friends)
+    get_cities_friends(friends, user_id=None)
         Вычисляет распределение городов, в которых живут друзья.
-    get_stat(wall)
+    get_stat(wall, user_id=None)
         Вычисляет количество постов на стене пользователя по месяцам.
     get_coordinates(city)
         Получает координаты (широту и долготу) для указанного города.
-    get_marks(wall)
+    get_marks(wall, user_id=None)
         Вычисляет суммарное количество лайков, комментариев, просмотров и репостов на стене пользователя.
-    get_interests(groups)
+    get_interests(groups, user_id=None)
         Вычисляет распределение интересов среди групп.
-    get_toxic(wall)
+    get_toxic(wall, user_id=None)
         Возвращает среднюю вероятность различных типов токсичности для списка постов.
     """
 
-    def __init__(self):
+    def __init__(self, results=None):
         """
         Инициализирует кэш и геолокатор.
+
+        Parameters
+        ----------
+        results : AnalyticsCache, optional
+            Кэш результатов аналитики, по умолчанию создается новый.
         """
         self.cache = {}
+        self.results = results or AnalyticsCache(
+            max_entries=int(os.getenv("ANALYTICS_CACHE_SIZE", "256")),
+            directory=os.getenv("ANALYTICS_CACHE_PATH"),
+            max_disk_bytes=int(os.getenv("ANALYTICS_CACHE_DISK_MB", "256")) * 2**20,
+            max_age=float(os.getenv("ANALYTICS_CACHE_MAX_AGE_DAYS", "7")) * 86400,
+        )
         self.geolocator = Nominatim(user_agent="geoapiExercises")
 
-    def get_user_info(self, data):
+    def memoize(self, name, payload, compute, user_id=None):
+        """
+        Возвращает результат аналитики из кэша или вычисляет его.
+
+        Parameters
+        ----------
+        name : str
+            Название аналитики из ANALYTICS_VERSIONS.
+        payload : object
+            Входные данные аналитики.
+        compute : callable
+            Функция без аргументов, вычисляющая результат.
+        user_id : int, optional
+            Пользователь, к которому привязывается результат, чтобы удалить его при повторном
+            сборе профиля.
+
+        Returns
+        -------
+        object
+            Результат аналитики.
+        """
+        return self.results.get_or_compute(
+            name, ANALYTICS_VERSIONS[name], payload, compute, scope=user_id
+        )
+
+    def decode_profile(self, data):
+        """
+        Преобразует друзей в колоночное представление, а группы и посты — в компактные записи.
+
+        Результат занимает меньше памяти, чем исходные словари, и принимается всеми методами
+        класса, поэтому профиль достаточно преобразовать один раз.
+
+        Parameters
+        ----------
+        data : dict
+            Данные профиля с ключами 'user', 'friends', 'groups' и 'wall'.
+
+        Returns
+        -------
+        dict
+            Копия данных, в которой 'friends' — FriendsFrame, а 'groups' и 'wall' — списки
+            записей Group и Post.
+        """
+        return {
+            **data,
+            "friends": FriendsFrame.from_friends(data["friends"]),
+            "groups": decode_groups(data["groups"]),
+            "wall": decode_wall(data["wall"]),
+        }
+
+    def get_user_info(self, data, user_id=None):
         """
         Извлекает информацию о пользователе.
 
@@ -59,77 +146,87 @@ class UserProfileParser:
         ----------
         data : dict
             Словарь с данными о пользователе.
+        user_id : int, optional
+            Пользователь, к которому привязывается результат в кэше.
 
         Returns
         -------
         pd.DataFrame
             DataFrame с извлеченной информацией о пользователе.
         """
-        return user_info(data)
+        return self.memoize("user_info", data, lambda: user_info(data), user_id)
 
-    def get_ages_friends(self, friends):
+    def get_ages_friends(self, friends, user_id=None):
         """
         Вычисляет распределение возрастов друзей.
 
         Parameters
         ----------
-        friends : list of dict
+        friends : list of dict or list of Friend or FriendsFrame
             Список словарей, где каждый словарь представляет собой профиль друга.
+        user_id : int, optional
+            Пользователь, к которому привязывается результат в кэше.
 
         Returns
         -------
         pd.DataFrame
             DataFrame с распределением возрастов друзей.
         """
-        return ages_info(friends)
+        return self.memoize("ages", friends, lambda: ages_info(friends), user_id)
 
-    def get_genders_friends(self, friends):
+    def get_genders_friends(self, friends, user_id=None):
         """
         Вычисляет распределение полов среди друзей.
 
         Parameters
         ----------
-        friends : list of dict
+        friends : list of dict or list of Friend or FriendsFrame
             Список словарей, где каждый словарь представляет собой профиль друга.
+        user_id : int, optional
+            Пользователь, к которому привязывается результат в кэше.
 
         Returns
         -------
         pd.DataFrame
             DataFrame с распределением полов среди друзей.
         """
-        return geenders_info(friends)
+        return self.memoize("genders", friends, lambda: geenders_info(friends), user_id)
 
-    def get_cities_friends(self, friends):
+    def get_cities_friends(self, friends, user_id=None):
         """
         Вычисляет распределение городов, в которых живут друзья.
 
         Parameters
         ----------
-        friends : list of dict
+        friends : list of dict or list of Friend or FriendsFrame
             Список словарей, где каждый словарь представляет собой профиль друга.
+        user_id : int, optional
+            Пользователь, к которому привязывается результат в кэше.
 
         Returns
         -------
         pd.DataFrame
             DataFrame с распределением городов друзей.
         """
-        return cities_info(friends)
+        return self.memoize("cities", friends, lambda: cities_info(friends), user_id)
 
-    def get_stat(self, wall):
+    def get_stat(self, wall, user_id=None):
         """
         Вычисляет количество постов на стене пользователя по месяцам.
 
         Parameters
         ----------
-        wall : list of dict
+        wall : list of dict or list of Post
             Список словарей, где каждый словарь представляет собой пост на стене пользователя.
+        user_id : int, optional
+            Пользователь, к которому привязывается результат в кэше.
 
         Returns
         -------
         pd.DataFrame
             DataFrame с количеством постов по месяцам.
         """
-        return stat_info(wall)
+        return self.memoize("stat", wall, lambda: stat_info(wall), user_id)
 
     def get_coordinates(self, city):
         """
@@ -147,54 +244,72 @@ class UserProfileParser:
         """
         return coord_info(city, self.geolocator, self.cache)
 
-    def get_marks(self, wall):
+    def get_marks(self, wall, user_id=None):
         """
         Вычисляет суммарное количество лайков, комментариев, просмотров и репостов на стене пользователя.
 
         Parameters
         ----------
-        wall : list of dict
+        wall : list of dict or list of Post
             Список словарей, где каждый словарь представляет собой пост на стене пользователя.
+        user_id : int, optional
+            Пользователь, к которому привязывается результат в кэше.
 
         Returns
         -------
         pd.DataFrame
             DataFrame с суммарной статистикой по лайкам, комментариям, просмотрам и репостам.
         """
-        return marks_info(wall)
+        return self.memoize("marks", wall, lambda: marks_info(wall), user_id)
 
-    def get_interests(self, groups):
+    def get_interests(self, groups, user_id=None):
         """
         Вычисляет распределение интересов среди групп.
 
         Parameters
         ----------
-        groups : list of dict
+        groups : list of dict or list of Group
             Список словарей, где каждый словарь представляет собой информацию о группе.
+        user_id : int, optional
+            Пользователь, к которому привязывается результат в кэше.
 
         Returns
         -------
         pd.DataFrame
             DataFrame с распределением интересов среди групп.
         """
-        return interests_info(groups)
+        return self.memoize(
+            "interests", groups, lambda: interests_info(groups), user_id
+        )
 
-    def get_toxic(self, wall):
+    def get_toxic(self, wall, user_id=None):
         """
         Возвращает среднюю вероятность различных типов токсичности для списка постов.
 
         Parameters
         ----------
-        wall : list of dict
+        wall : list of dict or list of Post
             Список словарей, где каждый словарь представляет собой пост на стене пользователя.
+        user_id : int, optional
+            Пользователь, к которому привязывается результат в кэше.
 
         Returns
         -------
         pd.DataFrame
             DataFrame с вероятностями различных типов токсичности.
+
+        Notes
+        -----
+        Версия модели (название, реализация и ограничение длины) входит в ключ кэша,
+        поэтому после смены TOXIC_BACKEND или TOXIC_MAX_LENGTH результат вычисляется заново.
+        Версия берется из настроек, а модель загружается только если результата нет в кэше.
         """
-        toxic = Toxic()
-        return toxic.toxicity_info(wall)
+        return self.memoize(
+            "toxic",
+            {"model": Toxic.configured_version(), "wall": wall},
+            lambda: Toxic().toxicity_info(wall),
+            user_id,
+        )
 
     def get_gigachat_answer(self, answer):
         """
@@ -0,0 +1,521 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+HASH_SEED = 0x5EED
+
+
+def hash_values(values):
+    """
+    Вычисляет 64-битные хэши значений.
+
+    Parameters
+    ----------
+    values : list or np.ndarray
+        Значения; массивы целых чисел хэшируются напрямую, остальные значения приводятся
+        к строкам, поэтому хэш не зависит от процесса.
+
+    Returns
+    -------
+    np.ndarray
+        Хэши (uint64).
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+        return pd.util.hash_array(values)
+    keys = np.asarray([str(value) for value in values], dtype=object)
+    return pd.util.hash_array(keys, categorize=False)
+
+
+class CountMinSketch:
+    """
+    Скетч Count-Min для оценки частот значений в фиксированной памяти.
+
+    Оценка частоты никогда не меньше истинной и с вероятностью не меньше 1 - delta превышает
+    ее не более чем на epsilon * total, где total — количество учтенных значений.
+
+    Attributes
+    ----------
+    epsilon : float
+        Допустимая относительная ошибка.
+    delta : float
+        Вероятность превысить ошибку.
+    width : int
+        Количество счетчиков в строке, ceil(e / epsilon).
+    depth : int
+        Количество строк, ceil(ln(1 / delta)).
+    table : np.ndarray
+        Таблица счетчиков depth x width (int64).
+    total : int
+        Количество учтенных значений.
+
+    Methods
+    -------
+    add(hashes, counts)
+        Учитывает значения по их хэшам.
+    estimate(hashes)
+        Оценивает частоты значений.
+    merge(other)
+        Добавляет счетчики другого скетча с теми же параметрами.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+        rng = np.random.default_rng(HASH_SEED)
+        self.a = rng.integers(1, 1 << 63, size=self.depth, dtype=np.uint64) | np.uint64(
+            1
+        )
+        self.b = rng.integers(0, 1 << 63, size=self.depth, dtype=np.uint64)
+
+    def columns(self, hashes):
+        """
+        Вычисляет номера счетчиков значений в каждой строке.
+
+        Для каждой строки хэш перемешивается своей функцией a * h + b по модулю 2 ** 64,
+        а номер счетчика берется из старших бит.
+
+        Parameters
+        ----------
+        hashes : np.ndarray
+            Хэши значений (uint64).
+
+        Returns
+        -------
+        np.ndarray
+            Номера счетчиков depth x len(hashes).
+        """
+        mixed = self.a[:, None] * np.asarray(hashes, dtype=np.uint64) + self.b[:, None]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, hashes, counts):
+        """
+        Учитывает значения по их хэшам.
+
+        Parameters
+        ----------
+        hashes : np.ndarray
+            Хэши значений (uint64).
+        counts : np.ndarray
+            Количество появлений каждого значения.
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        columns = self.columns(hashes)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, hashes):
+        """
+        Оценивает частоты значений.
+
+        Parameters
+        ----------
+        hashes : np.ndarray
+            Хэши значений (uint64).
+
+        Returns
+        -------
+        np.ndarray
+            Оценки частот (int64).
+        """
+        columns = self.columns(hashes)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def merge(self, other):
+        """
+        Добавляет счетчики другого скетча с теми же параметрами.
+
+        Parameters
+        ----------
+        other : CountMinSketch
+            Другой скетч.
+
+        Raises
+        ------
+        ValueError
+            Возникает, если размеры скетчей различаются.
+        """
+        if self.table.shape != other.table.shape:
+            raise ValueError("Скетчи Count-Min с разными параметрами нельзя объединить")
+        self.table += other.table
+        self.total += other.total
+
+
+class SpaceSaving:
+    """
+    Алгоритм Space-Saving для поиска самых частых значений в фиксированной памяти.
+
+    Хранит не более capacity счетчиков. Каждое значение с частотой больше total / capacity
+    гарантированно присутствует среди них, а счетчик превышает истинную частоту не более чем
+    на свою ошибку (и не более чем на total / capacity).
+
+    Attributes
+    ----------
+    capacity : int
+        Максимальное количество счетчиков.
+    counts : dict
+        Оценка частоты каждого отслеживаемого значения.
+    errors : dict
+        Максимальное превышение оценки над истинной частотой.
+    total : int
+        Количество учтенных значений.
+
+    Methods
+    -------
+    add(value, count=1)
+        Учитывает значение.
+    merge(other)
+        Объединяет со сводкой другого экземпляра.
+    top(k)
+        Возвращает самые частые значения.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+
+    def add(self, value, count=1):
+        """
+        Учитывает значение.
+
+        Parameters
+        ----------
+        value : object
+            Значение.
+        count : int, optional
+            Количество появлений, по умолчанию 1.
+        """
+        self.total += count
+        if value in self.counts:
+            self.counts[value] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[value] = count
+            self.errors[value] = 0
+        else:
+            smallest = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(smallest)
+            self.errors.pop(smallest)
+            self.counts[value] = floor + count
+            self.errors[value] = floor
+
+    def floor(self):
+        """
+        Возвращает наибольшую частоту значения, которое не отслеживается.
+
+        Returns
+        -------
+        int
+            Наименьший счетчик, если все счетчики заняты, иначе 0.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other):
+        """
+        Объединяет со сводкой другого экземпляра.
+
+        Значения, которых нет в одной из сводок, получают ее наименьший счетчик в качестве
+        оценки и ошибки, после чего остаются capacity самых частых значений.
+
+        Parameters
+        ----------
+        other : SpaceSaving
+            Другая сводка.
+        """
+        own_floor, other_floor = self.floor(), other.floor()
+        counts, errors = {}, {}
+        for value in self.counts.keys() | other.counts.keys():
+            counts[value] = self.counts.get(value, own_floor) + other.counts.get(
+                value, other_floor
+            )
+            errors[value] = self.errors.get(value, own_floor) + other.errors.get(
+                value, other_floor
+            )
+        kept = sorted(counts, key=counts.get, reverse=True)[: self.capacity]
+        self.counts = {value: counts[value] for value in kept}
+        self.errors = {value: errors[value] for value in kept}
+        self.total += other.total
+
+    def top(self, k):
+        """
+        Возвращает самые частые значения.
+
+        Parameters
+        ----------
+        k : int
+            Количество значений.
+
+        Returns
+        -------
+        list of tuple
+            Кортежи (значение, оценка частоты, ошибка) по убыванию частоты.
+        """
+        values = sorted(self.counts, key=self.counts.get, reverse=True)[:k]
+        return [(value, self.counts[value], self.errors[value]) for value in values]
+
+
+class HyperLogLog:
+    """
+    Скетч HyperLogLog для оценки количества различных значений в фиксированной памяти.
+
+    Attributes
+    ----------
+    precision : int
+        Количество бит хэша, выбирающих регистр (от 4 до 16).
+    registers : np.ndarray
+        2 ** precision регистров (uint8).
+
+    Methods
+    -------
+    add(hashes)
+        Учитывает значения по их хэшам.
+    estimate()
+        Оценивает количество различных значений.
+    relative_error()
+        Возвращает стандартную относительную ошибку оценки.
+    merge(other)
+        Объединяет с другим скетчем с той же точностью.
+    """
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError("Точность HyperLogLog должна быть от 4 до 16")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, hashes):
+        """
+        Учитывает значения по их хэшам.
+
+        Parameters
+        ----------
+        hashes : np.ndarray
+            Хэши значений (uint64).
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = (hashes & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        _, bits = np.frexp(rest)
+        rank = (33 - bits).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        """
+        Оценивает количество различных значений.
+
+        Returns
+        -------
+        int
+            Оценка количества различных значений.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(float(raw))
+
+    def relative_error(self):
+        """
+        Возвращает стандартную относительную ошибку оценки.
+
+        Returns
+        -------
+        float
+            1.04 / sqrt(2 ** precision).
+        """
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def merge(self, other):
+        """
+        Объединяет с другим скетчем с той же точностью.
+
+        Parameters
+        ----------
+        other : HyperLogLog
+            Другой скетч.
+
+        Raises
+        ------
+        ValueError
+            Возникает, если точность скетчей различается.
+        """
+        if self.precision != other.precision:
+            raise ValueError("Скетчи HyperLogLog с разной точностью нельзя объединить")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+
+class TopKSketch:
+    """
+    Приближенный счетчик самых частых значений и количества различных значений.
+
+    Объединяет Space-Saving (кандидаты в самые частые значения), Count-Min (уточнение их
+    частот) и HyperLogLog (количество различных значений). Память не зависит от количества
+    учтенных значений, а скетчи с одинаковыми параметрами объединяются.
+
+    Attributes
+    ----------
+    top_k : int
+        Количество значений в результате.
+    candidates : SpaceSaving
+        Кандидаты в самые частые значения.
+    frequencies : CountMinSketch
+        Оценки частот.
+    distinct : HyperLogLog
+        Оценка количества различных значений.
+
+    Methods
+    -------
+    add(values, counts=None)
+        Учитывает значения.
+    merge(other)
+        Объединяет с другим скетчем с теми же параметрами.
+    to_frame(columns)
+        Возвращает самые частые значения с границами ошибки.
+    bounds()
+        Возвращает параметры и границы ошибки.
+
+    Examples
+    --------
+    >>> sketch = TopKSketch(top_k=2)
+    >>> sketch.add(['Москва', 'Москва', 'Казань'])
+    >>> sketch.to_frame(['City', 'Count'])['City'].tolist()
+    ['Москва', 'Казань']
+    """
+
+    def __init__(self, top_k=20, epsilon=0.001, delta=0.01, precision=12):
+        """
+        Инициализирует пустой скетч.
+
+        Parameters
+        ----------
+        top_k : int, optional
+            Количество значений в результате, по умолчанию 20. Space-Saving хранит в 10 раз
+            больше кандидатов.
+        epsilon : float, optional
+            Относительная ошибка Count-Min, по умолчанию 0.001.
+        delta : float, optional
+            Вероятность превысить ошибку Count-Min, по умолчанию 0.01.
+        precision : int, optional
+            Точность HyperLogLog, по умолчанию 12 (относительная ошибка около 1.6%).
+        """
+        self.top_k = top_k
+        self.candidates = SpaceSaving(capacity=top_k * 10)
+        self.frequencies = CountMinSketch(epsilon=epsilon, delta=delta)
+        self.distinct = HyperLogLog(precision=precision)
+
+    def add(self, values, counts=None):
+        """
+        Учитывает значения; значения None пропускаются.
+
+        Parameters
+        ----------
+        values : list
+            Значения.
+        counts : list of int, optional
+            Количество появлений каждого значения, по умолчанию по одному.
+        """
+        if counts is None:
+            codes, uniques = pd.factorize(pd.Series(list(values), dtype=object))
+            values = list(uniques)
+            counts = np.bincount(codes[codes >= 0], minlength=len(values))
+        else:
+            pairs = [(v, c) for v, c in zip(values, counts) if v is not None]
+            values = [value for value, _ in pairs]
+            counts = np.asarray([count for _, count in pairs], dtype=np.int64)
+        if not values:
+            return
+
+        hashes = hash_values(values)
+        self.frequencies.add(hashes, counts)
+        self.distinct.add(hashes)
+        for value, count in zip(values, counts.tolist()):
+            self.candidates.add(value, count)
+
+    def merge(self, other):
+        """
+        Объединяет с другим скетчем с теми же параметрами.
+
+        Parameters
+        ----------
+        other : TopKSketch
+            Другой скетч.
+        """
+        self.candidates.merge(other.candidates)
+        self.frequencies.merge(other.frequencies)
+        self.distinct.merge(other.distinct)
+
+    def bounds(self):
+        """
+        Возвращает параметры и границы ошибки.
+
+        Returns
+        -------
+        dict
+            Количество учтенных значений ('total'), оценка количества различных значений
+            ('distinct') и ее относительная ошибка ('distinct_error'), epsilon, delta,
+            максимальное превышение частоты ('count_error' = epsilon * total), наибольшая
+            частота значения, вытесненного из кандидатов ('floor'), и порог полноты
+            ('miss_threshold' = total / capacity): любое значение с частотой выше порога
+            гарантированно есть в результате, а значения с частотой не выше floor могли
+            быть пропущены.
+        """
+        total = self.frequencies.total
+        return {
+            "total": total,
+            "distinct": self.distinct.estimate(),
+            "distinct_error": self.distinct.relative_error(),
+            "epsilon": self.frequencies.epsilon,
+            "delta": self.frequencies.delta,
+            "count_error": math.ceil(self.frequencies.epsilon * total),
+            "floor": self.candidates.floor(),
+            "miss_threshold": self.candidates.total / self.candidates.capacity,
+        }
+
+    def to_frame(self, columns):
+        """
+        Возвращает самые частые значения с границами ошибки.
+
+        Parameters
+        ----------
+        columns : list of str
+            Названия столбцов значения и частоты.
+
+        Returns
+        -------
+        pd.DataFrame
+            Столбцы значения, оценки частоты и 'Error' (максимальное превышение оценки над
+            истинной частотой) по убыванию частоты. В атрибуте attrs — результат bounds().
+
+        Notes
+        -----
+        Space-Saving гарантирует только значения с частотой выше attrs['miss_threshold'],
+        поэтому значения с меньшей частотой могут отсутствовать в результате, даже если они
+        чаще попавших в него. Кандидаты упорядочиваются по меньшей из оценок Space-Saving
+        и Count-Min, поэтому вытесненные редкие значения не вытесняют из результата частые.
+        """
+        top = self.candidates.top(self.candidates.capacity)
+        values = [value for value, _, _ in top]
+        estimates = (
+            self.frequencies.estimate(hash_values(values))
+            if values
+            else np.zeros(0, np.int64)
+        )
+        bound = math.ceil(self.frequencies.epsilon * self.frequencies.total)
+        rows = [
+            (value, min(count, int(estimate)), min(error, bound))
+            for (value, count, error), estimate in zip(top, estimates.tolist())
+        ]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        frame = pd.DataFrame(rows[: self.top_k], columns=[*columns, "Error"])
+        frame.attrs.update(self.bounds())
+        return frame
@@ -0,0 +1,600 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import zstandard
+from scraper.data_processor import COUNTER_KEYS
+from scraper.friends_graph import ID_DTYPE
+from scraper.profile_store import DEFAULT_DB_PATH
+
+KEYFRAME_INTERVAL = 30
+RECORD_ATTEMPTS = 5
+UNCHANGED = -1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    user_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    scraped_at REAL NOT NULL,
+    keyframe INTEGER NOT NULL,
+    added_friends BLOB NOT NULL,
+    removed_friends BLOB NOT NULL,
+    removed_posts BLOB NOT NULL,
+    counters BLOB NOT NULL,
+    objects BLOB NOT NULL,
+    PRIMARY KEY (user_id, version)
+);
+CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots (user_id, scraped_at);
+"""
+
+
+def strip_counters(post):
+    """
+    Возвращает пост без счетчиков лайков, комментариев, просмотров и репостов.
+
+    Parameters
+    ----------
+    post : dict
+        Пост со стены.
+
+    Returns
+    -------
+    dict
+        Копия поста без счетчиков.
+    """
+    return {key: value for key, value in post.items() if key not in COUNTER_KEYS}
+
+
+def counter_changes(old, new):
+    """
+    Сравнивает счетчики двух версий поста.
+
+    Parameters
+    ----------
+    old : dict
+        Сохраненная версия поста.
+    new : dict
+        Новая версия поста.
+
+    Returns
+    -------
+    list of int or None
+        Новые значения счетчиков в порядке COUNTER_KEYS (UNCHANGED для неизменившихся)
+        или None, если изменилось что-то кроме значения 'count' и пост нужно сохранить
+        целиком.
+
+    Examples
+    --------
+    >>> counter_changes({'likes': {'count': 1}}, {'likes': {'count': 3}})
+    [3, -1, -1, -1]
+    """
+    row = []
+    for key in COUNTER_KEYS:
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            row.append(UNCHANGED)
+        elif (
+            isinstance(before, dict)
+            and isinstance(after, dict)
+            and strip_count(before) == strip_count(after)
+        ):
+            row.append(after.get("count", 0))
+        else:
+            return None
+    return row
+
+
+def strip_count(counter):
+    """
+    Возвращает счетчик без значения 'count'.
+
+    Parameters
+    ----------
+    counter : dict
+        Счетчик поста, например {'count': 5, 'user_likes': 0}.
+
+    Returns
+    -------
+    dict
+        Копия счетчика без ключа 'count'.
+    """
+    return {key: value for key, value in counter.items() if key != "count"}
+
+
+def pack_ids(ids):
+    """
+    Упаковывает идентификаторы в отсортированный массив байтов.
+
+    Parameters
+    ----------
+    ids : iterable of int
+        Идентификаторы.
+
+    Returns
+    -------
+    bytes
+        Отсортированный массив ID_DTYPE.
+    """
+    return np.sort(np.fromiter(ids, dtype=ID_DTYPE)).tobytes()
+
+
+def unpack_ids(data):
+    """
+    Распаковывает массив идентификаторов, упакованный pack_ids.
+
+    Parameters
+    ----------
+    data : bytes
+        Упакованный массив.
+
+    Returns
+    -------
+    np.ndarray
+        Отсортированный массив идентификаторов.
+    """
+    return np.frombuffer(data, dtype=ID_DTYPE)
+
+
+class SnapshotStore:
+    """
+    Хранилище истории профилей в виде цепочки изменений.
+
+    Каждый сбор профиля сохраняется как версия. Раз в KEYFRAME_INTERVAL версий сохраняется
+    полный снимок, а между ними — только изменения относительно предыдущей версии:
+    добавленные и удаленные друзья (отсортированные массивы id), новые и измененные объекты
+    друзей и постов, удаленные посты и изменения счетчиков постов. Поэтому объем истории
+    растет вместе с количеством изменений, а не с размером профиля, умноженным на число
+    сборов. Любая версия восстанавливается применением изменений к ближайшему полному снимку.
+
+    Attributes
+    ----------
+    path : str
+        Путь к файлу базы данных.
+    connection : sqlite3.Connection
+        Соединение с базой данных, общее для всех потоков.
+
+    Methods
+    -------
+    record(user_id, user, friends, groups, wall, scraped_at=None)
+        Сохраняет новую версию профиля.
+    versions(user_id)
+        Возвращает список сохраненных версий профиля.
+    reconstruct(user_id, version=None, at=None)
+        Восстанавливает профиль на момент заданной версии или времени.
+    changes(user_id, version)
+        Возвращает изменения, внесенные версией.
+    close()
+        Закрывает соединение с базой данных.
+
+    Examples
+    --------
+    >>> snapshots = SnapshotStore('profiles.db')
+    >>> snapshots.record(1, user, friends, groups, wall)
+    1
+    >>> snapshots.changes(1, 2)['added_friends']
+    array([42], dtype=uint32)
+    >>> old = snapshots.reconstruct(1, at=time.time() - 30 * 86400)
+    """
+
+    def __init__(self, path=None):
+        """
+        Открывает базу данных и создает таблицу версий, если ее еще нет.
+
+        Parameters
+        ----------
+        path : str, optional
+            Путь к файлу базы данных, по умолчанию значение переменной окружения
+            PROFILE_DB_PATH или data_base/profiles.db.
+        """
+        self.path = path or os.getenv("PROFILE_DB_PATH", DEFAULT_DB_PATH)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """
+        Закрывает соединение с базой данных.
+        """
+        with self.lock:
+            self.connection.close()
+
+    def record(self, user_id, user, friends, groups, wall, scraped_at=None):
+        """
+        Сохраняет новую версию профиля.
+
+        Базу могут одновременно использовать дэшборд и пакетный сбор. Если другой процесс
+        успел сохранить ту же версию, изменения кодируются заново относительно его версии.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        user : dict
+            Информация о пользователе.
+        friends : list of dict
+            Друзья пользователя.
+        groups : list of dict
+            Группы пользователя.
+        wall : list of dict
+            Посты со стены пользователя.
+        scraped_at : float, optional
+            Время сбора в секундах Unix, по умолчанию текущее время.
+
+        Returns
+        -------
+        int
+            Номер сохраненной версии.
+
+        Raises
+        ------
+        sqlite3.IntegrityError
+            Возникает, если версию не удалось сохранить за RECORD_ATTEMPTS попыток.
+        """
+        scraped_at = scraped_at or time.time()
+        current = {
+            "user": user,
+            "friends": {friend["id"]: friend for friend in friends or []},
+            "groups": list(groups or []),
+            "posts": {post["id"]: post for post in wall or []},
+        }
+
+        for attempt in range(RECORD_ATTEMPTS):
+            last = self.last_version(user_id)
+            version = last + 1
+            keyframe = last % KEYFRAME_INTERVAL == 0
+            if keyframe:
+                row = self.encode_keyframe(current)
+            else:
+                row = self.encode_delta(self.reconstruct_state(user_id, last), current)
+
+            try:
+                with self.lock, self.connection:
+                    self.connection.execute(
+                        "INSERT INTO snapshots (user_id, version, scraped_at, keyframe, "
+                        "added_friends, removed_friends, removed_posts, counters, objects) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (user_id, version, scraped_at, int(keyframe), *row),
+                    )
+                return version
+            except sqlite3.IntegrityError:
+                if attempt == RECORD_ATTEMPTS - 1:
+                    raise
+
+    def encode_keyframe(self, state):
+        """
+        Кодирует полный снимок профиля.
+
+        Parameters
+        ----------
+        state : dict
+            Состояние профиля.
+
+        Returns
+        -------
+        tuple
+            Значения столбцов added_friends, removed_friends, removed_posts, counters и objects.
+        """
+        objects = {
+            "user": state["user"],
+            "groups": state["groups"],
+            "friends": list(state["friends"].values()),
+            "posts": list(state["posts"].values()),
+        }
+        return (
+            pack_ids(state["friends"]),
+            b"",
+            b"",
+            b"",
+            zstandard.ZstdCompressor().compress(
+                json.dumps(objects, ensure_ascii=False).encode()
+            ),
+        )
+
+    def encode_delta(self, previous, current):
+        """
+        Кодирует изменения профиля относительно предыдущей версии.
+
+        Parameters
+        ----------
+        previous : dict
+            Состояние профиля в предыдущей версии.
+        current : dict
+            Текущее состояние профиля.
+
+        Returns
+        -------
+        tuple
+            Значения столбцов added_friends, removed_friends, removed_posts, counters и objects.
+        """
+        old_ids = unpack_ids(pack_ids(previous["friends"]))
+        new_ids = unpack_ids(pack_ids(current["friends"]))
+        added = np.setdiff1d(new_ids, old_ids, assume_unique=True)
+        removed = np.setdiff1d(old_ids, new_ids, assume_unique=True)
+
+        objects = {
+            "friends": [
+                friend
+                for friend_id, friend in current["friends"].items()
+                if previous["friends"].get(friend_id) != friend
+            ],
+            "posts": [],
+        }
+        if current["user"] != previous["user"]:
+            objects["user"] = current["user"]
+        if current["groups"] != previous["groups"]:
+            objects["groups"] = current["groups"]
+
+        counters = []
+        for post_id, post in current["posts"].items():
+            old = previous["posts"].get(post_id)
+            if old == post:
+                continue
+            row = None
+            if old is not None and strip_counters(old) == strip_counters(post):
+                row = counter_changes(old, post)
+            if row is None:
+                objects["posts"].append(post)
+            else:
+                counters.append([post_id, *row])
+
+        removed_posts = set(previous["posts"]) - set(current["posts"])
+        return (
+            added.tobytes(),
+            removed.tobytes(),
+            pack_ids(removed_posts),
+            np.asarray(counters, dtype=np.int64).tobytes(),
+            zstandard.ZstdCompressor().compress(
+                json.dumps(objects, ensure_ascii=False).encode()
+            ),
+        )
+
+    def last_version(self, user_id):
+        """
+        Возвращает номер последней версии профиля.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        int
+            Номер последней версии или 0, если профиль еще не сохранялся.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT MAX(version) FROM snapshots WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] or 0
+
+    def versions(self, user_id):
+        """
+        Возвращает список сохраненных версий профиля.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        list of dict
+            Для каждой версии: номер, время сбора, признак полного снимка и размер в байтах.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT version, scraped_at, keyframe, length(added_friends) "
+                "+ length(removed_friends) + length(removed_posts) + length(counters) "
+                "+ length(objects) AS size FROM snapshots WHERE user_id = ? "
+                "ORDER BY version",
+                (user_id,),
+            ).fetchall()
+        return [
+            {
+                "version": row["version"],
+                "scraped_at": row["scraped_at"],
+                "keyframe": bool(row["keyframe"]),
+                "size": row["size"],
+            }
+            for row in rows
+        ]
+
+    def find_version(self, user_id, at):
+        """
+        Возвращает номер последней версии, собранной не позже заданного времени.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        at : float
+            Время в секундах Unix.
+
+        Returns
+        -------
+        int or None
+            Номер версии или None, если таких версий нет.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT MAX(version) FROM snapshots "
+                "WHERE user_id = ? AND scraped_at <= ?",
+                (user_id, at),
+            ).fetchone()
+        return row[0]
+
+    def reconstruct(self, user_id, version=None, at=None):
+        """
+        Восстанавливает профиль на момент заданной версии или времени.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        version : int, optional
+            Номер версии, по умолчанию последняя.
+        at : float, optional
+            Время в секундах Unix; используется последняя версия, собранная не позже него.
+
+        Returns
+        -------
+        dict or None
+            Словарь с ключами 'user', 'friends' (по возрастанию id), 'groups', 'wall'
+            (от новых постов к старым), 'version' и 'scraped_at' или None, если версия
+            не найдена.
+        """
+        if at is not None:
+            version = self.find_version(user_id, at)
+        elif version is None:
+            version = self.last_version(user_id)
+        if not version:
+            return None
+
+        state = self.reconstruct_state(user_id, version)
+        if state is None:
+            return None
+        return {
+            "user": state["user"],
+            "friends": [state["friends"][key] for key in sorted(state["friends"])],
+            "groups": state["groups"],
+            "wall": [
+                state["posts"][key] for key in sorted(state["posts"], reverse=True)
+            ],
+            "version": version,
+            "scraped_at": state["scraped_at"],
+        }
+
+    def reconstruct_state(self, user_id, version):
+        """
+        Применяет изменения к ближайшему полному снимку и возвращает состояние профиля.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        version : int
+            Номер версии.
+
+        Returns
+        -------
+        dict or None
+            Состояние профиля с друзьями и постами в словарях по id или None, если версия
+            не найдена.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT * FROM snapshots WHERE user_id = ? AND version <= ? "
+                "AND version >= (SELECT MAX(version) FROM snapshots "
+                "WHERE user_id = ? AND version <= ? AND keyframe = 1) "
+                "ORDER BY version",
+                (user_id, version, user_id, version),
+            ).fetchall()
+        if not rows or rows[-1]["version"] != version:
+            return None
+
+        decompressor = zstandard.ZstdDecompressor()
+        state = None
+        for row in rows:
+            objects = json.loads(decompressor.decompress(row["objects"]))
+            if row["keyframe"]:
+                state = {
+                    "user": objects["user"],
+                    "groups": objects["groups"],
+                    "friends": {friend["id"]: friend for friend in objects["friends"]},
+                    "posts": {post["id"]: post for post in objects["posts"]},
+                }
+            else:
+                self.apply_delta(state, row, objects)
+            state["scraped_at"] = row["scraped_at"]
+        return state
+
+    @staticmethod
+    def apply_delta(state, row, objects):
+        """
+        Применяет изменения одной версии к состоянию профиля.
+
+        Parameters
+        ----------
+        state : dict
+            Состояние профиля; изменяется на месте.
+        row : sqlite3.Row
+            Строка версии из таблицы snapshots.
+        objects : dict
+            Распакованные объекты версии.
+        """
+        for friend_id in unpack_ids(row["removed_friends"]).tolist():
+            state["friends"].pop(friend_id, None)
+        for friend in objects["friends"]:
+            state["friends"][friend["id"]] = friend
+
+        for post_id in unpack_ids(row["removed_posts"]).tolist():
+            state["posts"].pop(post_id, None)
+        for post in objects["posts"]:
+            state["posts"][post["id"]] = post
+
+        counters = np.frombuffer(row["counters"], dtype=np.int64)
+        for post_id, *values in counters.reshape(-1, len(COUNTER_KEYS) + 1).tolist():
+            post = state["posts"][post_id]
+            for key, value in zip(COUNTER_KEYS, values):
+                if value != UNCHANGED:
+                    post[key]["count"] = value
+
+        if "user" in objects:
+            state["user"] = objects["user"]
+        if "groups" in objects:
+            state["groups"] = objects["groups"]
+
+    def changes(self, user_id, version):
+        """
+        Возвращает изменения, внесенные версией.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        version : int
+            Номер версии.
+
+        Returns
+        -------
+        dict or None
+            Добавленные и удаленные друзья, удаленные посты (массивы id), новые и измененные
+            посты и изменения счетчиков (массив строк [id, likes, comments, views, reposts])
+            или None, если версия не найдена. Для полного снимка все друзья считаются
+            добавленными.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT * FROM snapshots WHERE user_id = ? AND version = ?",
+                (user_id, version),
+            ).fetchone()
+        if row is None:
+            return None
+
+        objects = json.loads(zstandard.ZstdDecompressor().decompress(row["objects"]))
+        return {
+            "keyframe": bool(row["keyframe"]),
+            "added_friends": unpack_ids(row["added_friends"]),
+            "removed_friends": unpack_ids(row["removed_friends"]),
+            "removed_posts": unpack_ids(row["removed_posts"]),
+            "posts": objects["posts"],
+            "counters": np.frombuffer(row["counters"], dtype=np.int64).reshape(
+                -1, len(COUNTER_KEYS) + 1
+            ),
+        }
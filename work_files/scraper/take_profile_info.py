@@ -1,4 +1,149 @@
+import asyncio
+import json
+import random
+
+import aiohttp
 import vk_api
+from scraper.token_pool import ROTATION_ERROR_CODES, TokenPool
+
+USER_FIELDS = (
+    "domain,sex,bdate,city,country,site,activities,interests,schools,universities"
+)
+FRIENDS_FIELDS = "sex,bdate,city,country"
+GROUPS_FIELDS = "activity,city,country,site"
+WALL_COUNT = 100
+USERS_GET_LIMIT = 1000
+
+API_URL = "https://api.vk.com/method/"
+API_VERSION = "5.131"
+RETRY_ERROR_CODES = (6, 9, 10)
+
+PROFILE_SCRIPT = """
+var users = API.users.get({"user_ids": %(user_ids)s, "fields": "%(user_fields)s"});
+if (!users || users.length == 0) {
+    return {"user": users};
+}
+var user_id = users[0].id;
+return {
+    "user": users,
+    "friends": API.friends.get({"user_id": user_id, "fields": "%(friends_fields)s"}),
+    "groups": API.groups.get({"user_id": user_id, "extended": 1, "fields": "%(groups_fields)s"}),
+    "wall": API.wall.get({"owner_id": user_id, "count": %(wall_count)d, "filter": "all"})
+};
+"""
+
+
+def unavailable_reason(user):
+    """
+    Определяет, закрыт, удален или заблокирован профиль пользователя.
+
+    Parameters
+    ----------
+    user : dict
+        Информация о пользователе из ответа users.get.
+
+    Returns
+    -------
+    str or None
+        'deleted', 'banned' или 'closed', если данные профиля недоступны, иначе None.
+
+    Examples
+    --------
+    >>> unavailable_reason({'id': 1, 'deactivated': 'banned'})
+    'banned'
+    >>> unavailable_reason({'id': 1, 'is_closed': True, 'can_access_closed': False})
+    'closed'
+    """
+    if user.get("deactivated"):
+        return user["deactivated"]
+    if user.get("is_closed") and not user.get("can_access_closed"):
+        return "closed"
+    return None
+
+
+def split_profile_response(response):
+    """
+    Разбирает ответ execute на полученные данные и части, в которых отказал VK API.
+
+    Если вложенный метод завершился ошибкой (например, друзья или стена скрыты настройками
+    приватности), execute возвращает для него False; повторный запрос тем же методом
+    завершится той же ошибкой, поэтому такие части не запрашиваются повторно. Части,
+    которых нет в ответе, запрашиваются отдельными методами.
+
+    Parameters
+    ----------
+    response : dict or None
+        Ответ execute или None, если запрос не удался целиком.
+
+    Returns
+    -------
+    tuple of (dict, set)
+        Словарь с ключами 'user', 'friends', 'groups' и 'wall' (значения, которых нет
+        в ответе, равны None) и множество ключей, в которых VK API отказал.
+
+    Examples
+    --------
+    >>> split_profile_response({'user': [{'id': 1}], 'friends': False})
+    ({'user': [{'id': 1}], 'friends': None, 'groups': None, 'wall': None}, {'friends'})
+    """
+    data = {"user": None, "friends": None, "groups": None, "wall": None}
+    denied = set()
+    for key in data:
+        value = (response or {}).get(key)
+        if value:
+            data[key] = value
+        elif value is not None:
+            denied.add(key)
+    return data, denied
+
+
+def build_profile_script(user_name):
+    """
+    Формирует код VKScript для получения всех данных профиля одним запросом execute.
+
+    Parameters
+    ----------
+    user_name : int or str
+        Идентификатор или короткое имя пользователя.
+
+    Returns
+    -------
+    str
+        Код VKScript для метода execute.
+    """
+    return PROFILE_SCRIPT % {
+        "user_ids": json.dumps(str(user_name)),
+        "user_fields": USER_FIELDS,
+        "friends_fields": FRIENDS_FIELDS,
+        "groups_fields": GROUPS_FIELDS,
+        "wall_count": WALL_COUNT,
+    }
+
+
+class PooledApi:
+    """
+    Объект для выполнения методов VK API с токенами из пула.
+
+    Повторяет интерфейс vk_api.VkApiMethod: вызов api.users.get(...) выполняет метод 'users.get'
+    через VkProfile.method.
+
+    Attributes
+    ----------
+    profile : VkProfile
+        Профиль, выполняющий запросы.
+    name : str or None
+        Накопленное название метода.
+    """
+
+    def __init__(self, profile, name=None):
+        self.profile = profile
+        self.name = name
+
+    def __getattr__(self, name):
+        return PooledApi(self.profile, f"{self.name}.{name}" if self.name else name)
+
+    def __call__(self, **params):
+        return self.profile.method(self.name, **params)
 
 
 class VkProfile:
@@ -7,13 +152,27 @@ class VkProfile:
 
     Attributes
     ----------
-    session : vk_api.VkApi
-        Сессия VK API, используемая для выполнения запросов.
-    api : vk_api.vk_api.VkApiMethod
-        Объект для выполнения методов VK API.
+    pool : TokenPool
+        Пул токенов VK API, между которыми распределяются запросы.
+    sessions : dict
+        Сессия vk_api.VkApi для каждого токена пула.
+    api : PooledApi
+        Объект для выполнения методов VK API с токенами из пула.
+    batch : bool
+        Если True, данные профиля запрашиваются одним вызовом execute.
+    max_retries : int
+        Максимальное количество повторов запроса с другим токеном.
 
     Methods
     -------
+    method(name, **params)
+        Выполняет метод VK API с токеном из пула.
+    usage()
+        Возвращает статистику использования токенов.
+    get_profile_data(user_name)
+        Получает информацию о пользователе, его друзьях, группах и стене.
+    execute_profile(user_name)
+        Получает все данные профиля одним запросом execute.
     get_user_info(user_id)
         Получает информацию о пользователе.
     get_friends_info(user_id)
@@ -24,17 +183,145 @@ class VkProfile:
         Получает информацию о постах на стене пользователя.
     """
 
-    def __init__(self, token):
+    def __init__(self, token, batch=True, rate=3, max_retries=3):
+        """
+        Инициализирует сессии VK API для указанных токенов.
+
+        Parameters
+        ----------
+        token : str, list of str or TokenPool
+            Токен доступа VK API, несколько токенов через запятую, список токенов или пул токенов.
+        batch : bool, optional
+            Если True, данные профиля запрашиваются одним вызовом execute, по умолчанию True.
+        rate : float, optional
+            Количество запросов в секунду для каждого токена, по умолчанию 3.
+        max_retries : int, optional
+            Максимальное количество повторов запроса с другим токеном, по умолчанию 3.
+        """
+        self.pool = token if isinstance(token, TokenPool) else TokenPool(token, rate)
+        self.sessions = {t: vk_api.VkApi(token=t) for t in self.pool.tokens}
+        self.api = PooledApi(self)
+        self.batch = batch
+        self.max_retries = max_retries
+
+    def method(self, name, **params):
+        """
+        Выполняет метод VK API с токеном из пула.
+
+        Если токен вернул ошибку ограничения частоты или авторизации, он выводится из ротации,
+        а запрос повторяется с другим токеном.
+
+        Parameters
+        ----------
+        name : str
+            Название метода, например 'users.get'.
+        **params
+            Параметры метода.
+
+        Returns
+        -------
+        dict or list
+            Ответ API.
+
+        Raises
+        ------
+        vk_api.ApiError
+            Возникает при ошибке API ВКонтакте, которую не удалось исправить повтором.
+        NoTokensAvailable
+            Возникает, если все токены выведены из ротации.
+        """
+        attempt = 0
+        while True:
+            token = self.pool.acquire()
+            try:
+                return self.sessions[token].method(name, params)
+            except vk_api.ApiError as e:
+                self.pool.report_error(token, e.code)
+                retry = e.code in RETRY_ERROR_CODES or (
+                    e.code in ROTATION_ERROR_CODES and self.pool.available()
+                )
+                if not retry or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+
+    def usage(self):
+        """
+        Возвращает статистику использования токенов.
+
+        Returns
+        -------
+        list of dict
+            Статистика каждого токена пула.
+        """
+        return self.pool.usage()
+
+    def get_profile_data(self, user_name):
         """
-        Инициализирует сессию VK API с использованием указанного токена.
+        Получает информацию о пользователе, его друзьях, группах и стене.
+
+        В пакетном режиме все данные запрашиваются одним вызовом execute. Если execute не удался
+        целиком, а также в обычном режиме данные запрашиваются отдельными методами. Части, в
+        которых VK API отказал внутри execute (например, скрытые друзья), повторно не запрашиваются.
 
         Parameters
         ----------
-        token : str
-            Токен доступа VK API.
+        user_name : int or str
+            Идентификатор или короткое имя пользователя.
+
+        Returns
+        -------
+        dict
+            Словарь с ключами 'user', 'friends', 'groups' и 'wall'. Значения, которые не удалось
+            получить, равны None. Для закрытых, удаленных и заблокированных профилей остальные
+            данные не запрашиваются.
         """
-        self.session = vk_api.VkApi(token=token)
-        self.api = self.session.get_api()
+        data = {"user": None, "friends": None, "groups": None, "wall": None}
+        denied = set()
+
+        if self.batch:
+            data, denied = split_profile_response(self.execute_profile(user_name))
+
+        if not data["user"] and "user" not in denied:
+            data["user"] = self.get_user_info(user_name)
+        if not data["user"]:
+            return data
+
+        if unavailable_reason(data["user"][0]):
+            return data
+
+        user_id = data["user"][0]["id"]
+        domain = data["user"][0].get("domain")
+
+        if data["friends"] is None and "friends" not in denied:
+            data["friends"] = self.get_friends_info(user_id)
+        if data["groups"] is None and "groups" not in denied:
+            data["groups"] = self.get_groups_info(user_id)
+        if data["wall"] is None and "wall" not in denied:
+            data["wall"] = self.get_wall_info(user_id, domain)
+
+        return data
+
+    def execute_profile(self, user_name):
+        """
+        Получает все данные профиля одним запросом execute.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Идентификатор или короткое имя пользователя.
+
+        Returns
+        -------
+        dict or None
+            Ответ execute с ключами 'user', 'friends', 'groups' и 'wall', если запрос успешен, иначе None.
+            Значения вложенных методов, завершившихся ошибкой, равны False.
+        """
+        try:
+            return self.api.execute(code=build_profile_script(user_name))
+        except vk_api.ApiError as e:
+            print(f"Ошибка API ВКонтакте при пакетном запросе данных пользователя: {e}")
+        except Exception as e:
+            print(f"Произошла ошибка при пакетном запросе данных пользователя: {e}")
 
     def get_user_info(self, user_id):
         """
@@ -60,7 +347,7 @@ class VkProfile:
         try:
             return self.api.users.get(
                 user_ids=user_id,
-                fields="domain,sex,bdate,city,country,site,activities,interests,schools,universities",
+                fields=USER_FIELDS,
             )
         except vk_api.ApiError as e:
             print(f"Ошибка API ВКонтакте при запросе информации о пользователе: {e}")
@@ -89,9 +376,7 @@ class VkProfile:
             Возникает при других ошибках.
         """
         try:
-            return self.api.friends.get(
-                user_id=user_id, fields="sex,bdate,city,country"
-            )
+            return self.api.friends.get(user_id=user_id, fields=FRIENDS_FIELDS)
         except vk_api.ApiError as e:
             print(
                 f"Ошибка API ВКонтакте при запросе информации о друзьях пользователя: {e}"
@@ -124,7 +409,7 @@ class VkProfile:
         """
         try:
             return self.api.groups.get(
-                user_id=user_id, extended=1, fields="activity,city,country,site"
+                user_id=user_id, extended=1, fields=GROUPS_FIELDS
             )
         except vk_api.ApiError as e:
             print(
@@ -160,7 +445,7 @@ class VkProfile:
         """
         try:
             return self.api.wall.get(
-                user_id=user_id, domain=domain, count=100, filter="all"
+                user_id=user_id, domain=domain, count=WALL_COUNT, filter="all"
             )
         except vk_api.ApiError as e:
             print(
@@ -168,3 +453,406 @@ class VkProfile:
             )
         except Exception as e:
             print(f"Произошла ошибка при запросе информации о стене пользователя: {e}")
+
+
+class AsyncApiError(Exception):
+    """
+    Ошибка, возвращенная API ВКонтакте при асинхронном запросе.
+
+    Attributes
+    ----------
+    code : int
+        Код ошибки API ВКонтакте.
+    message : str
+        Описание ошибки.
+    """
+
+    def __init__(self, method, error):
+        self.code = error.get("error_code")
+        self.message = error.get("error_msg", "")
+        super().__init__(f"[{self.code}] {method}: {self.message}")
+
+
+class AsyncVkProfile:
+    """
+    Асинхронный клиент API ВКонтакте для получения информации о профиле пользователя.
+
+    Клиент использует одну HTTP-сессию с пулом постоянных соединений, сам ограничивает частоту
+    запросов и повторяет запросы, завершившиеся ошибками 6, 9 и 10, с экспоненциальной задержкой
+    со случайным разбросом.
+
+    Attributes
+    ----------
+    pool : TokenPool
+        Пул токенов VK API с ограничителем частоты запросов для каждого токена.
+    max_retries : int
+        Максимальное количество повторов запроса.
+    backoff : float
+        Базовая задержка перед повтором запроса в секундах.
+    connections : int
+        Максимальное количество одновременно открытых соединений.
+    batch : bool
+        Если True, данные профиля запрашиваются одним вызовом execute.
+    session : aiohttp.ClientSession or None
+        HTTP-сессия, открытая в open().
+
+    Methods
+    -------
+    open()
+        Открывает HTTP-сессию.
+    close()
+        Закрывает HTTP-сессию.
+    method(name, **params)
+        Выполняет метод VK API.
+    usage()
+        Возвращает статистику использования токенов.
+    get_profile_data(user_name)
+        Получает информацию о пользователе, его друзьях, группах и стене.
+    execute_profile(user_name)
+        Получает все данные профиля одним запросом execute.
+    resolve_users(user_names)
+        Получает идентификаторы пользователей по коротким именам пакетами по 1000.
+    get_user_info(user_id)
+        Получает информацию о пользователе.
+    get_friends_info(user_id)
+        Получает информацию о друзьях пользователя.
+    get_groups_info(user_id)
+        Получает информацию о группах пользователя.
+    get_wall_info(user_id, domain)
+        Получает информацию о постах на стене пользователя.
+
+    Examples
+    --------
+    >>> async def main():
+    ...     async with AsyncVkProfile(token) as profile:
+    ...         return await profile.get_profile_data("durov")
+    >>> data = asyncio.run(main())
+    """
+
+    def __init__(
+        self, token, rate=3, max_retries=5, backoff=0.5, connections=10, batch=True
+    ):
+        """
+        Инициализирует асинхронный клиент VK API.
+
+        Parameters
+        ----------
+        token : str, list of str or TokenPool
+            Токен доступа VK API, несколько токенов через запятую, список токенов или пул токенов.
+        rate : float, optional
+            Количество запросов в секунду для каждого токена, по умолчанию 3.
+        max_retries : int, optional
+            Максимальное количество повторов запроса, по умолчанию 5.
+        backoff : float, optional
+            Базовая задержка перед повтором запроса в секундах, по умолчанию 0.5.
+        connections : int, optional
+            Максимальное количество одновременно открытых соединений, по умолчанию 10.
+        batch : bool, optional
+            Если True, данные профиля запрашиваются одним вызовом execute, по умолчанию True.
+        """
+        self.pool = token if isinstance(token, TokenPool) else TokenPool(token, rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.connections = connections
+        self.batch = batch
+        self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """
+        Открывает HTTP-сессию с пулом постоянных соединений.
+        """
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.connections, keepalive_timeout=60
+                ),
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+
+    async def close(self):
+        """
+        Закрывает HTTP-сессию.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def method(self, name, **params):
+        """
+        Выполняет метод VK API с учетом ограничения частоты и повторами при временных ошибках.
+
+        Токен, вернувший ошибку ограничения частоты или авторизации, выводится из ротации,
+        а запрос повторяется с другим токеном пула.
+
+        Parameters
+        ----------
+        name : str
+            Название метода, например 'users.get'.
+        **params
+            Параметры метода.
+
+        Returns
+        -------
+        dict or list
+            Поле 'response' ответа API.
+
+        Raises
+        ------
+        AsyncApiError
+            Возникает при ошибке API ВКонтакте, которую не удалось исправить повторами.
+        aiohttp.ClientError
+            Возникает при сетевой ошибке.
+        """
+        await self.open()
+        data = {key: str(value) for key, value in params.items()}
+        data.update(v=API_VERSION)
+
+        attempt = 0
+        while True:
+            token = await self.pool.acquire_async()
+            data.update(access_token=token)
+            async with self.session.post(API_URL + name, data=data) as response:
+                response.raise_for_status()
+                body = await response.json(content_type=None)
+
+            if "error" not in body:
+                return body["response"]
+
+            error = AsyncApiError(name, body["error"])
+            self.pool.report_error(token, error.code)
+            retry = error.code in RETRY_ERROR_CODES or (
+                error.code in ROTATION_ERROR_CODES and self.pool.available()
+            )
+            if not retry or attempt >= self.max_retries:
+                raise error
+
+            await asyncio.sleep(self.backoff * 2**attempt * random.uniform(0.5, 1.5))
+            attempt += 1
+
+    def usage(self):
+        """
+        Возвращает статистику использования токенов.
+
+        Returns
+        -------
+        list of dict
+            Статистика каждого токена пула.
+        """
+        return self.pool.usage()
+
+    async def get_profile_data(self, user_name):
+        """
+        Получает информацию о пользователе, его друзьях, группах и стене.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Идентификатор или короткое имя пользователя.
+
+        Returns
+        -------
+        dict
+            Словарь с ключами 'user', 'friends', 'groups' и 'wall'. Значения, которые не удалось
+            получить, равны None. Для закрытых, удаленных и заблокированных профилей остальные
+            данные не запрашиваются.
+        """
+        data = {"user": None, "friends": None, "groups": None, "wall": None}
+        denied = set()
+
+        if self.batch:
+            data, denied = split_profile_response(await self.execute_profile(user_name))
+
+        if not data["user"] and "user" not in denied:
+            data["user"] = await self.get_user_info(user_name)
+        if not data["user"]:
+            return data
+
+        if unavailable_reason(data["user"][0]):
+            return data
+
+        user_id = data["user"][0]["id"]
+        domain = data["user"][0].get("domain")
+
+        if data["friends"] is None and "friends" not in denied:
+            data["friends"] = await self.get_friends_info(user_id)
+        if data["groups"] is None and "groups" not in denied:
+            data["groups"] = await self.get_groups_info(user_id)
+        if data["wall"] is None and "wall" not in denied:
+            data["wall"] = await self.get_wall_info(user_id, domain)
+
+        return data
+
+    async def execute_profile(self, user_name):
+        """
+        Получает все данные профиля одним запросом execute.
+
+        Parameters
+        ----------
+        user_name : int or str
+            Идентификатор или короткое имя пользователя.
+
+        Returns
+        -------
+        dict or None
+            Ответ execute с ключами 'user', 'friends', 'groups' и 'wall', если запрос успешен, иначе None.
+        """
+        try:
+            return await self.method("execute", code=build_profile_script(user_name))
+        except AsyncApiError as e:
+            print(f"Ошибка API ВКонтакте при пакетном запросе данных пользователя: {e}")
+        except Exception as e:
+            print(f"Произошла ошибка при пакетном запросе данных пользователя: {e}")
+
+    async def resolve_users(self, user_names):
+        """
+        Получает идентификаторы пользователей по коротким именам пакетами по 1000.
+
+        Parameters
+        ----------
+        user_names : iterable of int or str
+            Короткие имена, строки вида 'id123' или числовые идентификаторы пользователей.
+
+        Returns
+        -------
+        dict
+            Словарь, где ключ — исходное имя, а значение — информация о пользователе с ключами
+            'id' и 'domain'. Имена, которые не удалось разрешить, в словарь не попадают.
+        """
+        names = list(dict.fromkeys(str(name) for name in user_names))
+        resolved = {}
+
+        for start in range(0, len(names), USERS_GET_LIMIT):
+            chunk = names[start : start + USERS_GET_LIMIT]
+            try:
+                users = await self.method(
+                    "users.get", user_ids=",".join(chunk), fields="domain"
+                )
+            except AsyncApiError as e:
+                print(f"Ошибка API ВКонтакте при разрешении имен пользователей: {e}")
+                continue
+            except Exception as e:
+                print(f"Произошла ошибка при разрешении имен пользователей: {e}")
+                continue
+
+            index = {}
+            for user in users:
+                index[str(user["id"])] = user
+                index[f"id{user['id']}"] = user
+                if user.get("domain"):
+                    index[user["domain"].lower()] = user
+
+            for name in chunk:
+                user = index.get(name.lower())
+                if user:
+                    resolved[name] = user
+
+        return resolved
+
+    async def get_user_info(self, user_id):
+        """
+        Получает информацию о пользователе.
+
+        Parameters
+        ----------
+        user_id : int or str
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        list or None
+            Информация о пользователе, если запрос успешен, иначе None.
+        """
+        try:
+            return await self.method("users.get", user_ids=user_id, fields=USER_FIELDS)
+        except AsyncApiError as e:
+            print(f"Ошибка API ВКонтакте при запросе информации о пользователе: {e}")
+        except Exception as e:
+            print(f"Произошла ошибка при запросе информации о пользователе: {e}")
+
+    async def get_friends_info(self, user_id):
+        """
+        Получает информацию о друзьях пользователя.
+
+        Parameters
+        ----------
+        user_id : int or str
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        dict or None
+            Информация о друзьях пользователя, если запрос успешен, иначе None.
+        """
+        try:
+            return await self.method(
+                "friends.get", user_id=user_id, fields=FRIENDS_FIELDS
+            )
+        except AsyncApiError as e:
+            print(
+                f"Ошибка API ВКонтакте при запросе информации о друзьях пользователя: {e}"
+            )
+        except Exception as e:
+            print(
+                f"Произошла ошибка при запросе информации о друзьях пользователя: {e}"
+            )
+
+    async def get_groups_info(self, user_id):
+        """
+        Получает информацию о группах пользователя.
+
+        Parameters
+        ----------
+        user_id : int or str
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        dict or None
+            Информация о группах пользователя, если запрос успешен, иначе None.
+        """
+        try:
+            return await self.method(
+                "groups.get", user_id=user_id, extended=1, fields=GROUPS_FIELDS
+            )
+        except AsyncApiError as e:
+            print(
+                f"Ошибка API ВКонтакте при запросе информации о сообществах пользователя: {e}"
+            )
+        except Exception as e:
+            print(
+                f"Произошла ошибка при запросе информации о сообществах пользователя: {e}"
+            )
+
+    async def get_wall_info(self, user_id, domain):
+        """
+        Получает информацию о постах на стене пользователя.
+
+        Parameters
+        ----------
+        user_id : int or str
+            Идентификатор пользователя.
+        domain : str
+            Доменное имя пользователя.
+
+        Returns
+        -------
+        dict or None
+            Информация о постах на стене пользователя, если запрос успешен, иначе None.
+        """
+        try:
+            return await self.method(
+                "wall.get", owner_id=user_id, count=WALL_COUNT, filter="all"
+            )
+        except AsyncApiError as e:
+            print(
+                f"Ошибка API ВКонтакте при запросе информации о стене пользователя: {e}"
+            )
+        except Exception as e:
+            print(f"Произошла ошибка при запросе информации о стене пользователя: {e}")
@@ -0,0 +1,293 @@
+import asyncio
+import threading
+import time
+
+AUTH_ERROR_CODES = (5,)
+RATE_LIMIT_COOLDOWNS = {6: 1, 9: 60, 29: 3600}
+ROTATION_ERROR_CODES = AUTH_ERROR_CODES + (29,)
+
+
+class NoTokensAvailable(Exception):
+    """
+    Ошибка, возникающая, когда все токены пула выведены из ротации.
+    """
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму token bucket.
+
+    Attributes
+    ----------
+    rate : float
+        Количество запросов, разрешенных в секунду.
+    capacity : float
+        Максимальное количество запросов, которые можно выполнить подряд.
+    tokens : float
+        Текущее количество доступных запросов.
+
+    Methods
+    -------
+    refill()
+        Пополняет корзину пропорционально прошедшему времени.
+    try_acquire()
+        Забирает один запрос, если он доступен.
+    """
+
+    def __init__(self, rate=3, capacity=None):
+        """
+        Инициализирует ограничитель частоты запросов.
+
+        Parameters
+        ----------
+        rate : float, optional
+            Количество запросов в секунду, по умолчанию 3 (ограничение API ВКонтакте).
+        capacity : float, optional
+            Размер корзины, по умолчанию равен rate.
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        """
+        Пополняет корзину пропорционально времени, прошедшему с последнего пополнения.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """
+        Забирает один запрос, если он доступен.
+
+        Returns
+        -------
+        float
+            0, если запрос получен, иначе время ожидания следующего запроса в секундах.
+        """
+        self.refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class TokenPool:
+    """
+    Пул токенов VK API, распределяющий запросы по остатку лимита каждого токена.
+
+    Для каждого токена ведется свой token bucket. Запрос получает токен с наибольшим остатком.
+    Токен, вернувший ошибку авторизации, выводится из ротации навсегда, а токен, вернувший
+    ошибку ограничения частоты, — на время, зависящее от кода ошибки.
+
+    Attributes
+    ----------
+    tokens : list of str
+        Токены доступа VK API.
+    buckets : dict
+        Ограничитель частоты запросов для каждого токена.
+    stats : dict
+        Статистика использования каждого токена.
+
+    Methods
+    -------
+    acquire()
+        Ожидает и возвращает токен с доступным лимитом.
+    acquire_async()
+        Асинхронная версия acquire.
+    take()
+        Забирает один запрос у токена с наибольшим остатком лимита, не ожидая.
+    report_error(token, code)
+        Учитывает ошибку API, полученную при запросе с токеном.
+    available()
+        Возвращает количество токенов, доступных для запросов прямо сейчас.
+    usage()
+        Возвращает статистику использования токенов.
+
+    Examples
+    --------
+    >>> pool = TokenPool("token_1,token_2", rate=3)
+    >>> token = pool.acquire()
+    >>> pool.report_error(token, 29)
+    >>> pool.usage()[0]["active"]
+    False
+    """
+
+    def __init__(self, tokens, rate=3):
+        """
+        Инициализирует пул токенов.
+
+        Parameters
+        ----------
+        tokens : str or list of str
+            Токен, несколько токенов через запятую или список токенов.
+        rate : float, optional
+            Количество запросов в секунду для каждого токена, по умолчанию 3.
+
+        Raises
+        ------
+        ValueError
+            Возникает, если не передано ни одного токена.
+        """
+        if isinstance(tokens, str):
+            tokens = tokens.split(",")
+        self.tokens = list(
+            dict.fromkeys(token.strip() for token in tokens or [] if token.strip())
+        )
+        if not self.tokens:
+            raise ValueError("Не передано ни одного токена VK API")
+
+        self.buckets = {token: TokenBucket(rate) for token in self.tokens}
+        self.stats = {
+            token: {"calls": 0, "errors": 0, "disabled": None, "cooldown_until": 0}
+            for token in self.tokens
+        }
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def acquire(self):
+        """
+        Ожидает и возвращает токен с доступным лимитом.
+
+        Returns
+        -------
+        str
+            Токен доступа VK API.
+
+        Raises
+        ------
+        NoTokensAvailable
+            Возникает, если все токены выведены из ротации навсегда.
+        """
+        while True:
+            token, wait = self.take()
+            if token:
+                return token
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """
+        Асинхронная версия acquire.
+
+        Returns
+        -------
+        str
+            Токен доступа VK API.
+
+        Raises
+        ------
+        NoTokensAvailable
+            Возникает, если все токены выведены из ротации навсегда.
+        """
+        while True:
+            token, wait = self.take()
+            if token:
+                return token
+            await asyncio.sleep(wait)
+
+    def take(self):
+        """
+        Забирает один запрос у токена с наибольшим остатком лимита, не ожидая.
+
+        Returns
+        -------
+        tuple of (str or None, float)
+            Токен и 0, если запрос получен, иначе None и время ожидания в секундах.
+
+        Raises
+        ------
+        NoTokensAvailable
+            Возникает, если все токены выведены из ротации навсегда.
+        """
+        with self.lock:
+            now = time.monotonic()
+            active = [
+                token for token in self.tokens if not self.stats[token]["disabled"]
+            ]
+            if not active:
+                raise NoTokensAvailable("Все токены VK API выведены из ротации")
+
+            ready = [
+                token for token in active if self.stats[token]["cooldown_until"] <= now
+            ]
+            if not ready:
+                return None, min(self.stats[t]["cooldown_until"] for t in active) - now
+
+            for token in ready:
+                self.buckets[token].refill()
+            token = max(ready, key=lambda t: self.buckets[t].tokens)
+
+            wait = self.buckets[token].try_acquire()
+            if wait:
+                return None, wait
+            self.stats[token]["calls"] += 1
+            return token, 0
+
+    def report_error(self, token, code):
+        """
+        Учитывает ошибку API, полученную при запросе с токеном.
+
+        Parameters
+        ----------
+        token : str
+            Токен, с которым выполнялся запрос.
+        code : int
+            Код ошибки API ВКонтакте.
+        """
+        with self.lock:
+            stats = self.stats[token]
+            stats["errors"] += 1
+            if code in AUTH_ERROR_CODES:
+                stats["disabled"] = f"auth error {code}"
+            elif code in RATE_LIMIT_COOLDOWNS:
+                stats["cooldown_until"] = time.monotonic() + RATE_LIMIT_COOLDOWNS[code]
+
+    def available(self):
+        """
+        Возвращает количество токенов, доступных для запросов прямо сейчас.
+
+        Returns
+        -------
+        int
+            Количество токенов в ротации, не ожидающих окончания паузы.
+        """
+        with self.lock:
+            now = time.monotonic()
+            return sum(
+                1
+                for stats in self.stats.values()
+                if not stats["disabled"] and stats["cooldown_until"] <= now
+            )
+
+    def usage(self):
+        """
+        Возвращает статистику использования токенов.
+
+        Returns
+        -------
+        list of dict
+            Для каждого токена: замаскированный токен, количество запросов и ошибок, признак
+            нахождения в ротации, причина отключения и остаток лимита.
+        """
+        with self.lock:
+            now = time.monotonic()
+            report = []
+            for token in self.tokens:
+                stats = self.stats[token]
+                self.buckets[token].refill()
+                report.append(
+                    {
+                        "token": f"{token[:6]}...",
+                        "calls": stats["calls"],
+                        "errors": stats["errors"],
+                        "active": not stats["disabled"]
+                        and stats["cooldown_until"] <= now,
+                        "disabled": stats["disabled"],
+                        "remaining": round(self.buckets[token].tokens, 2),
+                    }
+                )
+            return report
@@ -0,0 +1,215 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data_base",
+    "toxicity.db",
+)
+QUERY_CHUNK = 500
+SCORE_DTYPE = np.float32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    text_hash BLOB NOT NULL,
+    model TEXT NOT NULL,
+    scores BLOB NOT NULL,
+    PRIMARY KEY (text_hash, model)
+) WITHOUT ROWID;
+"""
+
+
+def normalize_text(text):
+    """
+    Приводит текст поста к виду, в котором он передается модели токсичности.
+
+    Parameters
+    ----------
+    text : str
+        Текст поста.
+
+    Returns
+    -------
+    str
+        Текст без переводов строк, табуляций и знаков препинания.
+
+    Examples
+    --------
+    >>> normalize_text('Привет,\\nмир!')
+    'Привет мир'
+    """
+    text = re.sub(r"[\n\t]", " ", text)
+    return re.sub(r"[^\w\s]", "", text)
+
+
+def text_hash(text):
+    """
+    Вычисляет хэш нормализованного текста.
+
+    Parameters
+    ----------
+    text : str
+        Нормализованный текст.
+
+    Returns
+    -------
+    bytes
+        16-байтовый хэш BLAKE2b.
+    """
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+class ToxicityCache:
+    """
+    Дисковый кэш вероятностей токсичности по хэшу нормализованного текста.
+
+    Ключ составляется из хэша текста и версии модели, поэтому одинаковые тексты (репосты,
+    кросспосты, повторные сборы той же стены) оцениваются моделью один раз, а смена модели,
+    ее реализации или ограничения длины дает новые ключи. Вероятности пяти классов хранятся
+    в виде массива float32.
+
+    Attributes
+    ----------
+    path : str
+        Путь к файлу базы данных.
+    connection : sqlite3.Connection
+        Соединение с базой данных, общее для всех потоков.
+    hits : int
+        Количество текстов, найденных в кэше.
+    misses : int
+        Количество текстов, которых в кэше не было.
+
+    Methods
+    -------
+    get_many(hashes, model)
+        Возвращает сохраненные вероятности текстов.
+    put_many(hashes, model, scores)
+        Сохраняет вероятности текстов.
+    close()
+        Закрывает соединение с базой данных.
+
+    Examples
+    --------
+    >>> cache = ToxicityCache(':memory:')
+    >>> key = text_hash('привет')
+    >>> cache.put_many([key], 'rubert', np.array([[0.9, 0.1, 0, 0, 0]]))
+    >>> cache.get_many([key], 'rubert')[key].round(1)
+    array([0.9, 0.1, 0. , 0. , 0. ], dtype=float32)
+    """
+
+    def __init__(self, path=None):
+        """
+        Открывает базу данных и создает таблицу, если ее еще нет.
+
+        Parameters
+        ----------
+        path : str, optional
+            Путь к файлу базы данных, по умолчанию значение переменной окружения
+            TOXICITY_CACHE_PATH или data_base/toxicity.db.
+        """
+        self.path = path or os.getenv("TOXICITY_CACHE_PATH", DEFAULT_CACHE_PATH)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """
+        Закрывает соединение с базой данных.
+        """
+        with self.lock:
+            self.connection.close()
+
+    def get_many(self, hashes, model):
+        """
+        Возвращает сохраненные вероятности текстов.
+
+        Parameters
+        ----------
+        hashes : list of bytes
+            Хэши нормализованных текстов.
+        model : str
+            Версия модели.
+
+        Returns
+        -------
+        dict
+            Вероятности классов (np.ndarray) по хэшу для текстов, найденных в кэше.
+        """
+        found = {}
+        with self.lock:
+            for start in range(0, len(hashes), QUERY_CHUNK):
+                chunk = hashes[start : start + QUERY_CHUNK]
+                rows = self.connection.execute(
+                    f"SELECT text_hash, scores FROM scores WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk],
+                )
+                for key, scores in rows:
+                    found[key] = np.frombuffer(scores, dtype=SCORE_DTYPE)
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, hashes, model, scores):
+        """
+        Сохраняет вероятности текстов.
+
+        Parameters
+        ----------
+        hashes : list of bytes
+            Хэши нормализованных текстов.
+        model : str
+            Версия модели.
+        scores : np.ndarray
+            Вероятности классов, по строке на текст.
+        """
+        scores = np.asarray(scores, dtype=SCORE_DTYPE)
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO scores (text_hash, model, scores) VALUES (?, ?, ?)",
+                [(key, model, row.tobytes()) for key, row in zip(hashes, scores)],
+            )
+
+
+shared_cache = None
+shared_lock = threading.Lock()
+
+
+def default_cache():
+    """
+    Возвращает общий для процесса кэш вероятностей токсичности.
+
+    Returns
+    -------
+    ToxicityCache or None
+        Кэш, открытый при первом вызове, или None, если кэш отключен переменной окружения
+        TOXICITY_CACHE=0 или его не удалось открыть.
+    """
+    global shared_cache
+    if os.getenv("TOXICITY_CACHE", "1") == "0":
+        return None
+    with shared_lock:
+        if shared_cache is None:
+            try:
+                shared_cache = ToxicityCache()
+            except Exception as e:
+                print(f"Ошибка при открытии кэша токсичности: {e}")
+        return shared_cache
@@ -0,0 +1,567 @@
+import contextlib
+import json
+import os
+from datetime import datetime
+
+import vk_api
+
+WALL_PAGE_SIZE = 100
+EXECUTE_LIMIT = 25
+
+WALL_PAGES_SCRIPT = """
+var pages = [];
+var offset = %(offset)d;
+var end = offset + %(pages)d * %(page_size)d;
+while (offset < end) {
+    var page = API.wall.get({"owner_id": %(owner_id)d, "offset": offset, "count": %(page_size)d, "filter": "all"});
+    if (!page) {
+        return pages;
+    }
+    pages.push(page);
+    if (page.items.length < %(page_size)d) {
+        return pages;
+    }
+    offset = offset + %(page_size)d;
+}
+return pages;
+"""
+
+
+class JsonArrayWriter:
+    """
+    Потоково записывает элементы в файл JSON в виде одного массива.
+
+    Элементы записываются по мере поступления, поэтому весь массив не хранится в памяти,
+    а итоговый файл читается обычным json.load. Запись идет во временный файл, который
+    заменяет основной при закрытии, поэтому читатель никогда не видит незавершенный массив.
+    Временный файл открывается при входе в блок with; если блок завершился исключением,
+    временный файл удаляется, а основной остается прежним.
+
+    Attributes
+    ----------
+    file_path : str
+        Путь к файлу для сохранения данных.
+    count : int
+        Количество записанных элементов.
+
+    Methods
+    -------
+    write(items)
+        Дописывает элементы в массив.
+    close()
+        Завершает массив и закрывает файл.
+    discard()
+        Закрывает и удаляет временный файл, не трогая основной.
+
+    Examples
+    --------
+    >>> with JsonArrayWriter('wall_data.json') as writer:
+    ...     writer.write([{'id': 1}, {'id': 2}])
+    ...     writer.write([{'id': 3}])
+    """
+
+    def __init__(self, file_path):
+        """
+        Инициализирует запись в файл.
+
+        Parameters
+        ----------
+        file_path : str
+            Путь к файлу для сохранения данных.
+        """
+        self.file_path = file_path
+        self.count = 0
+        self.files = contextlib.ExitStack()
+        self.file = None
+
+    def __enter__(self):
+        self.file = self.files.enter_context(
+            open(f"{self.file_path}.tmp", "w", encoding="utf-8")
+        )
+        self.file.write("[")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write(self, items):
+        """
+        Дописывает элементы в массив.
+
+        Parameters
+        ----------
+        items : list of dict
+            Элементы для записи.
+        """
+        for item in items:
+            if self.count:
+                self.file.write(",")
+            json.dump(item, self.file, ensure_ascii=False)
+            self.count += 1
+
+    def close(self):
+        """
+        Завершает массив, закрывает файл и атомарно заменяет им основной.
+        """
+        if self.file is not None and not self.file.closed:
+            self.file.write("]")
+            self.files.close()
+            os.replace(self.file.name, self.file_path)
+
+    def discard(self):
+        """
+        Закрывает и удаляет временный файл, не трогая основной.
+        """
+        if self.file is not None and not self.file.closed:
+            self.files.close()
+            os.remove(self.file.name)
+
+
+class WallState:
+    """
+    Класс для хранения наибольшего id и даты сохраненного поста каждого пользователя.
+
+    Attributes
+    ----------
+    file_path : str
+        Путь к файлу состояния.
+    users : dict
+        Для каждого пользователя словарь с ключами 'max_id' и 'max_date'.
+
+    Methods
+    -------
+    get(user_id)
+        Возвращает состояние стены пользователя.
+    observe(user_id, items)
+        Учитывает посты, полученные со стены пользователя.
+    summarize(items, state=None)
+        Вычисляет наибольший id и дату постов, не меняя сохраненное состояние.
+    update(user_id, observed)
+        Учитывает состояние, вычисленное методом summarize.
+    save()
+        Атомарно сохраняет состояние в файл.
+    """
+
+    def __init__(self, file_path):
+        """
+        Загружает состояние из файла, если он существует.
+
+        Parameters
+        ----------
+        file_path : str
+            Путь к файлу состояния.
+        """
+        self.file_path = file_path
+        self.users = {}
+        if os.path.exists(file_path):
+            try:
+                with open(file_path) as f:
+                    self.users = json.load(f)
+            except Exception as e:
+                print(f"Ошибка при загрузке состояния стены {file_path}: {e}")
+
+    def get(self, user_id):
+        """
+        Возвращает состояние стены пользователя.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+
+        Returns
+        -------
+        dict or None
+            Словарь с ключами 'max_id' и 'max_date' или None, если стена еще не сохранялась.
+        """
+        return self.users.get(str(user_id))
+
+    def observe(self, user_id, items):
+        """
+        Учитывает посты, полученные со стены пользователя.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        items : list of dict
+            Посты с датой в виде временной метки UNIX.
+        """
+        self.update(user_id, self.summarize(items))
+
+    @staticmethod
+    def summarize(items, state=None):
+        """
+        Вычисляет наибольший id и дату постов, не меняя сохраненное состояние.
+
+        Parameters
+        ----------
+        items : list of dict
+            Посты с датой в виде временной метки UNIX.
+        state : dict, optional
+            Состояние, которое дополняется на месте, по умолчанию новое.
+
+        Returns
+        -------
+        dict
+            Словарь с ключами 'max_id' и 'max_date'.
+        """
+        if state is None:
+            state = {"max_id": 0, "max_date": 0}
+        for post in items:
+            state["max_id"] = max(state["max_id"], post["id"])
+            if isinstance(post.get("date"), int):
+                state["max_date"] = max(state["max_date"], post["date"])
+        return state
+
+    def update(self, user_id, observed):
+        """
+        Учитывает состояние, вычисленное методом summarize.
+
+        Parameters
+        ----------
+        user_id : int
+            Идентификатор пользователя.
+        observed : dict
+            Словарь с ключами 'max_id' и 'max_date'.
+        """
+        state = self.users.setdefault(str(user_id), {"max_id": 0, "max_date": 0})
+        state["max_id"] = max(state["max_id"], observed["max_id"])
+        state["max_date"] = max(state["max_date"], observed["max_date"])
+
+    def save(self):
+        """
+        Атомарно сохраняет состояние в файл.
+        """
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.users, f)
+        os.replace(tmp_path, self.file_path)
+
+
+class WallCrawler:
+    """
+    Класс для получения всей истории постов со стены пользователя постранично.
+
+    Страницы запрашиваются по смещению (offset) до достижения ограничения по количеству постов,
+    даты отсечения или конца стены и передаются обработчику по мере получения. Несколько страниц
+    можно запрашивать одним вызовом execute.
+
+    Attributes
+    ----------
+    profile : VkProfile or AsyncVkProfile
+        Клиент VK API: VkProfile для crawl или AsyncVkProfile для crawl_async.
+    max_posts : int or None
+        Максимальное количество постов. None — без ограничения.
+    since : int or None
+        Временная метка UNIX; посты, опубликованные раньше, не запрашиваются.
+    pages_per_request : int
+        Количество страниц, запрашиваемых одним вызовом execute.
+    complete : bool
+        True, если последний обход дошел до конца стены или до ограничения, и False, если
+        он прервался из-за ошибки запроса.
+
+    Methods
+    -------
+    crawl(owner_id, sink, first_page=None, known_max_id=None, refresh_since=None)
+        Получает посты со стены и передает их обработчику постранично.
+    crawl_async(owner_id, sink, first_page=None, known_max_id=None, refresh_since=None)
+        Асинхронная версия crawl для клиента AsyncVkProfile.
+    fetch_pages(owner_id, offset)
+        Получает несколько страниц стены начиная с указанного смещения.
+    fetch_pages_async(owner_id, offset)
+        Асинхронная версия fetch_pages для клиента AsyncVkProfile.
+    filter_page(items)
+        Отбирает посты страницы с учетом даты отсечения и ограничения количества.
+    """
+
+    def __init__(self, profile, max_posts=None, since=None, pages_per_request=10):
+        """
+        Инициализирует обходчик стены.
+
+        Parameters
+        ----------
+        profile : VkProfile or AsyncVkProfile
+            Клиент VK API: VkProfile для crawl или AsyncVkProfile для crawl_async.
+        max_posts : int, optional
+            Максимальное количество постов, по умолчанию без ограничения.
+        since : datetime or int, optional
+            Дата отсечения (datetime или временная метка UNIX), по умолчанию не задана.
+        pages_per_request : int, optional
+            Количество страниц по 100 постов в одном вызове execute (от 1 до 25), по умолчанию 10.
+        """
+        self.profile = profile
+        self.max_posts = max_posts
+        if isinstance(since, datetime):
+            since = int(since.timestamp())
+        self.since = since
+        self.pages_per_request = max(1, min(pages_per_request, EXECUTE_LIMIT))
+        self.seen = set()
+        self.written = 0
+        self.complete = False
+        self.known_max_id = None
+        self.refresh_since = None
+
+    def crawl(
+        self, owner_id, sink, first_page=None, known_max_id=None, refresh_since=None
+    ):
+        """
+        Получает посты со стены и передает их обработчику постранично.
+
+        Parameters
+        ----------
+        owner_id : int
+            Идентификатор владельца стены.
+        sink : callable
+            Обработчик, который вызывается для списка постов каждой страницы.
+        first_page : dict, optional
+            Уже полученная первая страница ответа wall.get; она обрабатывается без повторного запроса.
+        known_max_id : int, optional
+            Наибольший id уже сохраненного поста. Если задан, обход останавливается на первом
+            известном посте старше refresh_since.
+        refresh_since : int, optional
+            Временная метка UNIX; известные посты новее нее передаются повторно для обновления
+            счетчиков лайков, просмотров и комментариев.
+
+        Returns
+        -------
+        int
+            Количество переданных обработчику постов.
+
+        Examples
+        --------
+        >>> crawler = WallCrawler(VkProfile(token), max_posts=5000)
+        >>> with JsonArrayWriter('wall_data.json') as writer:
+        ...     crawler.crawl(1, writer.write)
+        """
+        offset, total, stop = self.start(sink, first_page, known_max_id, refresh_since)
+
+        while not stop and (total is None or offset < total):
+            pages = self.fetch_pages(owner_id, offset)
+            if not pages:
+                return self.written
+            for page in pages:
+                offset, total, stop = self.handle_page(page, sink, offset)
+                if stop:
+                    break
+
+        self.complete = True
+        return self.written
+
+    async def crawl_async(
+        self, owner_id, sink, first_page=None, known_max_id=None, refresh_since=None
+    ):
+        """
+        Асинхронная версия crawl для клиента AsyncVkProfile.
+
+        Parameters
+        ----------
+        owner_id : int
+            Идентификатор владельца стены.
+        sink : callable
+            Обработчик, который вызывается для списка постов каждой страницы.
+        first_page : dict, optional
+            Уже полученная первая страница ответа wall.get; она обрабатывается без повторного запроса.
+        known_max_id : int, optional
+            Наибольший id уже сохраненного поста. Если задан, обход останавливается на первом
+            известном посте старше refresh_since.
+        refresh_since : int, optional
+            Временная метка UNIX; известные посты новее нее передаются повторно для обновления
+            счетчиков лайков, просмотров и комментариев.
+
+        Returns
+        -------
+        int
+            Количество переданных обработчику постов.
+        """
+        offset, total, stop = self.start(sink, first_page, known_max_id, refresh_since)
+
+        while not stop and (total is None or offset < total):
+            pages = await self.fetch_pages_async(owner_id, offset)
+            if not pages:
+                return self.written
+            for page in pages:
+                offset, total, stop = self.handle_page(page, sink, offset)
+                if stop:
+                    break
+
+        self.complete = True
+        return self.written
+
+    def start(self, sink, first_page, known_max_id=None, refresh_since=None):
+        """
+        Сбрасывает состояние обхода и обрабатывает уже полученную первую страницу.
+
+        Parameters
+        ----------
+        sink : callable
+            Обработчик постов страницы.
+        first_page : dict or None
+            Первая страница ответа wall.get или None.
+        known_max_id : int, optional
+            Наибольший id уже сохраненного поста.
+        refresh_since : int, optional
+            Временная метка UNIX начала окна обновления счетчиков известных постов.
+
+        Returns
+        -------
+        tuple of (int, int or None, bool)
+            Смещение следующей страницы, общее количество постов и признак остановки обхода.
+        """
+        self.seen = set()
+        self.written = 0
+        self.complete = False
+        self.known_max_id = known_max_id
+        self.refresh_since = refresh_since
+        if first_page is None:
+            return 0, None, False
+        return self.handle_page(first_page, sink, 0)
+
+    def handle_page(self, page, sink, offset):
+        """
+        Отбирает посты страницы и передает их обработчику.
+
+        Parameters
+        ----------
+        page : dict
+            Ответ wall.get с ключами 'count' и 'items'.
+        sink : callable
+            Обработчик постов страницы.
+        offset : int
+            Смещение страницы.
+
+        Returns
+        -------
+        tuple of (int, int, bool)
+            Смещение следующей страницы, общее количество постов и признак остановки обхода.
+        """
+        items, stop = self.filter_page(page["items"])
+        if items:
+            sink(items)
+        stop = stop or len(page["items"]) < WALL_PAGE_SIZE
+        return offset + len(page["items"]), page["count"], stop
+
+    def fetch_pages(self, owner_id, offset):
+        """
+        Получает несколько страниц стены начиная с указанного смещения.
+
+        Parameters
+        ----------
+        owner_id : int
+            Идентификатор владельца стены.
+        offset : int
+            Смещение первой страницы.
+
+        Returns
+        -------
+        list of dict or None
+            Список ответов wall.get, если запрос успешен, иначе None.
+        """
+        try:
+            if self.pages_per_request == 1:
+                return [
+                    self.profile.api.wall.get(
+                        owner_id=owner_id,
+                        offset=offset,
+                        count=WALL_PAGE_SIZE,
+                        filter="all",
+                    )
+                ]
+            return self.profile.api.execute(code=self.build_script(owner_id, offset))
+        except vk_api.ApiError as e:
+            print(f"Ошибка API ВКонтакте при запросе страниц стены пользователя: {e}")
+        except Exception as e:
+            print(f"Произошла ошибка при запросе страниц стены пользователя: {e}")
+
+    async def fetch_pages_async(self, owner_id, offset):
+        """
+        Асинхронная версия fetch_pages для клиента AsyncVkProfile.
+
+        Parameters
+        ----------
+        owner_id : int
+            Идентификатор владельца стены.
+        offset : int
+            Смещение первой страницы.
+
+        Returns
+        -------
+        list of dict or None
+            Список ответов wall.get, если запрос успешен, иначе None.
+        """
+        try:
+            return await self.profile.method(
+                "execute", code=self.build_script(owner_id, offset)
+            )
+        except Exception as e:
+            print(f"Произошла ошибка при запросе страниц стены пользователя: {e}")
+
+    def build_script(self, owner_id, offset):
+        """
+        Формирует код VKScript для получения нескольких страниц стены.
+
+        Parameters
+        ----------
+        owner_id : int
+            Идентификатор владельца стены.
+        offset : int
+            Смещение первой страницы.
+
+        Returns
+        -------
+        str
+            Код VKScript для метода execute.
+        """
+        return WALL_PAGES_SCRIPT % {
+            "owner_id": int(owner_id),
+            "offset": offset,
+            "pages": self.pages_per_request,
+            "page_size": WALL_PAGE_SIZE,
+        }
+
+    def filter_page(self, items):
+        """
+        Отбирает посты страницы с учетом даты отсечения и ограничения количества.
+
+        Закрепленный пост может быть старше даты отсечения, поэтому он не останавливает обход.
+        Посты, уже встреченные на предыдущих страницах (из-за сдвига стены во время обхода),
+        пропускаются. При инкрементальном обходе для уже сохраненных постов датой отсечения
+        служит начало окна обновления счетчиков.
+
+        Parameters
+        ----------
+        items : list of dict
+            Посты страницы в порядке ответа API.
+
+        Returns
+        -------
+        tuple of (list of dict, bool)
+            Отобранные посты и признак того, что обход нужно остановить.
+        """
+        selected = []
+
+        for post in items:
+            if self.max_posts is not None and self.written >= self.max_posts:
+                return selected, True
+            if self.known_max_id is not None and post["id"] <= self.known_max_id:
+                cutoff = self.refresh_since
+                if cutoff is None:
+                    cutoff = float("inf")
+            else:
+                cutoff = self.since
+            if cutoff is not None and post.get("date", 0) < cutoff:
+                if post.get("is_pinned"):
+                    continue
+                return selected, True
+            if post["id"] in self.seen:
+                continue
+
+            self.seen.add(post["id"])
+            selected.append(post)
+            self.written += 1
+
+        stop = self.max_posts is not None and self.written >= self.max_posts
+        return selected, stop